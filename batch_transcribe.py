@@ -0,0 +1,207 @@
+# Batch transcription of the recording archive (output/interview_<ts>.wav)
+#
+# Files are spread over a process pool; every worker loads the Whisper model once and uses a
+# fixed number of torch threads so the workers together do not oversubscribe the CPU.
+# A manifest records what was already transcribed, so an interrupted or repeated run only
+# processes new or changed files. Each recording gets a .json and a .srt transcript.
+#
+# Usage:
+#   python batch_transcribe.py                      # everything in OUTPUT_DIR
+#   python batch_transcribe.py --workers 4 --threads 2 output/interview_1744010423.wav
+import argparse
+import datetime
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import srt
+
+from src.utils.config_loader import get_config
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+MYCONFIG = get_config()
+
+MANIFEST_NAME = "manifest.json"
+
+# Set in every worker process by _init_worker
+_transcriber = None
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    # Write to a temporary file first so an interrupted run never leaves a broken manifest
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def needs_transcription(path, entry, model_size, profile):
+    """Compare size and mtime first; hash only when they changed (e.g. a copied or touched file)
+
+    A different model or inference profile gives a different transcript, so it always re-runs.
+    Entries written before profiles existed were made with the default one.
+    """
+    if not entry or entry.get("model") != model_size or entry.get("profile", "default") != profile:
+        return True, None
+    stat = os.stat(path)
+    if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+        return False, None
+    digest = file_hash(path)
+    return digest != entry.get("sha256"), digest
+
+
+def write_outputs(result, out_dir, name):
+    json_path = os.path.join(out_dir, name + ".json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    subtitles = [
+        srt.Subtitle(
+            index=i + 1,
+            start=datetime.timedelta(seconds=segment["start"]),
+            end=datetime.timedelta(seconds=segment["end"]),
+            content=segment["text"].strip(),
+        )
+        for i, segment in enumerate(result["segments"])
+    ]
+    srt_path = os.path.join(out_dir, name + ".srt")
+    with open(srt_path, "w", encoding="utf-8") as f:
+        f.write(srt.compose(subtitles))
+    return [json_path, srt_path]
+
+
+def _init_worker(model_size, profile, threads):
+    global _transcriber
+    import torch
+    from src.transcriber import SpeechTranscriber
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    _transcriber = SpeechTranscriber(model_size, profile=profile)
+    _transcriber.preload().join()
+
+
+def _transcribe_file(path, out_dir):
+    from src.utils.audio import load_wav
+    from src.transcriber import is_long_wav
+
+    start = time.perf_counter()
+    if is_long_wav(path):
+        # Hour-long recordings are memory-mapped and transcribed window by window
+        segments = list(_transcriber.transcribe_long(path))
+        result = {"language": None, "text": " ".join(seg["text"] for seg in segments), "segments": segments}
+        name = os.path.splitext(os.path.basename(path))[0]
+        return write_outputs({"file": path, **result}, out_dir, name), time.perf_counter() - start
+    try:
+        audio = load_wav(path)
+    except (EOFError, ValueError, OSError):
+        audio = None
+    if audio is not None and len(audio) == 0:
+        raise ValueError("empty recording")
+    if audio is None:
+        # Not a plain PCM WAV, let whisper decode it through ffmpeg
+        result = _transcriber.model.transcribe(path, **_transcriber.decode_options())
+    else:
+        result = _transcriber.decode(audio)
+
+    result = {
+        "file": path,
+        "language": result.get("language"),
+        "text": result["text"].strip(),
+        "segments": [
+            {"start": round(seg["start"], 2), "end": round(seg["end"], 2), "text": seg["text"]}
+            for seg in result["segments"]
+        ],
+    }
+    name = os.path.splitext(os.path.basename(path))[0]
+    outputs = write_outputs(result, out_dir, name)
+    return outputs, time.perf_counter() - start
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    default_dir = os.path.join(current_dir, MYCONFIG['DEFAULT']['OUTPUT_DIR'])
+
+    parser = argparse.ArgumentParser(description="Transcribe the recording archive in parallel")
+    parser.add_argument("paths", nargs="*", help="WAV files (default: every .wav in OUTPUT_DIR)")
+    parser.add_argument("--model", default=MYCONFIG['DEFAULT']['WHISPER_MODEL_SIZW'])
+    parser.add_argument("--profile", default=MYCONFIG['DEFAULT'].get('WHISPER_PROFILE', fallback='default'))
+    parser.add_argument("--threads", type=int, default=2, help="torch threads per worker")
+    parser.add_argument("--workers", type=int, default=None, help="default: CPU cores / threads")
+    parser.add_argument("--out-dir", default=os.path.join(default_dir, "transcripts"))
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and redo every file")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob(os.path.join(default_dir, "*.wav")))
+    paths = [os.path.abspath(path) for path in paths]
+    workers = args.workers or max(1, cpu_count // args.threads)
+    os.makedirs(args.out_dir, exist_ok=True)
+    manifest_path = os.path.join(args.out_dir, MANIFEST_NAME)
+    manifest = {} if args.force else load_manifest(manifest_path)
+
+    todo = []
+    for path in paths:
+        if os.path.getsize(path) == 0:
+            print(f"skip (empty): {path}")
+            continue
+        needed, digest = needs_transcription(path, manifest.get(path), args.model, args.profile)
+        if needed:
+            todo.append(path)
+        elif digest:
+            # Same content with a new mtime: remember the new stat so the next run skips the hash
+            manifest[path]["mtime"] = os.stat(path).st_mtime
+    skipped = len(paths) - len(todo)
+    print(f"{len(todo)} to transcribe, {skipped} already done, {workers} workers x {args.threads} threads")
+
+    start = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(args.model, args.profile, args.threads)) as pool:
+        futures = {pool.submit(_transcribe_file, path, args.out_dir): path for path in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                outputs, seconds = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(todo)}] failed: {path}: {e}")
+                continue
+            stat = os.stat(path)
+            manifest[path] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "sha256": file_hash(path),
+                "model": args.model,
+                "profile": args.profile,
+                "outputs": outputs,
+            }
+            # Saved after every file, so an interrupted run resumes where it stopped
+            save_manifest(manifest_path, manifest)
+            print(f"[{done}/{len(todo)}] {os.path.basename(path)} ({seconds:.1f}s)")
+
+    save_manifest(manifest_path, manifest)
+    print(f"done in {time.perf_counter() - start:.1f}s, {failed} failed, transcripts in {args.out_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
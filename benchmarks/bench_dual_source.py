@@ -0,0 +1,93 @@
+# Dual-source capture check with synthetic input: loopback and microphone are replayed by the
+# fake device from tone bursts at known times, recorded together, and the burst onsets are
+# located again in each channel to measure how well the two channels are aligned.
+# It also reports how much audio Whisper gets per turn when only the loopback channel is
+# transcribed compared to both channels.
+#
+# Usage: python benchmarks/bench_dual_source.py [--engine]
+import argparse
+import os
+import sys
+import tempfile
+import wave
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_audio import FakePyAudio
+from src.audio_capture import CaptureEngine, LoopbackRecorder, VoiceActivityDetector
+from src.utils.audio import WHISPER_SAMPLE_RATE
+
+DURATION = 4.0
+# (start, end) seconds of the tone bursts
+LOOPBACK_BURSTS = [(0.5, 1.5), (2.5, 3.0)]
+MIC_BURSTS = [(1.8, 2.3)]
+
+
+def write_bursts(path, rate, channels, bursts, freq):
+    t = np.arange(int(DURATION * rate)) / rate
+    signal = np.zeros_like(t)
+    for start, end in bursts:
+        mask = (t >= start) & (t < end)
+        signal[mask] = 0.3 * np.sin(2 * np.pi * freq * t[mask])
+    pcm = (np.repeat(signal[:, None], channels, axis=1) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as wave_file:
+        wave_file.setnchannels(channels)
+        wave_file.setsampwidth(2)
+        wave_file.setframerate(rate)
+        wave_file.writeframes(pcm.tobytes())
+
+
+def onsets(audio):
+    segments = VoiceActivityDetector(min_speech_seconds=0.1, padding_seconds=0).speech_segments(audio, WHISPER_SAMPLE_RATE)
+    return [start for start, _ in segments]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dual-source capture alignment check")
+    parser.add_argument("--engine", action="store_true", help="record through an always-on CaptureEngine")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        loopback_path = os.path.join(tmp, "loopback.wav")
+        mic_path = os.path.join(tmp, "mic.wav")
+        # Different rates and channel counts, like a 48 kHz stereo output and a 44.1 kHz mono microphone
+        write_bursts(loopback_path, 48000, 2, LOOPBACK_BURSTS, 440)
+        write_bursts(mic_path, 44100, 1, MIC_BURSTS, 660)
+
+        def backend():
+            return FakePyAudio(loopback_path, mic_path=mic_path)
+
+        engine = None
+        if args.engine:
+            engine = CaptureEngine(device_index=0, audio_backend=backend, preroll_seconds=0.5, mic_device_index=1)
+            engine.start()
+        recorder = LoopbackRecorder(device_index=0, audio_backend=backend, capture_mode="callback",
+                                    engine=engine, mic_device_index=1)
+        recorder.start_recording(None)
+        recorder.record(duration=DURATION)
+        if engine:
+            engine.close()
+
+        loopback = recorder.get_audio()
+        mic = recorder.get_audio(source="mic")
+        loopback_onsets = onsets(loopback)
+        mic_onsets = onsets(mic)
+        print(f"loopback: {len(loopback) / WHISPER_SAMPLE_RATE:.2f}s, onsets {[round(t, 3) for t in loopback_onsets]}")
+        print(f"mic:      {len(mic) / WHISPER_SAMPLE_RATE:.2f}s, onsets {[round(t, 3) for t in mic_onsets]}")
+        if loopback_onsets and mic_onsets:
+            # The gap between the first loopback and the first mic burst is known from the input
+            expected = MIC_BURSTS[0][0] - LOOPBACK_BURSTS[0][0]
+            measured = mic_onsets[0] - loopback_onsets[0]
+            print(f"alignment error: {(measured - expected) * 1000:+.0f} ms")
+
+        whisper_loopback = len(recorder.get_audio(trim=True)) / WHISPER_SAMPLE_RATE
+        whisper_both = whisper_loopback + len(recorder.get_audio(trim=True, source="mic")) / WHISPER_SAMPLE_RATE
+        print(f"audio sent to Whisper per turn: {whisper_loopback:.2f}s loopback only, {whisper_both:.2f}s both channels")
+
+
+if __name__ == "__main__":
+    main()
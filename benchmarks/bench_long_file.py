@@ -0,0 +1,99 @@
+# Peak memory of reading a long recording: load_wav() loads the whole file into one array, while
+# WavMap maps 30-second windows one at a time. The recording is built by repeating interview.wav
+# to --minutes; every mode runs in its own process so the peaks do not mix.
+#
+# Usage: python benchmarks/bench_long_file.py --minutes 10 20 40 [--transcribe]
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+
+
+def build_recording(source, path, minutes):
+    with wave.open(source, "rb") as src:
+        params = src.getparams()
+        frames = src.readframes(src.getnframes())
+    repeats = int(minutes * 60 * params.framerate / params.nframes) + 1
+    with wave.open(path, "wb") as dst:
+        dst.setparams(params)
+        for _ in range(repeats):
+            dst.writeframes(frames)
+
+
+def run_mode(mode, path):
+    """Runs inside a child process"""
+    start = time.perf_counter()
+    if mode == "load":
+        from src.utils.audio import load_wav
+        seconds = len(load_wav(path)) / 16000
+        windows = 1
+    elif mode == "mmap":
+        from src.utils.audio import WavMap
+        windows = 0
+        seconds = 0.0
+        for _, audio in WavMap(path).windows():
+            windows += 1
+            seconds += len(audio) / 16000
+    else:
+        from src.transcriber import SpeechTranscriber
+        transcriber = SpeechTranscriber()
+        transcriber.preload().join()
+        segments = list(transcriber.transcribe_long(path))
+        windows = len(segments)
+        seconds = segments[-1]["end"] if segments else 0.0
+    return {"mode": mode, "seconds": round(time.perf_counter() - start, 2), "audio_seconds": round(seconds),
+            "windows": windows, "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of long recordings, whole-file vs memory-mapped windows")
+    parser.add_argument("--clip", default=os.path.join(PROJECT_ROOT, "interview.wav"))
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 20])
+    parser.add_argument("--transcribe", action="store_true", help="also transcribe the windows with Whisper")
+    parser.add_argument("--child", nargs=2, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(*args.child)))
+        return
+
+    modes = ["load", "mmap"] + (["transcribe"] if args.transcribe else [])
+    print(f"{'minutes':>7} {'mode':<11} {'peak RSS':>10} {'time':>8} {'windows':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for minutes in args.minutes:
+            path = os.path.join(tmp, f"long_{minutes:g}.wav")
+            build_recording(args.clip, path, minutes)
+            for mode in modes:
+                child = subprocess.run([sys.executable, __file__, "--child", mode, path], capture_output=True, text=True)
+                if child.returncode != 0:
+                    # Loading an hour of audio whole can be killed for running out of memory
+                    print(f"{minutes:>7g} {mode:<11} failed (exit code {child.returncode})")
+                    continue
+                result = json.loads(child.stdout.strip().splitlines()[-1])
+                print(f"{minutes:>7g} {mode:<11} {result['peak_rss_mb']:>8.1f}MB {result['seconds']:>7.2f}s "
+                      f"{result['windows']:>8}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Micro-benchmark: cost of rendering a streamed LLM reply, full re-render vs MarkdownStreamRenderer
+# Usage: python benchmarks/bench_markdown_render.py
+import os
+import sys
+import time
+
+import markdown2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.markdown_renderer import MarkdownStreamRenderer
+
+PARAGRAPH = (
+    "Overfitting shows up when the **training loss** keeps falling while the validation loss rises. "
+    "I usually start with `early stopping`, then add regularization.\n\n"
+    "- L2 weight decay\n- dropout between layers\n- data augmentation\n\n"
+    "```python\nmodel.fit(x, y, validation_split=0.2, callbacks=[early_stop])\n```\n\n"
+)
+TOKEN_CHARS = 4      # roughly one token
+FRAME_TOKENS = 10    # tokens that arrive within one 33 ms frame at ~300 tokens/s
+
+
+def make_reply(n_chars):
+    return (PARAGRAPH * (n_chars // len(PARAGRAPH) + 1))[:n_chars]
+
+
+def tokens(text):
+    return [text[i:i + TOKEN_CHARS] for i in range(0, len(text), TOKEN_CHARS)]
+
+
+def bench_full(history, reply):
+    """The old behaviour: markdown2 over the whole accumulated text for every token"""
+    full_text = history
+    start = time.perf_counter()
+    for token in tokens(reply):
+        full_text += token
+        markdown2.markdown(full_text)
+    return time.perf_counter() - start
+
+
+def bench_incremental(history, reply):
+    renderer = MarkdownStreamRenderer()
+    renderer.feed(history)
+    renderer.end_turn()
+    start = time.perf_counter()
+    for i, token in enumerate(tokens(reply)):
+        renderer.feed(token)
+        if i % FRAME_TOKENS == 0:
+            renderer.render()
+    renderer.end_turn()
+    return time.perf_counter() - start
+
+
+def main():
+    history = make_reply(8000)  # a few earlier turns
+    print(f"{'reply chars':>12} {'full (s)':>10} {'incremental (s)':>16} {'speedup':>8}")
+    for n_chars in (500, 1000, 2000, 4000, 8000):
+        reply = make_reply(n_chars)
+        full = bench_full(history, reply)
+        incremental = bench_incremental(history, reply)
+        print(f"{n_chars:>12} {full:>10.3f} {incremental:>16.3f} {full / incremental:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
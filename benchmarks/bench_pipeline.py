@@ -0,0 +1,183 @@
+# Offline end-to-end latency benchmark of the record -> transcribe -> LLM -> render pipeline
+#
+# Every clip (interview.wav and the recordings in output/) is replayed in real time through
+# LoopbackRecorder by a fake audio device, transcribed by the real Whisper model and answered by
+# the local mock LLM server, so no network and no sound card are needed.
+#
+# Usage:
+#   python benchmarks/bench_pipeline.py --save benchmarks/baseline.json
+#   python benchmarks/bench_pipeline.py --compare benchmarks/baseline.json --tolerance 0.2
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_audio import FakePyAudio, clip_duration
+from mock_llm_server import start_mock_server
+from src.audio_capture import LoopbackRecorder
+from src.llm_client import LLMClient
+from src.markdown_renderer import MarkdownStreamRenderer
+from src.transcriber import SpeechTranscriber
+
+# Metrics where a larger value is a regression
+METRICS = ("transcribe_rtf", "ttft", "first_render", "turn_latency", "peak_rss_mb")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if the platform offers no cheap way"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def find_clips(limit=None):
+    clips = [os.path.join(PROJECT_ROOT, "interview.wav")]
+    clips += sorted(glob.glob(os.path.join(PROJECT_ROOT, "output", "*.wav")))
+    # Some archived recordings are empty or truncated
+    clips = [clip for clip in clips if clip_duration(clip) >= 0.5]
+    return clips[:limit] if limit else clips
+
+
+def run_scenario(clip, transcriber, llm_client, fps):
+    duration = clip_duration(clip)
+    recorder = LoopbackRecorder(device_index=0, audio_backend=lambda: FakePyAudio(clip))
+    recorder.start_recording(None)
+    recorder.record(duration=duration)
+    # The interviewer has stopped talking: everything from here on is latency the user sees
+    question_end = time.perf_counter()
+
+    audio = recorder.get_audio(trim=True)
+    start = time.perf_counter()
+    text = transcriber.transcribe_array(audio)
+    transcribe_time = time.perf_counter() - start
+
+    # The GUI path: deltas go into the renderer, a frame loop renders them at RENDER_FPS
+    renderer = MarkdownStreamRenderer()
+    first_token = []
+    first_render = []
+    done = threading.Event()
+
+    def on_delta(delta):
+        if not first_token:
+            first_token.append(time.perf_counter())
+        renderer.feed(delta)
+
+    def frame_loop():
+        while not done.is_set():
+            update = renderer.render()
+            if update and not first_render and (update[0] or update[1]):
+                first_render.append(time.perf_counter())
+            time.sleep(1.0 / fps)
+
+    frames = threading.Thread(target=frame_loop, daemon=True)
+    frames.start()
+    request_start = time.perf_counter()
+    llm_client.get_response(text or "Tell me about yourself.", callback=on_delta)
+    renderer.end_turn()
+    turn_end = time.perf_counter()
+    done.set()
+    frames.join()
+
+    return {
+        "clip": os.path.relpath(clip, PROJECT_ROOT),
+        "audio_seconds": round(duration, 3),
+        "transcribe_seconds": round(transcribe_time, 3),
+        "transcribe_rtf": round(transcribe_time / duration, 4),
+        "ttft": round(first_token[0] - request_start, 4) if first_token else None,
+        "first_render": round(first_render[0] - question_end, 4) if first_render else None,
+        "turn_latency": round(turn_end - question_end, 4),
+        "peak_rss_mb": round(peak_rss_mb() or 0, 1),
+        "text": text.strip(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions against a baseline result file"""
+    previous = {row["clip"]: row for row in baseline["scenarios"]}
+    regressions = []
+    for row in results["scenarios"]:
+        old = previous.get(row["clip"])
+        if not old:
+            continue
+        for metric in METRICS:
+            new_value, old_value = row.get(metric), old.get(metric)
+            if new_value is None or not old_value:
+                continue
+            if new_value > old_value * (1 + tolerance):
+                regressions.append(
+                    f"{row['clip']}: {metric} {old_value} -> {new_value} (+{(new_value / old_value - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark")
+    parser.add_argument("--clips", type=int, default=None, help="only use the first N clips")
+    parser.add_argument("--model", default=None, help="Whisper model size (default: config.ini)")
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare with a baseline JSON file and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    server = start_mock_server(first_token_delay=args.first_token_delay, tokens_per_second=args.tokens_per_second)
+    llm_client = LLMClient(api_url=server.base_url, api_key="mock", model="mock-model", cache=False, memory=False)
+    transcriber = SpeechTranscriber(args.model) if args.model else SpeechTranscriber()
+    # Model load and warm-up are startup costs, not part of a turn
+    transcriber.preload().join()
+    llm_client.warm_up(block=True)
+
+    results = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "model": transcriber.model_size,
+        "device": transcriber.device,
+        "mock_llm": {"first_token_delay": args.first_token_delay, "tokens_per_second": args.tokens_per_second},
+        "scenarios": [],
+    }
+    print(f"{'clip':<40} {'audio':>6} {'rtf':>6} {'ttft':>6} {'render':>7} {'turn':>7} {'rss MB':>7}")
+    for clip in find_clips(args.clips):
+        row = run_scenario(clip, transcriber, llm_client, args.fps)
+        results["scenarios"].append(row)
+        print(f"{row['clip']:<40} {row['audio_seconds']:>6.1f} {row['transcribe_rtf']:>6.3f} "
+              f"{row['ttft'] or 0:>6.3f} {row['first_render'] or 0:>7.3f} {row['turn_latency']:>7.3f} "
+              f"{row['peak_rss_mb']:>7.1f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"results written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Real-time factor and accuracy of the Whisper inference profiles (WHISPER_PROFILE)
+#
+# Every profile transcribes the same clip a few times. Accuracy is reported as word error rate
+# against a reference transcript: --reference if given, otherwise the output of "accurate".
+# Profiles change process-wide torch thread settings, so each one runs in its own process.
+#
+# Usage: python benchmarks/bench_profiles.py [--clip interview.wav] [--runs 3] [--reference "text"]
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def run_profile(profile, clip, model_size, runs):
+    """Runs inside a child process: load, warm up, then time `runs` transcriptions"""
+    from src.transcriber import SpeechTranscriber
+    from src.utils.audio import load_wav, WHISPER_SAMPLE_RATE
+
+    transcriber = SpeechTranscriber(model_size, profile=profile) if model_size else SpeechTranscriber(profile=profile)
+    start = time.perf_counter()
+    transcriber.preload().join()
+    load_seconds = time.perf_counter() - start
+    audio = load_wav(clip)
+    timings = []
+    text = ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = transcriber.decode(audio)["text"]
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "profile": profile,
+        "precision": transcriber.precision,
+        "load_seconds": round(load_seconds, 2),
+        "seconds": round(best, 3),
+        "rtf": round(best / (len(audio) / WHISPER_SAMPLE_RATE), 4),
+        "text": text.strip(),
+    }
+
+
+def main():
+    from src.transcriber import INFERENCE_PROFILES
+
+    parser = argparse.ArgumentParser(description="Compare Whisper inference profiles")
+    parser.add_argument("--clip", default=os.path.join(PROJECT_ROOT, "interview.wav"))
+    parser.add_argument("--model", default=None, help="Whisper model size (default: config.ini)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--reference", default=None, help="correct transcript of the clip")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_profile(args.child, args.clip, args.model, args.runs)))
+        return
+
+    results = {}
+    for profile in INFERENCE_PROFILES:
+        command = [sys.executable, __file__, "--child", profile, "--clip", args.clip, "--runs", str(args.runs)]
+        if args.model:
+            command += ["--model", args.model]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        results[profile] = json.loads(output.strip().splitlines()[-1])
+
+    reference = args.reference or results["accurate"]["text"]
+    baseline_wer = word_error_rate(reference, results["default"]["text"])
+    print(f"{'profile':<12} {'precision':<9} {'seconds':>8} {'RTF':>7} {'WER':>6} {'dWER':>7}")
+    for profile, row in results.items():
+        wer = word_error_rate(reference, row["text"])
+        print(f"{profile:<12} {row['precision']:<9} {row['seconds']:>8.3f} {row['rtf']:>7.3f} "
+              f"{wer:>6.1%} {wer - baseline_wer:>+7.1%}")
+    print(f"\nreference: {'--reference' if args.reference else 'accurate profile output'}")
+
+
+if __name__ == "__main__":
+    main()
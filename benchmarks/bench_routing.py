@@ -0,0 +1,77 @@
+# Time to first token across several LLM endpoints: three local mock servers with different
+# delay profiles stand in for a fast but spiky free-tier model, a slower steady one and a flaky
+# one. The same questions are asked with the spiky endpoint alone, with routing by moving
+# average of time to first token and error rate, and with first-token racing.
+#
+# Usage: python benchmarks/bench_routing.py [--requests 40] [--seed 1]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from mock_llm_server import start_mock_server
+from src.llm_client import LLMClient
+
+# name -> mock server options
+PROFILES = {
+    "spiky": {"first_token_delay": 0.15, "delay_jitter": 0.6},
+    "steady": {"first_token_delay": 0.4, "delay_jitter": 0.05},
+    "flaky": {"first_token_delay": 0.2, "delay_jitter": 0.1, "failure_rate": 0.3},
+}
+
+
+def measure(client, requests):
+    ttfts = []
+    failures = 0
+    for i in range(requests):
+        first = []
+        start = time.perf_counter()
+        try:
+            client.get_response(f"question {i}", callback=lambda delta: first or first.append(time.perf_counter() - start))
+        except Exception:
+            failures += 1
+            continue
+        if first:
+            ttfts.append(first[0])
+    return np.array(ttfts), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM endpoint routing and first-token racing")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    servers = {name: start_mock_server(tokens_per_second=400, seed=args.seed + i, **options)
+               for i, (name, options) in enumerate(PROFILES.items())}
+    endpoints = [(server.base_url, name, "mock") for name, server in servers.items()]
+    modes = {
+        "spiky only": dict(endpoints=endpoints[:1]),
+        "routed": dict(endpoints=endpoints),
+        "race": dict(endpoints=endpoints, race=True),
+    }
+
+    print(f"{'mode':<12} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7} {'failed':>7} {'requests sent':>14}")
+    for mode, options in modes.items():
+        sent = sum(server.requests for server in servers.values())
+        client = LLMClient(api_key="mock", cache=False, memory=False, max_retries=2, **options)
+        client.warm_up(block=True)
+        ttfts, failures = measure(client, args.requests)
+        sent = sum(server.requests for server in servers.values()) - sent
+        p50, p95, p99 = np.percentile(ttfts, [50, 95, 99])
+        print(f"{mode:<12} {p50:>6.2f}s {p95:>6.2f}s {p99:>6.2f}s {ttfts.max():>6.2f}s {failures:>7} {sent:>14}")
+        if mode != "spiky only":
+            print(f"{'':<12} {client.router.summary()}")
+        client.close()
+    for server in servers.values():
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
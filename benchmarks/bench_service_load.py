@@ -0,0 +1,215 @@
+# Load generator for the interview service (server.py): N simulated candidates each stream
+# questions cut from interview.wav to the service in real time over chunked HTTP uploads and
+# read the streamed answers. For every concurrency level it reports questions per second, the
+# transcription and first-token latency seen by the clients and the mean batch size of the
+# shared Whisper model. Sessions per core is the highest concurrency whose p95 transcription
+# latency stays under --target seconds, divided by the CPU cores of the box.
+#
+# By default a service is started twice with the mock LLM server, once decoding clips one by
+# one (--max-batch 1) and once batched, so the two can be compared.
+#
+# Usage: python benchmarks/bench_service_load.py [--levels 1,2,4,8] [--questions 3] [--target 2]
+#        python benchmarks/bench_service_load.py --url http://127.0.0.1:8765   (a running service)
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from mock_llm_server import start_mock_server
+from src.utils.audio import WHISPER_SAMPLE_RATE, load_wav
+
+CHUNK_SECONDS = 0.25
+
+
+def cut_questions(path, seconds):
+    """16-bit PCM pieces of `seconds` of the clip, each one question"""
+    audio = load_wav(path)
+    step = int(seconds * WHISPER_SAMPLE_RATE)
+    pieces = [audio[i:i + step] for i in range(0, len(audio), step)]
+    pieces = [piece for piece in pieces if len(piece) >= WHISPER_SAMPLE_RATE] or [audio]
+    return [(np.clip(piece, -1, 1) * 32767).astype(np.int16).tobytes() for piece in pieces]
+
+
+def request_json(url, method, path):
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=600)
+    try:
+        conn.request(method, path)
+        return json.loads(conn.getresponse().read() or b"{}")
+    finally:
+        conn.close()
+
+
+def ask(conn, session, pcm, speed):
+    """Upload one question chunk by chunk and read the answer; returns (transcript s, first token s)"""
+    conn.putrequest("POST", f"/sessions/{session}/audio?rate={WHISPER_SAMPLE_RATE}&channels=1")
+    conn.putheader("Content-Type", "application/octet-stream")
+    conn.putheader("Transfer-Encoding", "chunked")
+    conn.endheaders()
+    chunk = int(CHUNK_SECONDS * WHISPER_SAMPLE_RATE) * 2
+    start = time.perf_counter()
+    for i in range(0, len(pcm), chunk):
+        if speed:
+            # Real time: the interviewer is still talking
+            time.sleep(max(0.0, start + i / 2 / WHISPER_SAMPLE_RATE / speed - time.perf_counter()))
+        data = pcm[i:i + chunk]
+        conn.send(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+    conn.send(b"0\r\n\r\n")
+    uploaded = time.perf_counter()
+    response = conn.getresponse()
+    if response.status != 200:
+        raise RuntimeError(f"HTTP {response.status}: {response.read()[:200]}")
+    transcript = first_token = None
+    while True:
+        line = response.readline()
+        if not line:
+            break
+        event = json.loads(line)
+        now = time.perf_counter() - uploaded
+        if event["event"] == "transcript":
+            transcript = now
+        elif event["event"] == "delta" and first_token is None:
+            first_token = now
+        elif event["event"] == "error":
+            raise RuntimeError(event["error"])
+    response.read()
+    return transcript, first_token
+
+
+def run_session(url, questions, count, offset, speed, think, results):
+    parsed = urlparse(url)
+    session = request_json(url, "POST", "/sessions")["session"]
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=600)
+    try:
+        for i in range(count):
+            try:
+                results.append(ask(conn, session, questions[(offset + i) % len(questions)], speed))
+            except (OSError, RuntimeError, http.client.HTTPException) as e:
+                results.append(e)
+                conn.close()
+            time.sleep(think)
+    finally:
+        conn.close()
+        request_json(url, "DELETE", f"/sessions/{session}")
+
+
+def run_level(url, questions, sessions, args):
+    before = request_json(url, "GET", "/stats")
+    results = []
+    threads = [threading.Thread(target=run_session,
+                                args=(url, questions, args.questions, i, args.speed, args.think, results))
+               for i in range(sessions)]
+    start = time.perf_counter()
+    for i, thread in enumerate(threads):
+        thread.start()
+        # Candidates do not all start talking in the same 10 ms
+        time.sleep(args.stagger)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    after = request_json(url, "GET", "/stats")
+    done = [r for r in results if not isinstance(r, Exception)]
+    transcripts = np.array([r[0] for r in done if r[0] is not None] or [np.nan])
+    first_tokens = np.array([r[1] for r in done if r[1] is not None] or [np.nan])
+    batches = after["batches"] - before["batches"]
+    return {
+        "sessions": sessions,
+        "questions": len(done),
+        "failed": len(results) - len(done),
+        "per_second": len(done) / elapsed,
+        "transcript_p50": np.percentile(transcripts, 50),
+        "transcript_p95": np.percentile(transcripts, 95),
+        "first_token_p95": np.percentile(first_tokens, 95),
+        "mean_batch": (after["clips"] - before["clips"]) / batches if batches else 0.0,
+        "cores": after["cores"],
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_service(max_batch, llm_url):
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, os.path.join(PROJECT_ROOT, "server.py"), "--port", str(port),
+        "--max-batch", str(max_batch), "--llm-url", llm_url, "--no-cache",
+    ], cwd=PROJECT_ROOT)
+    url = f"http://127.0.0.1:{port}"
+    # The first start may download the Whisper model
+    deadline = time.perf_counter() + 900
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server.py exited with code {process.returncode}")
+        try:
+            request_json(url, "GET", "/stats")
+            return process, url
+        except OSError:
+            time.sleep(0.5)
+    process.kill()
+    raise RuntimeError("server.py did not start")
+
+
+def report(label, url, questions, args):
+    print(f"\n{label}")
+    print(f"{'sessions':>8} {'questions':>9} {'q/s':>6} {'transcript p50':>15} {'p95':>7} "
+          f"{'first token p95':>16} {'mean batch':>11} {'failed':>7}")
+    capacity = 0
+    cores = 1
+    for sessions in args.levels:
+        r = run_level(url, questions, sessions, args)
+        cores = r["cores"] or 1
+        print(f"{r['sessions']:>8} {r['questions']:>9} {r['per_second']:>6.2f} {r['transcript_p50']:>14.2f}s "
+              f"{r['transcript_p95']:>6.2f}s {r['first_token_p95']:>15.2f}s {r['mean_batch']:>11.2f} {r['failed']:>7}")
+        if r["failed"] == 0 and r["transcript_p95"] <= args.target:
+            capacity = sessions
+    print(f"sessions within p95 transcription {args.target:.1f}s: {capacity} on {cores} cores "
+          f"= {capacity / cores:.2f} sessions per core")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent sessions against the interview service")
+    parser.add_argument("--url", default=None, help="a running service; by default one is started per mode")
+    parser.add_argument("--clip", default=os.path.join(PROJECT_ROOT, "interview.wav"))
+    parser.add_argument("--levels", type=lambda v: [int(n) for n in v.split(",")], default=[1, 2, 4, 8])
+    parser.add_argument("--questions", type=int, default=3, help="questions per session")
+    parser.add_argument("--question-seconds", type=float, default=8.0)
+    parser.add_argument("--speed", type=float, default=1.0, help="upload speed, 1 is real time, 0 as fast as possible")
+    parser.add_argument("--think", type=float, default=1.0, help="seconds between the answer and the next question")
+    parser.add_argument("--stagger", type=float, default=0.2, help="seconds between session starts")
+    parser.add_argument("--target", type=float, default=2.0, help="p95 transcription latency budget, seconds")
+    parser.add_argument("--max-batch", type=int, default=8)
+    args = parser.parse_args()
+
+    questions = cut_questions(args.clip, args.question_seconds)
+    if args.url:
+        report(f"service at {args.url}", args.url, questions, args)
+        return
+
+    mock = start_mock_server(first_token_delay=0.2, tokens_per_second=200)
+    for label, max_batch in (("one clip at a time", 1), (f"batches of up to {args.max_batch}", args.max_batch)):
+        process, url = start_service(max_batch, mock.base_url)
+        try:
+            report(label, url, questions, args)
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Per-question transcription latency over an interview session: every clip (interview.wav and
+# the recordings in output/) is transcribed in a row, once statelessly with transcribe_array()
+# and once through a TranscriptionSession that pins the language after the first question,
+# carries the previous transcript over as prompt and reuses its mel buffers.
+# Long clips are cut into questions of --question-seconds.
+#
+# Usage: python benchmarks/bench_session.py [--limit 5] [--question-seconds 20] [--vocabulary "PyTorch, gRPC"]
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_pipeline import find_clips
+from src.transcriber import SpeechTranscriber, TranscriptionSession
+from src.utils.audio import load_wav, WHISPER_SAMPLE_RATE
+
+
+def questions(clips, question_seconds):
+    step = int(question_seconds * WHISPER_SAMPLE_RATE)
+    for clip in clips:
+        audio = load_wav(clip)
+        for start in range(0, len(audio), step):
+            piece = audio[start:start + step]
+            if len(piece) >= WHISPER_SAMPLE_RATE:
+                yield f"{os.path.basename(clip)}@{start // WHISPER_SAMPLE_RATE}s", piece
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stateless vs session transcription latency per question")
+    parser.add_argument("--limit", type=int, default=None, help="number of clips")
+    parser.add_argument("--question-seconds", type=float, default=20.0)
+    parser.add_argument("--language", default="", help="pin the language instead of detecting it")
+    parser.add_argument("--vocabulary", default="")
+    args = parser.parse_args()
+
+    transcriber = SpeechTranscriber()
+    transcriber.preload().join()
+    session = TranscriptionSession(transcriber, language=args.language, vocabulary=args.vocabulary)
+    items = list(questions(find_clips(args.limit), args.question_seconds))
+    if not items:
+        print("no clips found")
+        return
+
+    print(f"{'question':<32} {'seconds':>8} {'stateless':>10} {'session':>9} {'saved':>7}")
+    totals = [0.0, 0.0]
+    for name, audio in items:
+        start = time.perf_counter()
+        transcriber.transcribe_array(audio)
+        stateless = time.perf_counter() - start
+        start = time.perf_counter()
+        session.transcribe(audio)
+        stateful = time.perf_counter() - start
+        totals[0] += stateless
+        totals[1] += stateful
+        print(f"{name:<32} {len(audio) / WHISPER_SAMPLE_RATE:>7.1f}s {stateless:>9.2f}s {stateful:>8.2f}s "
+              f"{(1 - stateful / stateless) * 100:>6.0f}%")
+    print(f"{'total':<32} {'':>8} {totals[0]:>9.2f}s {totals[1]:>8.2f}s {(1 - totals[1] / totals[0]) * 100:>6.0f}%")
+    print(f"session language: {session.language or 'not locked'}")
+
+
+if __name__ == "__main__":
+    main()
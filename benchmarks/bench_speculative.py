@@ -0,0 +1,88 @@
+# Speculative LLM prefetch against the mock LLM server: scripted live transcripts grow word by
+# word (with pauses), then the final transcript arrives. Reports, per scenario, the time from the
+# final transcript to the first token with and without speculation, plus hit rate, wasted tokens
+# and latency saved.
+#
+# Usage: python benchmarks/bench_speculative.py [--first-token-delay 0.8] [--step 0.25]
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from mock_llm_server import start_mock_server
+from src.llm_client import LLMClient
+from src.speculative import SpeculativePrefetcher
+
+# (name, [(partial transcript, live updates it stays unchanged)], final transcript)
+SCENARIOS = [
+    ("question mark", [("How do you handle", 1), ("How do you handle overfitting in", 1),
+                       ("How do you handle overfitting in deep learning models?", 2)],
+     "How do you handle overfitting in deep learning models?"),
+    ("pause, then more", [("Tell me about your last project.", 4),
+                          ("Tell me about your last project. What was the hardest part?", 2)],
+     "Tell me about your last project. What was the hardest part?"),
+    ("final differs", [("Why did you choose PyTorch over", 1), ("Why did you choose PyTorch over TensorFlow?", 2)],
+     "Why did you choose JAX over TensorFlow for the ranking service?"),
+    ("no pause", [("Explain the difference between", 1), ("Explain the difference between bagging and boosting", 1)],
+     "Explain the difference between bagging and boosting"),
+]
+
+
+def first_token_after(start, run):
+    first = []
+
+    def callback(delta):
+        if not first:
+            first.append(time.perf_counter() - start)
+
+    run(callback)
+    return first[0] if first else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speculative LLM prefetch on partial transcripts")
+    parser.add_argument("--first-token-delay", type=float, default=0.8)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--step", type=float, default=0.25, help="seconds between live transcript updates")
+    args = parser.parse_args()
+
+    server = start_mock_server(first_token_delay=args.first_token_delay, tokens_per_second=args.tokens_per_second)
+    client = LLMClient(api_url=server.base_url, api_key="mock", model="mock-model", cache=False, memory=False)
+    client.warm_up(block=True)
+    prefetcher = SpeculativePrefetcher(client, min_pause=2 * args.step)
+
+    print(f"{'scenario':<18} {'baseline':>9} {'speculative':>12} {'result':>7}")
+    for name, partials, final in SCENARIOS:
+        baseline = first_token_after(time.perf_counter(), lambda cb: client.get_response(final, callback=cb))
+
+        prefetcher.reset()
+        hits, started = prefetcher.stats["hits"], prefetcher.stats["speculations"]
+        for text, updates in partials:
+            for _ in range(updates):
+                prefetcher.on_partial(text)
+                time.sleep(args.step)
+
+        def speculative(callback):
+            if prefetcher.resolve(final, callback=callback) is None:
+                client.get_response(final, callback=callback)
+
+        spec = first_token_after(time.perf_counter(), speculative)
+        if prefetcher.stats["hits"] > hits:
+            result = "hit"
+        else:
+            result = "miss" if prefetcher.stats["speculations"] > started else "none"
+        print(f"{name:<18} {baseline:>8.2f}s {spec:>11.2f}s {result:>7}")
+
+    time.sleep(args.first_token_delay)
+    print(prefetcher.summary())
+    stats = prefetcher.stats
+    print(f"{stats['speculations']} speculative requests, {server.tokens_sent} chunks sent by the server")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Startup benchmark: import time of each module and time from process start to the first paint
+# of the main window (plus the time until every background component reports ready).
+# Every measurement runs in a fresh interpreter, so nothing is cached between them.
+#
+# Usage: python benchmarks/bench_startup.py [--repeat 3] [--wait-ready]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = [
+    "src.utils.config_loader",
+    "src.markdown_renderer",
+    "src.audio_capture",
+    "src.llm_client",
+    "src.transcriber",
+    "main",
+]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+try:
+    __import__({module!r})
+    print(json.dumps({{"seconds": time.perf_counter() - start}}))
+except Exception as e:
+    print(json.dumps({{"error": f"{{type(e).__name__}}: {{e}}"}}))
+"""
+
+# Runs inside the child: build the window like main.py does and report the first paint
+PAINT_SCRIPT = """
+import json, sys, time
+spawned = float(sys.argv[1])
+wait_ready = sys.argv[2] == "1"
+from PyQt5 import QtCore, QtWidgets
+import main
+
+result = {}
+app = QtWidgets.QApplication(sys.argv[:1])
+
+class FirstPaint(QtCore.QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QtCore.QEvent.Paint and "first_paint" not in result:
+            result["first_paint"] = time.time() - spawned
+            if not wait_ready:
+                QtCore.QTimer.singleShot(0, app.quit)
+        return False
+
+window = main.InterviewAssistantGUI(main.MYCONFIG)
+paint_filter = FirstPaint()
+window.installEventFilter(paint_filter)
+
+def on_ready(component, state):
+    result[f"ready_{component}"] = time.time() - spawned
+    if wait_ready and all(s in ("ready", "failed") for s in window.readiness.values()):
+        QtCore.QTimer.singleShot(0, app.quit)
+
+window.component_ready.connect(on_ready)
+window.show()
+QtCore.QTimer.singleShot(120000, app.quit)
+app.exec_()
+print(json.dumps(result))
+"""
+
+
+def run_child(script, *args):
+    env = dict(os.environ)
+    # No display needed: render into an offscreen surface unless one is configured
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    output = subprocess.run(
+        [sys.executable, "-c", script, *args], cwd=PROJECT_ROOT, env=env,
+        capture_output=True, text=True, timeout=300,
+    )
+    lines = [line for line in output.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        return {"error": (output.stderr.strip().splitlines() or ["no output"])[-1]}
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time to first paint")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--wait-ready", action="store_true", help="also wait for Whisper and the LLM client")
+    args = parser.parse_args()
+
+    print(f"{'module':<28} {'import (median)':>16}")
+    for module in MODULES:
+        runs = [run_child(IMPORT_SCRIPT.format(module=module)) for _ in range(args.repeat)]
+        times = [run["seconds"] for run in runs if "seconds" in run]
+        if times:
+            print(f"{module:<28} {statistics.median(times) * 1000:>14.0f}ms")
+        else:
+            print(f"{module:<28} {'unavailable':>16}  ({runs[0]['error']})")
+
+    print()
+    results = []
+    for _ in range(args.repeat):
+        result = run_child(PAINT_SCRIPT, str(time.time()), "1" if args.wait_ready else "0")
+        if "error" in result:
+            print(f"window benchmark unavailable: {result['error']}")
+            return
+        results.append(result)
+    for key in sorted({key for result in results for key in result}):
+        values = [result[key] for result in results if key in result]
+        print(f"{key:<28} {statistics.median(values):>15.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Time to first audio of a spoken LLM reply: speaking the full answer after get_response()
+# returns versus SpeechStream speaking sentence by sentence while the reply streams in.
+# Uses the mock LLM server, the mock TTS backend and a fake real-time speaker, so it runs offline.
+#
+# Usage: python benchmarks/bench_tts_stream.py --tokens-per-second 30
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from mock_llm_server import start_mock_server
+from mock_tts import FakeSpeaker, MockTTSBackend
+from src.llm_client import LLMClient
+from src.speech_stream import SpeechStream
+from src.voice_generator import PlaybackEngine, TTSConfig, VoiceGenerator
+
+
+def make_voice(backend, cache_dir):
+    config = TTSConfig(cache_enabled=False, cache_path=os.path.join(cache_dir, "tts.sqlite3"))
+    return VoiceGenerator(config, backend=backend, engine=PlaybackEngine(audio_backend=FakeSpeaker))
+
+
+def run_full(client, voice):
+    """The old flow: wait for the whole answer, then speak it"""
+    start = time.perf_counter()
+    first_audio = []
+    reply = client.get_response("How do you handle overfitting?")
+    voice.speak(reply, on_start=lambda: first_audio.append(time.perf_counter() - start))
+    voice.wait()
+    return first_audio[0], time.perf_counter() - start
+
+
+def run_stream(client, voice):
+    stream = SpeechStream(voice)
+    stream.start()
+    start = stream.started
+    client.get_response("How do you handle overfitting?", callback=stream.feed)
+    stream.finish()
+    voice.wait()
+    return stream.first_audio, time.perf_counter() - start, len(stream.sentences)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first audio, full-text vs sentence streaming TTS")
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=30.0)
+    parser.add_argument("--tts-delay", type=float, default=0.25, help="mock synthesis latency per request")
+    args = parser.parse_args()
+
+    server = start_mock_server(first_token_delay=args.first_token_delay, tokens_per_second=args.tokens_per_second)
+    client = LLMClient(api_url=server.base_url, api_key="mock", model="mock-model", cache=False, memory=False)
+    client.warm_up(block=True)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        voice = make_voice(MockTTSBackend(first_chunk_delay=args.tts_delay), cache_dir)
+        full_first, full_total = run_full(client, voice)
+        voice.close()
+
+        FakeSpeaker.instances = []
+        voice = make_voice(MockTTSBackend(first_chunk_delay=args.tts_delay), cache_dir)
+        stream_first, stream_total, sentences = run_stream(client, voice)
+        voice.close()
+        gaps = [gap for speaker in FakeSpeaker.instances for gap in speaker.gaps]
+
+    print(f"{'mode':<10} {'first audio':>12} {'turn':>8}")
+    print(f"{'full':<10} {full_first:>11.2f}s {full_total:>7.2f}s")
+    print(f"{'stream':<10} {stream_first:>11.2f}s {stream_total:>7.2f}s")
+    print(f"{sentences} sentences, {len(gaps)} playback gaps, longest {max(gaps, default=0) * 1000:.0f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Event-loop stalls of the GUI during a transcription: a 10 ms QTimer measures how late the Qt
+# main thread gets to run while Whisper transcribes a clip, once called directly on the main
+# thread (how transcribe_audio used to work) and once as a job on the JobRunner pool.
+# A stall is what the user feels as input latency: clicks and key presses wait for it.
+#
+# Usage: python benchmarks/bench_ui_stall.py [--clip interview.wav] [--synthetic 3]
+#   --synthetic replaces Whisper with numpy work of about that many seconds
+# Exits with status 1 if the job mode stalls the event loop for more than STALL_MS, so the
+# script can gate a regression in CI (python benchmarks/bench_ui_stall.py --synthetic 3).
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt5 import QtCore, QtWidgets
+
+from src.jobs import JobRunner
+
+TICK_MS = 10
+STALL_MS = 50
+
+
+class StallMonitor:
+    """Records how much later than scheduled every tick of a QTimer fires"""
+    def __init__(self):
+        self.delays = []
+        self.timer = QtCore.QTimer()
+        self.timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.timer.timeout.connect(self._tick)
+        self.last = None
+
+    def start(self):
+        self.last = time.perf_counter()
+        self.timer.start(TICK_MS)
+
+    def stop(self):
+        self.timer.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.delays.append(max(0.0, (now - self.last) * 1000 - TICK_MS))
+        self.last = now
+
+
+def make_workload(args):
+    if args.synthetic:
+        def work():
+            end = time.perf_counter() + args.synthetic
+            matrix = np.random.rand(400, 400)
+            while time.perf_counter() < end:
+                matrix = np.linalg.qr(matrix)[0]
+            return "synthetic"
+        return work
+
+    from src.transcriber import SpeechTranscriber
+    from src.utils.audio import load_wav
+    transcriber = SpeechTranscriber()
+    transcriber.preload().join()
+    audio = load_wav(args.clip)
+    return lambda: transcriber.transcribe_array(audio)
+
+
+def run(app, mode, work):
+    monitor = StallMonitor()
+    runner = JobRunner()
+    done = []
+
+    def finish(_=None):
+        done.append(time.perf_counter())
+        # Keep measuring for a moment after the result arrived
+        QtCore.QTimer.singleShot(200, app.quit)
+
+    def begin():
+        if mode == "main-thread":
+            work()
+            finish()
+        else:
+            runner.submit("transcription", lambda job: work(), on_done=finish, on_error=finish)
+
+    monitor.start()
+    QtCore.QTimer.singleShot(200, begin)
+    app.exec_()
+    monitor.stop()
+    runner.shutdown()
+    delays = np.array(monitor.delays or [0.0])
+    return {
+        "max": delays.max(),
+        "p99": np.percentile(delays, 99),
+        "stalls": int((delays > STALL_MS).sum()),
+        "ticks": len(delays),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GUI event-loop stalls during a transcription")
+    parser.add_argument("--clip", default=os.path.join(PROJECT_ROOT, "interview.wav"))
+    parser.add_argument("--synthetic", type=float, default=None, help="seconds of numpy work instead of Whisper")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+    work = make_workload(args)
+    print(f"{'mode':<12} {'max stall':>10} {'p99':>8} {f'>{STALL_MS} ms':>8} {'ticks':>6}")
+    results = {}
+    for mode in ("main-thread", "job"):
+        result = results[mode] = run(app, mode, work)
+        print(f"{mode:<12} {result['max']:>8.0f}ms {result['p99']:>6.0f}ms {result['stalls']:>8} {result['ticks']:>6}")
+
+    # The main-thread run is the old behaviour for comparison, only the job mode must stay responsive
+    if results["job"]["max"] > STALL_MS:
+        print(f"\nRegression: the GUI stalled for {results['job']['max']:.0f} ms while a job ran (limit {STALL_MS} ms)")
+        sys.exit(1)
+    print(f"\nNo stall above {STALL_MS} ms in job mode")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Fake PyAudio backend that replays WAV files as if they came from a loopback device
+# Used by the benchmarks so they run without a sound card:
+#     LoopbackRecorder(device_index=0, audio_backend=lambda: FakePyAudio("interview.wav"))
+import threading
+import time
+import wave
+
+
+class FakeStream:
+    """Blocking input stream that returns the WAV frames at the speed of a real device"""
+    def __init__(self, wave_file, realtime=True):
+        self.wave_file = wave_file
+        self.rate = wave_file.getframerate()
+        self.frame_bytes = wave_file.getnchannels() * wave_file.getsampwidth()
+        self.realtime = realtime
+        self.frames_read = 0
+        self.started = None
+        self.finished_at = None
+        self.closed = False
+
+    def read(self, num_frames, exception_on_overflow=True):
+        if self.started is None:
+            self.started = time.perf_counter()
+        data = self.wave_file.readframes(num_frames)
+        if len(data) < num_frames * self.frame_bytes:
+            if self.finished_at is None:
+                self.finished_at = time.perf_counter()
+            # After the end of the clip the device delivers silence, like a quiet speaker
+            data += b"\x00" * (num_frames * self.frame_bytes - len(data))
+        self.frames_read += num_frames
+        if self.realtime:
+            delay = self.started + self.frames_read / self.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def start_callback(self, callback, frames_per_buffer):
+        """Callback mode: deliver blocks to `callback` from a separate thread, like PortAudio does"""
+        def _run():
+            while not self.closed:
+                data = self.read(frames_per_buffer)
+                callback(data, frames_per_buffer, {}, 0)
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakePyAudio:
+    """Implements the part of the pyaudiowpatch.PyAudio interface used by LoopbackRecorder
+
+    With `mic_path` a second device (index 1) replays that file as the microphone, for testing
+    dual-source capture with synthetic input.
+    """
+    def __init__(self, path, realtime=True, name="Fake loopback device", mic_path=None):
+        self.path = path
+        self.realtime = realtime
+        self.streams = []
+        self.devices = [self._device_info(0, path, name, True)]
+        if mic_path:
+            self.devices.append(self._device_info(1, mic_path, "Fake microphone", False))
+        self.device_info = self.devices[0]
+
+    @staticmethod
+    def _device_info(index, path, name, loopback):
+        with wave.open(path, "rb") as wave_file:
+            return {
+                "index": index,
+                "name": name,
+                "defaultSampleRate": float(wave_file.getframerate()),
+                "maxInputChannels": wave_file.getnchannels(),
+                "maxOutputChannels": 0,
+                "isLoopbackDevice": loopback,
+                "sampwidth": wave_file.getsampwidth(),
+                "path": path,
+            }
+
+    def get_default_wasapi_loopback(self):
+        return self.device_info
+
+    def get_default_input_device_info(self):
+        if len(self.devices) < 2:
+            raise OSError("No fake microphone")
+        return self.devices[1]
+
+    def get_device_info_by_index(self, index):
+        if not 0 <= index < len(self.devices):
+            raise LookupError(f"No fake device with index {index}")
+        return self.devices[index]
+
+    def get_device_count(self):
+        return len(self.devices)
+
+    def get_sample_size(self, format):
+        return self.device_info["sampwidth"]
+
+    def open(self, format=None, channels=None, rate=None, input=False, input_device_index=None,
+             frames_per_buffer=1024, **kwargs):
+        path = self.get_device_info_by_index(input_device_index or 0)["path"]
+        stream = FakeStream(wave.open(path, "rb"), realtime=self.realtime)
+        self.streams.append(stream)
+        if kwargs.get("stream_callback"):
+            stream.start_callback(kwargs["stream_callback"], frames_per_buffer)
+        return stream
+
+    def terminate(self):
+        for stream in self.streams:
+            stream.close()
+        self.streams = []
+
+
+def clip_duration(path):
+    """Length of a WAV file in seconds, or 0 if it cannot be read"""
+    try:
+        with wave.open(path, "rb") as wave_file:
+            return wave_file.getnframes() / wave_file.getframerate()
+    except (EOFError, wave.Error):
+        return 0.0
@@ -0,0 +1,185 @@
+# Local OpenAI-compatible stand-in server for offline testing and benchmarks
+# Usage: python benchmarks/mock_llm_server.py --port 8001 --first-token-delay 0.5 --tokens-per-second 40
+# Then point API_URL at http://127.0.0.1:8001/v1
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "To handle **overfitting** I first compare training and validation loss.\n\n"
+    "- Use early stopping on the validation set.\n"
+    "- Add L2 regularization and dropout.\n"
+    "- Collect more data or augment the existing data.\n\n"
+    "Finally I check the model with cross-validation before deploying it."
+)
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, first_token_delay=0.2, tokens_per_second=50.0, reply=DEFAULT_REPLY,
+                 fail_first=0, drop_first=0, delay_jitter=0.0, failure_rate=0.0, seed=None):
+        super().__init__(address, MockLLMHandler)
+        self.first_token_delay = first_token_delay
+        self.tokens_per_second = tokens_per_second
+        self.reply = reply
+        # The first `fail_first` requests get HTTP 500, the next `drop_first` are closed before any token
+        self.fail_first = fail_first
+        self.drop_first = drop_first
+        # Every request waits an extra exponentially distributed delay with mean `delay_jitter`
+        # seconds (a long tail, like a busy free-tier model); `failure_rate` of requests get HTTP 503
+        self.delay_jitter = delay_jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.tokens_sent = 0
+
+    def handle_error(self, request, client_address):
+        # A client that aborts a stream resets the connection, that is expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def next_request(self):
+        with self.lock:
+            self.requests += 1
+            return self.requests
+
+    def draw(self):
+        """(first token delay, injected failure) of one request"""
+        with self.lock:
+            jitter = self.random.expovariate(1 / self.delay_jitter) if self.delay_jitter else 0.0
+            return self.first_token_delay + jitter, self.random.random() < self.failure_rate
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-model", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        server = self.server
+        n = server.next_request()
+        first_token_delay, fail = server.draw()
+        if n <= server.fail_first:
+            self._send_json(500, {"error": {"message": "injected failure"}})
+            return
+        if fail:
+            time.sleep(first_token_delay / 2)
+            self._send_json(503, {"error": {"message": "injected random failure"}})
+            return
+        if n <= server.fail_first + server.drop_first:
+            time.sleep(first_token_delay)
+            self.close_connection = True
+            self.connection.close()
+            return
+
+        tokens = [server.reply[i:i + 4] for i in range(0, len(server.reply), 4)]
+        model = request.get("model", "mock-model")
+        if not request.get("stream"):
+            time.sleep(first_token_delay + len(tokens) / server.tokens_per_second)
+            self._send_json(200, {
+                "id": f"mock-{n}", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": server.reply}}],
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            time.sleep(first_token_delay)
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(1.0 / server.tokens_per_second)
+                chunk = {
+                    "id": f"mock-{n}", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                with server.lock:
+                    server.tokens_sent += 1
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream
+            self.close_connection = True
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_mock_server(port=0, **options):
+    """Start a MockLLMServer on 127.0.0.1 in a daemon thread and return it"""
+    server = MockLLMServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock LLM server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--drop-first", type=int, default=0)
+    parser.add_argument("--delay-jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = MockLLMServer(
+        ("127.0.0.1", args.port),
+        first_token_delay=args.first_token_delay,
+        tokens_per_second=args.tokens_per_second,
+        fail_first=args.fail_first,
+        drop_first=args.drop_first,
+        delay_jitter=args.delay_jitter,
+        failure_rate=args.failure_rate,
+    )
+    print(f"Mock LLM server listening on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,90 @@
+# Offline stand-ins for text-to-speech: a synthesis backend that generates tones instead of
+# calling edge-tts, and a fake speaker that plays PCM at real-time speed.
+#     VoiceGenerator(backend=MockTTSBackend(), engine=PlaybackEngine(audio_backend=FakeSpeaker))
+import threading
+import time
+
+import numpy as np
+
+# Scheduling jitter of a few milliseconds is absorbed by a real device's buffer
+GAP_THRESHOLD = 0.02
+
+
+class MockTTSBackend:
+    """Returns a tone of `seconds_per_char` per character as s16le PCM.
+
+    `first_chunk_delay` simulates the service latency before the first audio arrives, the
+    rest is delivered at `realtime_factor` times playback speed.
+    """
+    encoding = "pcm"
+
+    def __init__(self, sample_rate=24000, first_chunk_delay=0.25, seconds_per_char=0.06,
+                 realtime_factor=5.0, chunk_seconds=0.2):
+        self.sample_rate = sample_rate
+        self.first_chunk_delay = first_chunk_delay
+        self.seconds_per_char = seconds_per_char
+        self.realtime_factor = realtime_factor
+        self.chunk_seconds = chunk_seconds
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize(self, text, voice):
+        with self._lock:
+            self.calls += 1
+        seconds = max(0.2, len(text.strip()) * self.seconds_per_char)
+        t = np.arange(int(seconds * self.sample_rate)) / self.sample_rate
+        pcm = (0.2 * np.sin(2 * np.pi * 440 * t) * 32767).astype(np.int16).tobytes()
+        time.sleep(self.first_chunk_delay)
+        step = int(self.chunk_seconds * self.sample_rate) * 2
+        for start in range(0, len(pcm), step):
+            if start:
+                time.sleep(self.chunk_seconds / self.realtime_factor)
+            yield pcm[start:start + step]
+
+
+class FakeOutputStream:
+    def __init__(self, speaker, rate, channels):
+        self.speaker = speaker
+        self.rate = rate
+        self.frame_bytes = channels * 2
+        self.played = 0.0
+        self.started = None
+
+    def write(self, data):
+        # Blocks like a real device: the write returns when the previous audio has played
+        now = time.perf_counter()
+        if self.started is None or now > self.started + self.played:
+            # The device ran dry before this write; count gaps that are audible
+            gap = now - (self.started + self.played) if self.started is not None else 0
+            if gap > GAP_THRESHOLD:
+                self.speaker.gaps.append(gap)
+            self.started = now - self.played
+        self.speaker.writes.append((now, len(data)))
+        self.played += len(data) / self.frame_bytes / self.rate
+        delay = self.started + self.played - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeSpeaker:
+    """Implements the output part of the pyaudiowpatch.PyAudio interface used by PlaybackEngine"""
+    instances = []
+
+    def __init__(self):
+        self.opened = 0
+        self.writes = []   # (perf_counter, bytes)
+        self.gaps = []     # seconds of silence between writes after playback had started
+        FakeSpeaker.instances.append(self)
+
+    def open(self, format=None, channels=1, rate=24000, output=False, **kwargs):
+        self.opened += 1
+        return FakeOutputStream(self, rate, channels)
+
+    def terminate(self):
+        pass
@@ -1,42 +1,25 @@
+import time
+# Time origin of the boot sequence, shown next to every readiness indicator
+BOOT_START = time.perf_counter()
 import sys
 import threading
-import time
 import ctypes
 
 from PyQt5 import QtWidgets, QtCore, QtGui
 from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QMainWindow, QWidget, QGridLayout, QPushButton, QCheckBox, QTextBrowser, QLabel
 
-import markdown2  # please use pip install markdown2 to install thsi package
-
-from src.audio_capture import LoopbackRecorder
-from src.transcriber import SpeechTranscriber
-from src.llm_client import LLMClient
+# Only light modules are imported here. Audio capture (numpy, PyAudio), Whisper (torch) and the
+# OpenAI client are imported by the boot threads after the window is on screen.
+from src.markdown_renderer import MarkdownStreamRenderer
+from src.jobs import JobRunner, JobCancelled
+from src.speech_stream import SpeechStream
+from src.utils.metrics import TRACER
+from src.utils.config_loader import get_config
 import os
-import configparser
 
-#Get the absolute path of the current file, go up one level, use the absolute path to find config.ini and read it
-
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = current_dir
-config_path = os.path.join(project_root, 'config.ini')
-MYCONFIG = configparser.ConfigParser()
-MYCONFIG.read(config_path,encoding='utf-8')
-
-#
-class RecorderThread(threading.Thread):
-    def __init__(self, recorder, filename, duration=None):
-        super().__init__()
-        self.recorder = recorder
-        self.filename = filename
-        self.duration = duration
-
-    def run(self):
-        try:
-            self.recorder.start_recording(self.filename)
-            self.recorder.record(duration=self.duration)
-        finally:
-            self.recorder._cleanup()  # Free up resources in the same thread
+# config.ini is parsed once per process and shared with every module in src/
+MYCONFIG = get_config()
 
 # Leverage Windows APIs to prevent screen capture
 def prevent_screen_capture(winId):
@@ -47,6 +30,13 @@ def prevent_screen_capture(winId):
         print("Screen saver setting failed:",e)
 
 class InterviewAssistantGUI(QMainWindow):
+    # Emitted from the recording thread when voice activity detection ends the question
+    recording_auto_stopped = QtCore.pyqtSignal()
+    # Emitted from the LLM thread with the Markdown footer once a reply is complete
+    llm_turn_finished = QtCore.pyqtSignal(str)
+    # Emitted from the boot threads: (component, state)
+    component_ready = QtCore.pyqtSignal(str, str)
+
     def __init__(self,config):
         super().__init__()
         self.setWindowTitle("Dev AI")
@@ -60,24 +50,39 @@ class InterviewAssistantGUI(QMainWindow):
         
       # State variables and module initialization
         self.recorder = None
-        self.recording_thread = None
+        self.live_transcriber = None
+        # Recording, Whisper and LLM calls run as jobs on a worker pool; results and progress
+        # come back as signals, so the main thread only ever updates widgets
+        self.jobs = JobRunner(parent=self)
         self.current_filename = ""
-        self.llm_full_text = ""
+        # Streamed replies are rendered incrementally at a fixed frame rate, see render_llm_frame
+        self.md_renderer = MarkdownStreamRenderer()
+        self._tail_start = 0
         self.llm_client_ask_cnt = 1
         self.default_prompt = MYCONFIG['DEFAULT']['DEFAULT_PROMPT']
         
-        self.transcriber = SpeechTranscriber()
-        self.llm_client = LLMClient()  # Replace with your API key
+        # Created by the boot threads (see start_boot) once the window is visible
+        self.transcriber = None
+        self.transcription_session = None
+        self.llm_client = None
+        self.speech_stream = None
+        self.prefetcher = None
+        # ResponseHandle of the reply that is streaming, see stop_llm
+        self.llm_handle = None
+        self.capture_engine = None
+        self.readiness = {"audio": "loading", "whisper": "loading", "LLM": "loading"}
 
 # Buttons & Controls
         self.start_btn = QPushButton("Start recording")
         self.start_btn.clicked.connect(self.start_recording)
+        self.start_btn.setEnabled(False)
         layout.addWidget(self.start_btn, 0, 0)
         
         self.stop_btn = QPushButton("End Recording")
         self.stop_btn.clicked.connect(self.stop_recording)
         self.stop_btn.setEnabled(False)
         layout.addWidget(self.stop_btn, 0, 1)
+        self.recording_auto_stopped.connect(self.stop_recording)
         
         self.transcribe_btn = QPushButton("Transfer text")
         self.transcribe_btn.clicked.connect(self.transcribe_audio)
@@ -102,7 +107,12 @@ class InterviewAssistantGUI(QMainWindow):
         self.auto_scroll_chk.setChecked(True)
         #Put it in the third column of the first row
 
-        layout.addWidget(self.auto_scroll_chk, 1, 2,1,2)
+        layout.addWidget(self.auto_scroll_chk, 1, 2)
+
+        # Transcribe while recording so the text is almost ready when the question ends
+        self.live_transcribe_chk = QCheckBox("Live transcription while recording")
+        self.live_transcribe_chk.setChecked(True)
+        layout.addWidget(self.live_transcribe_chk, 1, 3)
         
         # Transcribe the text display area
 
@@ -130,9 +140,43 @@ class InterviewAssistantGUI(QMainWindow):
         # Sets the slider behavior: the slider automatically scrolls to the latest llm_response output when it is at the bottom
 
         self.llm_response_browser.textChanged.connect(self.auto_scroll_llm_response)
+        self.llm_turn_finished.connect(self.finish_llm_turn)
+        self.render_timer = QTimer(self)
+        self.render_timer.timeout.connect(self.render_llm_frame)
+        self.render_timer.start(int(1000 / MYCONFIG['DEFAULT'].getint('RENDER_FPS', fallback=30)))
         
         self.status_label = QLabel("ready")
-        layout.addWidget(self.status_label, 4, 0, 1, 4)
+        layout.addWidget(self.status_label, 4, 0, 1, 2)
+        self.jobs.job_progress.connect(self.show_job_progress)
+        self.jobs.job_failed.connect(self.show_job_failure)
+
+        # Ends the reply that is streaming: closes the HTTP stream and stops speaking
+        self.stop_llm_btn = QPushButton("Stop answer")
+        self.stop_llm_btn.clicked.connect(self.stop_llm)
+        self.stop_llm_btn.setEnabled(False)
+        layout.addWidget(self.stop_llm_btn, 4, 2)
+        for signal in (self.jobs.job_finished, self.jobs.job_failed, self.jobs.job_cancelled):
+            signal.connect(self.update_stop_llm_btn)
+            signal.connect(self.update_start_btn)
+
+        # The candidate's own microphone channel (CAPTURE_MIC) is only transcribed on request
+        self.mic_transcribe_btn = QPushButton("Transcribe my answer")
+        self.mic_transcribe_btn.clicked.connect(self.transcribe_mic)
+        self.mic_transcribe_btn.setEnabled(False)
+        layout.addWidget(self.mic_transcribe_btn, 4, 3)
+
+        # Readiness of the components that load in the background
+        self.ready_label = QLabel()
+        layout.addWidget(self.ready_label, 5, 0, 1, 3)
+
+        # PortAudio only sees new or switched devices after re-initialisation, which the user triggers
+        self.refresh_devices_btn = QPushButton("Refresh audio devices")
+        self.refresh_devices_btn.clicked.connect(self.refresh_devices)
+        layout.addWidget(self.refresh_devices_btn, 5, 3)
+        self.component_ready.connect(self.update_readiness)
+        self.update_readiness("", "")
+        # Start loading only after the first paint, so the window never shows up blank
+        QTimer.singleShot(0, self.start_boot)
         
         # Invoke anti-screen capture settings after the window is displayed (valid on Windows only)
 
@@ -148,17 +192,177 @@ class InterviewAssistantGUI(QMainWindow):
         if sys.platform.startswith("win"):
             prevent_screen_capture(self.winId())
     
+    def start_boot(self):
+        # Whisper (torch) and the OpenAI client load in parallel
+        threading.Thread(target=self._boot_audio_and_whisper, daemon=True).start()
+        threading.Thread(target=self._boot_llm, daemon=True).start()
+
+    def _boot_audio_and_whisper(self):
+        try:
+            from src.audio_capture import CaptureEngine
+            # The loopback stream stays open for the whole session, so a recording starts instantly
+            # and includes the last PREROLL_SECONDS before the click
+            if MYCONFIG['DEFAULT'].getboolean('ALWAYS_ON_CAPTURE', fallback=True):
+                engine = CaptureEngine(device_index=MYCONFIG['DEFAULT'].getint('SPEAKER_DEVICE_INDEX'))
+                try:
+                    engine.start()
+                    self.capture_engine = engine
+                except Exception as e:
+                    # Fall back to opening a stream per recording
+                    print(f"Capture engine unavailable: {e}")
+            self.component_ready.emit("audio", "ready")
+        except Exception as e:
+            print(f"Audio capture unavailable: {e}")
+            self.component_ready.emit("audio", "failed")
+            return
+        try:
+            from src.transcriber import SpeechTranscriber, TranscriptionSession
+            self.transcriber = SpeechTranscriber()
+            # Language and context carry over from one question to the next
+            self.transcription_session = TranscriptionSession(self.transcriber)
+            self.component_ready.emit("whisper", "loading model")
+            # The model loads and warms up while recording is already possible
+            self.transcriber.preload().join()
+            self.component_ready.emit("whisper", "ready" if self.transcriber.is_ready else "failed")
+        except Exception as e:
+            print(f"Whisper unavailable: {e}")
+            self.component_ready.emit("whisper", "failed")
+
+    def _boot_llm(self):
+        try:
+            from src.llm_client import LLMClient
+            self.llm_client = LLMClient()  # Replace with your API key
+            self.llm_client.warm_up()
+            # Start answering once the live transcript looks like a complete question
+            if MYCONFIG['DEFAULT'].getboolean('LLM_SPECULATIVE', fallback=False):
+                from src.speculative import SpeculativePrefetcher
+                self.prefetcher = SpeculativePrefetcher(self.llm_client, system_prompt=self.default_prompt)
+            # Replies are spoken sentence by sentence while they stream in
+            if MYCONFIG['DEFAULT'].getboolean('TTS_ENABLED', fallback=False):
+                from src.voice_generator import VoiceGenerator
+                self.speech_stream = SpeechStream(VoiceGenerator())
+            self.component_ready.emit("LLM", "ready")
+        except Exception as e:
+            print(f"LLM client unavailable: {e}")
+            self.component_ready.emit("LLM", "failed")
+
+    def update_readiness(self, component, state):
+        if component:
+            self.readiness[component] = state
+            TRACER.record(f"boot_{component.lower()}", time.perf_counter() - BOOT_START, state=state)
+        elapsed = time.perf_counter() - BOOT_START
+        self.ready_label.setText(
+            " | ".join(f"{name}: {state}" for name, state in self.readiness.items()) + f"  ({elapsed:.1f}s)"
+        )
+        self.update_start_btn()
+
+    def update_start_btn(self, *args):
+        # Recording needs audio capture and a transcriber; the model itself may still be loading
+        can_record = self.readiness["audio"] == "ready" and self.transcriber is not None
+        # The previous recording's Whisper work has to end before a new live transcriber starts,
+        # the final decode of live.finish() cannot be interrupted
+        busy = (self.stop_btn.isEnabled() or self.jobs.running("recording") or self.jobs.running("devices")
+                or self.jobs.running(lane="whisper"))
+        self.start_btn.setEnabled(can_record and not busy)
+
+    def show_job_progress(self, job_id, kind, progress, message):
+        self.status_label.setText(f"{message} ({progress:.0%})" if 0 < progress < 1 else message)
+
+    def show_job_failure(self, job_id, kind, error):
+        self.status_label.setText(f"{kind} failed: {error}")
+
+    def update_stop_llm_btn(self, job_id, kind, *args):
+        if kind == "llm":
+            self.stop_llm_btn.setEnabled(bool(self.jobs.running("llm")))
+
+    def stop_llm(self):
+        if self.llm_handle:
+            self.llm_handle.cancel()
+        self.jobs.cancel("llm")
+        if self.speech_stream:
+            self.speech_stream.cancel()
+
+    def closeEvent(self, event):
+        self.jobs.shutdown()
+        if self.capture_engine:
+            self.capture_engine.close()
+        super().closeEvent(event)
+
+    def refresh_devices(self):
+        if self.capture_engine is None:
+            self.status_label.setText("devices are looked up on every recording, nothing to refresh")
+            return
+        if self.stop_btn.isEnabled():
+            self.status_label.setText("end the recording before refreshing the audio devices")
+            return
+        self.refresh_devices_btn.setEnabled(False)
+        self.jobs.submit(
+            "devices", lambda job: self.capture_engine.refresh_devices(),
+            on_done=self.devices_refreshed, on_error=self.devices_refreshed,
+        )
+        self.update_start_btn()
+
+    def devices_refreshed(self, result):
+        self.refresh_devices_btn.setEnabled(True)
+        if isinstance(result, Exception):
+            self.status_label.setText(f"refreshing audio devices failed: {result}")
+        elif result:
+            self.status_label.setText(f"audio devices changed, capturing from {self.capture_engine.device_info['name']}")
+        else:
+            self.status_label.setText("audio devices unchanged")
+
     def start_recording(self):
+        from src.audio_capture import LoopbackRecorder, AudioBuffer, VoiceActivityDetector
+        from src.transcriber import StreamingTranscriber
+        if self.jobs.running(lane="whisper"):
+            # Whisper jobs cannot be interrupted mid-decode; Start is re-enabled once they are done
+            self.status_label.setText("waiting for the previous transcription to finish")
+            self.start_btn.setEnabled(False)
+            return
         try:
             # Generate a unique file name for each recording
             filename = f"interview_{int(time.time())}.wav"
             #splicing MYCONFIG['DEFAULT']['OUTPUT_DIR']和filename
             filename = os.path.join(MYCONFIG['DEFAULT']['OUTPUT_DIR'],filename)
+            # The WAV copy is only an archive, transcription works on the in-memory audio
+            if not MYCONFIG['DEFAULT'].getboolean('SAVE_RECORDINGS', fallback=True):
+                filename = None
             print(f"start recording: {filename}")
-            self.recorder = LoopbackRecorder(device_index=MYCONFIG['DEFAULT'].getint('SPEAKER_DEVICE_INDEX'))
+            # A new question stops talking when the next question starts
+            self.stop_llm()
+            if self.prefetcher:
+                self.prefetcher.reset()
+            vad = None
+            if MYCONFIG['DEFAULT'].getboolean('VAD_ENABLED', fallback=True):
+                vad = VoiceActivityDetector.from_config(MYCONFIG['DEFAULT'])
+            self.recorder = LoopbackRecorder(
+                device_index=MYCONFIG['DEFAULT'].getint('SPEAKER_DEVICE_INDEX'),
+                vad=vad,
+                on_auto_stop=self.recording_auto_stopped.emit,
+                engine=self.capture_engine,
+            )
             device_info = self.recorder.device_info
-            self.recording_thread = RecorderThread(self.recorder, filename)
-            self.recording_thread.start()
+            audio_buffer = None
+            if self.live_transcriber:
+                # The previous recording was never transcribed, do not leave its Whisper loop running
+                self.live_transcriber.stop()
+            self.live_transcriber = None
+            if self.live_transcribe_chk.isChecked():
+                audio_buffer = AudioBuffer()
+                self.transcription_browser.clear()
+                self.live_transcriber = StreamingTranscriber(
+                    self.transcriber, audio_buffer, callback=self.update_live_transcription,
+                    session=self.transcription_session,
+                )
+            self.jobs.submit(
+                "recording", self._record_job, self.recorder, filename, audio_buffer,
+                on_done=self.recording_finished, on_error=self.recording_failed,
+            )
+            if self.live_transcriber:
+                self.live_transcriber.start()
+            # Get the LLM connection hot while the question is being asked
+            if self.llm_client:
+                self.llm_client.warm_up()
             self.current_filename = filename
             self.status_label.setText(f"recording...device：({device_info['index']})({device_info['name']})")
             self.start_btn.setEnabled(False)
@@ -167,79 +371,187 @@ class InterviewAssistantGUI(QMainWindow):
             print(f"failed to start recording: {e}")
             self.status_label.setText("failed to start recording")
     
-    def stop_recording(self):
+    def _record_job(self, job, recorder, filename, audio_buffer):
         try:
-            self.recorder.is_recording = False
-            self.start_btn.setEnabled(True)
-            self.stop_btn.setEnabled(False)
-            # If the saved file size is 0, the recording failed
-            if os.path.getsize(self.current_filename) < 1:
-                self.status_label.setText("Recording failed：the file size may be no audio input and output")
-                return
-            self.recording_thread.join()
-            self.status_label.setText("recording has stopped")
-
-            self.transcribe_btn.setEnabled(True)
-            if self.auto_transcribe_chk.isChecked():
-                self.transcribe_audio()
+            recorder.start_recording(filename, audio_buffer=audio_buffer)
+            recorder.record()
+        finally:
+            recorder._cleanup()  # Free up resources in the same thread
+        return recorder
 
-        except Exception as e:
-            print(f"failed to stop recording: {e}")
-            self.status_label.setText("failed to stop recording")
+    def stop_recording(self):
+        # Both the button and the silence auto-stop can end the same recording
+        if not self.stop_btn.isEnabled():
+            return
+        # The recording job ends on its own once the flag is cleared, see recording_finished
+        self.recorder.is_recording = False
+        self.stop_btn.setEnabled(False)
+        self.status_label.setText("stopping recording...")
+
+    def recording_finished(self, recorder):
+        if recorder is not self.recorder:
+            return
+        self.stop_btn.setEnabled(False)
+        self.update_start_btn()
+        # If nothing was captured, the recording failed
+        if recorder.audio_buffer is None or recorder.audio_buffer.duration() == 0:
+            self.status_label.setText("Recording failed：the file size may be no audio input and output")
+            return
+        self.status_label.setText("recording has stopped")
+        self.mic_transcribe_btn.setEnabled(recorder.mic_buffer is not None)
+
+        self.transcribe_btn.setEnabled(True)
+        if self.auto_transcribe_chk.isChecked():
+            self.transcribe_audio()
+
+    def recording_failed(self, error):
+        print(f"recording failed: {error}")
+        self.stop_btn.setEnabled(False)
+        self.update_start_btn()
+
+    def update_live_transcription(self, text):
+        if self.prefetcher:
+            self.prefetcher.on_partial(text)
+        # Called from the live transcription thread, so hand the update over to the Qt main thread
+        QtCore.QMetaObject.invokeMethod(
+            self.transcription_browser, "setPlainText", QtCore.Qt.QueuedConnection, QtCore.Q_ARG(str, text)
+        )
 
-    
     def transcribe_audio(self):
-        self.transcription_browser.clear()
-        self.status_label.setText("translating...")
-        try:
-            text = self.transcriber.transcribe(self.current_filename)
-            self.transcription_browser.setPlainText(text)
-            self.status_label.setText("transcription completed")
-            self.send_llm_btn.setEnabled(True)
-            self.transcribe_btn.setEnabled(False)
-            if self.auto_send_llm_chk.isChecked():
-                self.send_to_llm()
-        except Exception as e:
-            print(f"transcription failed: {e}")
-            self.transcription_browser.setPlainText(f"transcription failed: {e}\n")
-    
+        self.transcribe_btn.setEnabled(False)
+        live, self.live_transcriber = self.live_transcriber, None
+        if live is None:
+            self.transcription_browser.clear()
+        # Everything that runs the shared Whisper model queues on one lane
+        self.jobs.submit(
+            "transcription", self._transcribe_job, self.recorder, live, lane="whisper",
+            on_done=self.transcription_finished, on_error=self.transcription_failed,
+        )
+        self.update_start_btn()
+
+    def _transcribe_job(self, job, recorder, live):
+        job.report(0, "translating...")
+        if live is not None:
+            # Most of the audio was already transcribed while recording, only the tail is left
+            text = live.finish()
+        else:
+            audio = recorder.get_audio(trim=True)
+            job.report(0.1, "translating...")
+            text = self.transcription_session.transcribe(audio)
+        # A newer question may have arrived while Whisper was busy
+        job.check()
+        return text
+
+    def transcription_finished(self, text):
+        self.transcription_browser.setPlainText(text)
+        self.status_label.setText("transcription completed")
+        self.send_llm_btn.setEnabled(True)
+        if self.auto_send_llm_chk.isChecked():
+            self.send_to_llm()
+
+    def transcription_failed(self, error):
+        print(f"transcription failed: {error}")
+        self.transcription_browser.setPlainText(f"transcription failed: {error}\n")
+        self.transcribe_btn.setEnabled(True)
+
+    def transcribe_mic(self):
+        self.mic_transcribe_btn.setEnabled(False)
+        # Queued behind the loopback transcription instead of decoding alongside it
+        self.jobs.submit(
+            "mic", self._transcribe_mic_job, self.recorder, lane="whisper",
+            on_done=self.show_mic_transcription, on_error=lambda e: self.show_mic_transcription(f"transcription failed: {e}"),
+        )
+        self.update_start_btn()
+
+    def _transcribe_mic_job(self, job, recorder):
+        job.report(0, "transcribing my answer...")
+        return self.transcriber.transcribe_array(recorder.get_audio(trim=True, source="mic"))
+
+    def show_mic_transcription(self, text):
+        # Shown below the question but not part of it unless the user edits it in
+        self.transcription_browser.append(f"\n[me] {text.strip()}")
+
     def send_to_llm(self):
-        self.status_label.setText("LLM thinking...")
-        self.llm_response_browser.clear()
+        # Earlier replies stay in the reply box, their HTML is cached by the renderer
         transcription = self.transcription_browser.toPlainText().strip()
-        # Stitch DEFAULT_PROMPT in front of the transcribed text
-        transcription = f"{self.default_prompt}\n{transcription}"
         if not transcription:
-            self.llm_response_browser.setPlainText("the transcribed text is empty，please transcribe the audio first\n")
+            self.status_label.setText("the transcribed text is empty，please transcribe the audio first")
+            return
+        if self.llm_client is None:
+            self.status_label.setText("the LLM client is still starting, please try again in a moment")
             return
-        threading.Thread(target=self.llm_thread, args=(transcription,), daemon=True).start()
+        from src.llm_client import ResponseHandle
+        # Asking again replaces the reply that is still streaming
+        self.stop_llm()
+        self.llm_handle = ResponseHandle()
+        self.jobs.submit("llm", self.llm_thread, transcription, self.llm_handle)
+        self.stop_llm_btn.setEnabled(True)
     
-    def llm_thread(self, text):
-        # Callback function: Accumulate the text returned by the stream and convert it to HTML with markdown2 to update the interface
-        def update_ui(new_text):
-            self.llm_full_text += new_text
-            html = markdown2.markdown(self.llm_full_text)
-            # Use QueuedConnection to ensure thread-safe updates
-            QtCore.QMetaObject.invokeMethod(
-                self.llm_response_browser, "setHtml", QtCore.Qt.QueuedConnection, QtCore.Q_ARG(str, html)
-            )
-        
+    def _insert_html_block(self, cursor, html):
+        # Start a new block so the inserted HTML does not merge into the previous paragraph
+        if cursor.position() > 0:
+            cursor.insertBlock()
+        cursor.insertHtml(html)
+
+    def _replace_tail(self, finished_html, tail_html):
+        """Append newly finished blocks once and swap the unfinished tail of the current reply"""
+        cursor = QtGui.QTextCursor(self.llm_response_browser.document())
+        cursor.setPosition(self._tail_start)
+        cursor.movePosition(QtGui.QTextCursor.End, QtGui.QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        if finished_html:
+            self._insert_html_block(cursor, finished_html)
+            self._tail_start = cursor.position()
+        if tail_html:
+            self._insert_html_block(cursor, tail_html)
+
+    def render_llm_frame(self):
+        # Runs on the render timer, so all deltas that arrived since the last frame are drawn at once
+        with TRACER.span("render") as span:
+            update = self.md_renderer.render()
+            if update:
+                self._replace_tail(*update)
+            else:
+                span.set(idle=True)
+
+    def finish_llm_turn(self, footer):
+        self._replace_tail(self.md_renderer.end_turn(footer), "")
+        summary = TRACER.summary()
+        self.status_label.setText(f"LLM processing completed | {summary}" if summary else "LLM processing completed")
+
+    def llm_thread(self, job, text, handle):
+        # Callback function: only buffer the streamed text, render_llm_frame turns it into HTML
         try:
             # to display the invocation count in the reply box
+            job.report(0, "LLM thinking...")
+
+            # DEFAULT_PROMPT is stitched in front of the transcribed text by the client
+            def callback(delta):
+                # Raises JobCancelled once a newer question took over, which ends the stream
+                job.check()
+                self.md_renderer.feed(delta)
+                if self.speech_stream:
+                    self.speech_stream.feed(delta)
 
-            self.llm_client.get_response(text, callback=update_ui)
+            if self.speech_stream:
+                self.speech_stream.start()
+            # A speculative answer to the same question may already be streaming
+            answer = self.prefetcher.resolve(text, callback=callback, handle=handle) if self.prefetcher else None
+            if answer is None:
+                self.llm_client.get_response(text, callback=callback, system_prompt=self.default_prompt, handle=handle)
+            if self.prefetcher:
+                print(self.prefetcher.summary())
+            if handle.cancelled:
+                self.md_renderer.feed("\n\n*(stopped)*")
+            elif self.speech_stream:
+                self.speech_stream.finish()
+        except JobCancelled:
+            self.md_renderer.feed("\n\n*(replaced by a newer question)*")
         except Exception as e:
-            QtCore.QMetaObject.invokeMethod(
-                self.llm_response_browser, "append", QtCore.Qt.QueuedConnection, QtCore.Q_ARG(str, f"\nLLM call failed: {e}")
-            )
-        self.status_label.setText("LLM processing completed")
+            self.md_renderer.feed(f"\n\nLLM call failed: {e}")
         # display certain invocation counts in the response box with a divider using markdown.
         divider = f"\n\n**No. {self.llm_client_ask_cnt} call completed**\n\n---\n"
-        self.llm_full_text += divider
-        html = markdown2.markdown(self.llm_full_text)
-        QtCore.QMetaObject.invokeMethod(
-            self.llm_response_browser, "setHtml", QtCore.Qt.QueuedConnection, QtCore.Q_ARG(str, html)
-        )
+        self.llm_turn_finished.emit(divider)
 
         
         self.llm_client_ask_cnt += 1
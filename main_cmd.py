@@ -1,39 +1,129 @@
-from src.audio_capture import LoopbackRecorder
-from src.transcriber import SpeechTranscriber
+from src.audio_capture import LoopbackRecorder, AudioBuffer, VoiceActivityDetector, CaptureEngine
+from src.transcriber import SpeechTranscriber, StreamingTranscriber, TranscriptionSession
 from src.llm_client import LLMClient
+from src.utils.metrics import TRACER
+from src.speech_stream import SpeechStream
+from src.speculative import SpeculativePrefetcher
+from src.utils.config_loader import get_config
+import asyncio
 import time
 import os
 
+MYCONFIG = get_config()
+
 def update_response(new_text):
     #As a callback function, update the response
     print(new_text, end="", flush=True,sep="")
 
+def update_partial(text):
+    #Show the live transcription as it grows
+    print(f"\r[live] {text}", end="", flush=True)
+
+async def stream_answer(client, text, on_delta):
+    async for delta in client.astream(f"\n{text}"):
+        on_delta(delta)
+
+
+def answer_question(loop, client, prefetcher, text, on_delta):
+    """Stream the answer to `text`; Ctrl+C stops it and returns False"""
+    task = None
+    try:
+        # A speculative answer to the same question is already streaming, otherwise ask now
+        answer = prefetcher.resolve(text, callback=on_delta) if prefetcher else None
+        if answer is None:
+            task = loop.create_task(stream_answer(client, text, on_delta))
+            loop.run_until_complete(task)
+        return True
+    except KeyboardInterrupt:
+        if task is not None and not task.done():
+            # Leaving the async iterator closes the HTTP stream, no more tokens are paid for
+            task.cancel()
+            loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+        print("\n[answer stopped]")
+        return False
+    finally:
+        # Let the stream's async generators finish closing before the loop goes idle
+        loop.run_until_complete(asyncio.sleep(0))
+
+
 def main():
+    # Models are shared through the registry, load and warm up once before the first question
+    transcriber = SpeechTranscriber()
+    transcriber.preload()
+    # Language and context carry over from one question to the next
+    session = TranscriptionSession(transcriber)
+    # One client for the whole session keeps the pooled connection alive between questions
+    client = LLMClient()
+    # One event loop for the whole session keeps the async connection pool of astream() alive
+    loop = asyncio.new_event_loop()
+    # The loopback stream stays open between questions; each recording starts with the pre-roll
+    engine = CaptureEngine()
+    engine.start()
+    speech = None
+    if MYCONFIG['DEFAULT'].getboolean('TTS_ENABLED', fallback=False):
+        from src.voice_generator import VoiceGenerator
+        speech = SpeechStream(VoiceGenerator())
+    # Start answering once the partial transcript looks like a complete question
+    prefetcher = None
+    if MYCONFIG['DEFAULT'].getboolean('LLM_SPECULATIVE', fallback=False):
+        prefetcher = SpeculativePrefetcher(client)
     while True:
         # 1. recording
 # Press Ctrl+C to start
-        client = LLMClient()
-        input('press key to start recording...')
+        # PortAudio only sees new or switched devices after re-initialisation
+        if input('press key to start recording (r + Enter re-reads the audio devices)...').strip().lower() == 'r':
+            changed = engine.refresh_devices()
+            print(f"audio devices {'changed' if changed else 'unchanged'}: {engine.device_info['name']}")
+            continue
+        client.warm_up()
         # Start recording
         print("starting recording...")
-        recorder = LoopbackRecorder(device_index=2)
-        recorder.start_recording("interview.wav")
-        recorder.record(duration=5)# Record for 5 seconds
+        recorder = LoopbackRecorder(vad=VoiceActivityDetector.from_config(), engine=engine)
+        audio_buffer = AudioBuffer()
+        if prefetcher:
+            prefetcher.reset()
+
+        def on_partial(text):
+            update_partial(text)
+            if prefetcher:
+                prefetcher.on_partial(text)
+
+        recorder.start_recording("interview.wav", audio_buffer=audio_buffer)
+        # 2. transliteration runs alongside the recording
+        live = StreamingTranscriber(transcriber, audio_buffer, callback=on_partial, session=session)
+        live.start()
+        recorder.record(duration=60)# Record until the interviewer goes quiet, at most 60 seconds
 
         recorder.stop_recording()
-        print("recording completed successfully")
+        print("\nrecording completed successfully")
+        # interview.wav keeps being written in the background, transcription does not wait for it
 
-        # 2. transliteration
-        print("\nstart transcribing...")
-        transcriber = SpeechTranscriber()
-        text = transcriber.transcribe("interview.wav")
+        print("\nfinishing transcription...")
+        text = live.finish()
         print(f"\ntransliteratio;n content: {text}")
         
         # 3. LLLM processing
         
         print("\nmodel reply:")
-        full_response = []
-        client.get_response(f"\n{text}", callback=update_response)
+        on_delta = update_response
+        if speech:
+            # Speak each sentence as soon as it is complete, while the rest is still generated
+            speech.start()
+
+            def on_delta(delta):
+                update_response(delta)
+                speech.feed(delta)
+
+        # Ctrl+C while the answer streams stops it and goes back to the next question
+        if answer_question(loop, client, prefetcher, text, on_delta):
+            if speech:
+                speech.finish()
+        elif speech:
+            speech.cancel()
+        if prefetcher:
+            print(f"\n[{prefetcher.summary()}]")
+        if TRACER.enabled:
+            print(f"\n[timing] {TRACER.summary()}")
 
 
 if __name__ == "__main__":
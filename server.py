@@ -0,0 +1,50 @@
+# Headless transcription and answer service: several candidates stream their interview audio to
+# one box, which transcribes it with one shared Whisper model and streams the LLM answers back.
+# Usage: python server.py [--port 8765] [--max-batch 8] [--llm-url http://127.0.0.1:8001/v1]
+import argparse
+import time
+
+from src.transcriber import SpeechTranscriber, BatchDecoder
+from src.llm_client import LLMClient
+from src.service import InterviewService, ServiceServer
+from src.utils.config_loader import get_config
+
+MYCONFIG = get_config()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-session transcription and answer service")
+    parser.add_argument("--host", default=MYCONFIG['DEFAULT'].get('SERVICE_HOST', fallback='127.0.0.1'))
+    parser.add_argument("--port", type=int, default=MYCONFIG['DEFAULT'].getint('SERVICE_PORT', fallback=8765))
+    parser.add_argument("--max-batch", type=int, default=MYCONFIG['DEFAULT'].getint('SERVICE_MAX_BATCH', fallback=8),
+                        help="clips decoded together in one pass, 1 decodes them one by one")
+    parser.add_argument("--batch-wait-ms", type=float,
+                        default=MYCONFIG['DEFAULT'].getfloat('SERVICE_BATCH_WAIT_MS', fallback=50))
+    parser.add_argument("--llm-url", default=None, help="API_URL override, e.g. the mock LLM server")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the LLM response cache")
+    args = parser.parse_args()
+
+    transcriber = SpeechTranscriber()
+    start = time.perf_counter()
+    transcriber.preload().join()
+    print(f"Whisper {transcriber.model_size} loaded in {time.perf_counter() - start:.1f}s")
+    decoder = BatchDecoder(transcriber, max_batch=args.max_batch, max_wait=args.batch_wait_ms / 1000)
+
+    options = {"cache": False} if args.no_cache else {}
+    client = LLMClient(api_url=args.llm_url, **options) if args.llm_url else LLMClient(**options)
+    client.warm_up()
+
+    server = ServiceServer((args.host, args.port), InterviewService(decoder, client))
+    print(f"Interview service listening on {server.url} (batches of up to {args.max_batch})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        decoder.close()
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,612 @@
 # audio_capture.py
 import pyaudiowpatch as pyaudio
+import numpy as np
+import threading
+import queue
+import time
 import wave
 import os
-import configparser
-#Obtain the absolute path of the current file, go up one level, find the config.ini with the absolute path, and read it
+import sys
+# Project root: one level up from this file. config.ini is parsed once by src.utils.config_loader
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
-config_path = os.path.join(project_root, 'config.ini')
-MYCONFIG = configparser.ConfigParser()
-MYCONFIG.read(config_path,encoding='utf-8')
+
+# Make `src` importable when this file is run directly (python src/xxx.py)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.config_loader import get_config
+MYCONFIG = get_config()
+
+from src.utils.metrics import TRACER
+from src.utils.audio import WHISPER_SAMPLE_RATE, pcm_to_float32, resample
+
+# The candidate's microphone is only captured when CAPTURE_MIC is enabled
+DEFAULT_MIC_DEVICE_INDEX = (
+    MYCONFIG['DEFAULT'].getint('MIC_DEVICE_INDEX')
+    if MYCONFIG['DEFAULT'].getboolean('CAPTURE_MIC', fallback=False) else None
+)
+# A source that delivers nothing for longer than this (WASAPI loopback pauses while nothing
+# plays) is padded with silence so both channels stay on the same timeline
+ALIGN_SLACK_SECONDS = 0.25
+
+class AudioBuffer:
+    """Thread-safe buffer that the recorder fills with PCM blocks while it is still recording.
+
+    Readers get the audio back as 16 kHz mono float32, the format Whisper consumes directly.
+    """
+    def __init__(self):
+        self.rate = None
+        self.channels = None
+        self.closed = False
+        self._lock = threading.Lock()
+        # Grown by doubling, so appends are amortized O(1) and nothing is copied on read
+        self._mono = np.zeros(0, dtype=np.float32)
+        self._size = 0
+
+    def configure(self, rate, channels):
+        with self._lock:
+            self.rate = rate
+            self.channels = channels
+
+    def write(self, data):
+        """Append a block of raw PCM and return it as mono float32 at the device rate"""
+        samples = pcm_to_float32(data, self.channels)
+        self.write_samples(samples)
+        return samples
+
+    def write_samples(self, samples):
+        """Append mono float32 samples that are already at `rate`"""
+        with self._lock:
+            end = self._size + len(samples)
+            if end > len(self._mono):
+                grown = np.zeros(max(end, 2 * len(self._mono)), dtype=np.float32)
+                grown[:self._size] = self._mono[:self._size]
+                self._mono = grown
+            self._mono[self._size:end] = samples
+            self._size = end
+
+    def close(self):
+        self.closed = True
+
+    def duration(self):
+        """Seconds of audio captured so far"""
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            return self._size / self.rate
+
+    def get_audio(self, start=0):
+        """Return audio from sample offset `start` (counted at 16 kHz) to the current end"""
+        with self._lock:
+            if not self.rate:
+                return np.zeros(0, dtype=np.float32)
+            src_start = int(start * self.rate / WHISPER_SAMPLE_RATE)
+            return resample(self._mono[src_start:self._size].copy(), self.rate)
+
+
+class RingBuffer:
+    """Single-producer / single-consumer float32 ring buffer on a preallocated array.
+
+    The audio callback writes and the recorder thread reads without taking a lock: each side
+    only advances its own counter, and the writer publishes its counter after copying. If the
+    reader falls more than `capacity` samples behind, the oldest audio is dropped and counted
+    in `overruns`.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._written = 0
+        self._read = 0
+        self.overruns = 0
+
+    def write(self, samples):
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self.overruns += n - self.capacity
+            n = self.capacity
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        self._data[:n - first] = samples[first:]
+        self._written += n
+
+    def available(self):
+        return min(self._written - self._read, self.capacity)
+
+    def latest(self, n):
+        """Return a copy of the last `n` samples written, without consuming anything"""
+        written = self._written
+        n = min(n, written, self.capacity)
+        start = (written - n) % self.capacity
+        first = min(n, self.capacity - start)
+        return np.concatenate((self._data[start:start + first], self._data[:n - first]))
+
+    def read(self):
+        """Return (a copy of) everything written since the last read"""
+        written = self._written
+        available = written - self._read
+        if available > self.capacity:
+            self.overruns += available - self.capacity
+            available = self.capacity
+        start = (written - available) % self.capacity
+        first = min(available, self.capacity - start)
+        out = np.concatenate((self._data[start:start + first], self._data[:available - first]))
+        self._read = written
+        return out
+
+
+class StreamResampler:
+    """Downmix and resample consecutive blocks to 16 kHz mono, keeping state across block edges.
+
+    Integer ratios (48 kHz -> 16 kHz) average each group of input samples, which also acts as a
+    simple anti-aliasing filter; other ratios (44.1 kHz) use linear interpolation.
+    """
+    def __init__(self, src_rate, channels, dst_rate=WHISPER_SAMPLE_RATE):
+        self.channels = channels
+        self.ratio = src_rate / dst_rate
+        self.factor = int(self.ratio) if self.ratio.is_integer() else None
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._pos = 0.0
+
+    def process(self, data):
+        """Convert a block of interleaved 16-bit PCM bytes"""
+        samples = np.concatenate((self._carry, pcm_to_float32(data, self.channels)))
+        if self.factor:
+            n = len(samples) // self.factor
+            self._carry = samples[n * self.factor:]
+            return samples[:n * self.factor].reshape(n, self.factor).mean(axis=1)
+        if len(samples) - 1 < self._pos:
+            self._carry = samples
+            return np.zeros(0, dtype=np.float32)
+        n = int((len(samples) - 1 - self._pos) // self.ratio) + 1
+        positions = self._pos + np.arange(n) * self.ratio
+        out = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        next_pos = self._pos + n * self.ratio
+        drop = min(int(next_pos), len(samples))
+        self._carry = samples[drop:]
+        self._pos = next_pos - drop
+        return out
+
+
+class VoiceActivityDetector:
+    """Vectorized energy / zero-crossing-rate voice activity detection.
+
+    A frame counts as speech when its RMS energy is above `energy_threshold` (and above
+    `noise_ratio` times the estimated noise floor) and its zero-crossing rate is below
+    `max_zcr`, which rejects hiss and other broadband noise of similar energy.
+    """
+    def __init__(self, energy_threshold=0.01, max_zcr=0.35, frame_ms=20, noise_ratio=2.0,
+                 silence_seconds=2.0, min_speech_seconds=0.3, padding_seconds=0.2):
+        self.energy_threshold = energy_threshold
+        self.max_zcr = max_zcr
+        self.frame_ms = frame_ms
+        self.noise_ratio = noise_ratio
+        self.silence_seconds = silence_seconds
+        self.min_speech_seconds = min_speech_seconds
+        self.padding_seconds = padding_seconds
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config=MYCONFIG['DEFAULT']):
+        return cls(
+            energy_threshold=config.getfloat('VAD_ENERGY_THRESHOLD', fallback=0.01),
+            silence_seconds=config.getfloat('VAD_SILENCE_SECONDS', fallback=2.0),
+        )
+
+    def reset(self):
+        """Forget the state of the incremental (auto-stop) detector"""
+        self._leftover = np.zeros(0, dtype=np.float32)
+        self._speech_time = 0.0
+        self._silence_time = 0.0
+
+    def _frame_length(self, rate):
+        return max(1, int(rate * self.frame_ms / 1000))
+
+    @staticmethod
+    def _frame_features(frames):
+        """RMS energy and zero-crossing rate of each row of a (n_frames, frame_len) array"""
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frames.shape[1]
+        return rms, zcr
+
+    def speech_mask(self, samples, rate):
+        """Return one boolean per frame, True where the frame contains speech"""
+        frame_len = self._frame_length(rate)
+        n_frames = len(samples) // frame_len
+        if n_frames == 0:
+            return np.zeros(0, dtype=bool)
+        frames = np.asarray(samples[:n_frames * frame_len], dtype=np.float32).reshape(n_frames, frame_len)
+        rms, zcr = self._frame_features(frames)
+        noise_floor = np.percentile(rms, 10) if n_frames >= 10 else 0.0
+        threshold = max(self.energy_threshold, noise_floor * self.noise_ratio)
+        return (rms > threshold) & (zcr < self.max_zcr)
+
+    def speech_segments(self, samples, rate):
+        """Return the speech regions of `samples` as a list of (start, end) in seconds.
+
+        Gaps shorter than `silence_seconds` are bridged, segments shorter than
+        `min_speech_seconds` are dropped and each segment is padded by `padding_seconds`.
+        """
+        mask = self.speech_mask(samples, rate)
+        if not mask.any():
+            return []
+        frame_time = self._frame_length(rate) / rate
+        edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1) * frame_time
+        ends = np.flatnonzero(edges == -1) * frame_time
+
+        segments = []
+        for start, end in zip(starts, ends):
+            if segments and start - segments[-1][1] < self.silence_seconds:
+                segments[-1][1] = end
+            else:
+                segments.append([start, end])
+
+        total = len(samples) / rate
+        return [
+            (max(0.0, float(start) - self.padding_seconds), min(total, float(end) + self.padding_seconds))
+            for start, end in segments
+            if end - start >= self.min_speech_seconds
+        ]
+
+    def trim(self, samples, rate):
+        """Cut leading and trailing silence; returns the input unchanged if no speech is found"""
+        segments = self.speech_segments(samples, rate)
+        if not segments:
+            return samples
+        return samples[int(segments[0][0] * rate):int(segments[-1][1] * rate)]
+
+    def update(self, samples, rate):
+        """Feed the next block of a live stream; returns True once speech has been followed
+        by at least `silence_seconds` of silence, i.e. the question is over"""
+        samples = np.concatenate((self._leftover, samples))
+        frame_len = self._frame_length(rate)
+        usable = len(samples) - len(samples) % frame_len
+        self._leftover = samples[usable:]
+        frame_time = frame_len / rate
+        # Use the fixed threshold only: a live block is too short for a noise floor estimate
+        frames = samples[:usable].reshape(-1, frame_len)
+        if len(frames) == 0:
+            return False
+        rms, zcr = self._frame_features(frames)
+        mask = (rms > self.energy_threshold) & (zcr < self.max_zcr)
+        speech = np.flatnonzero(mask)
+        if len(speech):
+            self._speech_time += len(speech) * frame_time
+            self._silence_time = (len(mask) - 1 - speech[-1]) * frame_time
+        else:
+            self._silence_time += len(mask) * frame_time
+        return self._speech_time >= self.min_speech_seconds and self._silence_time >= self.silence_seconds
+
+
+class WavArchiver:
+    """Write PCM blocks to a WAV file on a background thread, off the capture/transcription path"""
+    def __init__(self, filename, channels, sample_size, rate):
+        self.filename = filename
+        self.wave_file = wave.open(filename, 'wb')
+        self.wave_file.setnchannels(channels)
+        self.wave_file.setsampwidth(sample_size)
+        self.wave_file.setframerate(rate)
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        write_time = 0.0
+        written = 0
+        try:
+            while True:
+                data = self._queue.get()
+                if data is None:
+                    break
+                start = time.perf_counter()
+                self.wave_file.writeframes(data)
+                write_time += time.perf_counter() - start
+                written += len(data)
+        finally:
+            self.wave_file.close()
+            TRACER.record("wav_write", write_time, bytes=written)
+
+    def write(self, data):
+        self._queue.put(data)
+
+    def close(self):
+        """Finish the file in the background; does not wait for pending writes"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+
+    def wait(self, timeout=None):
+        """Block until every queued block has been written and the file is closed"""
+        self._thread.join(timeout)
+
+
+class CaptureSource:
+    """One input device captured in callback mode as 16 kHz mono.
+
+    The callback writes into an optional pre-roll ring that always runs and into the ring of
+    the current session, if there is one.
+    """
+    def __init__(self, name, device_info, preroll_samples=0):
+        self.name = name
+        self.device_info = device_info
+        self.rate = int(device_info["defaultSampleRate"])
+        self.channels = device_info["maxInputChannels"]
+        self.resampler = StreamResampler(self.rate, self.channels)
+        self.preroll = RingBuffer(preroll_samples) if preroll_samples else None
+        self.session = None
+        self.stream = None
+        self._lock = threading.Lock()
+
+    def open(self, p, frames_per_buffer):
+        self.stream = p.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.rate,
+            input=True,
+            input_device_index=self.device_info["index"],
+            frames_per_buffer=frames_per_buffer,
+            stream_callback=self._stream_callback,
+        )
+        return self.stream
+
+    def _stream_callback(self, in_data, frame_count, time_info, status):
+        samples = self.resampler.process(in_data)
+        with self._lock:
+            if self.preroll is not None:
+                self.preroll.write(samples)
+            if self.session is not None:
+                self.session.write(samples)
+        return (None, pyaudio.paContinue)
+
+    def start_session(self, capacity):
+        """Returns (pre-roll samples, ring buffer receiving the live audio)"""
+        ring = RingBuffer(capacity)
+        with self._lock:
+            preroll = self.preroll.latest(self.preroll.capacity) if self.preroll is not None else np.zeros(0, dtype=np.float32)
+            self.session = ring
+        return preroll, ring
+
+    def end_session(self):
+        with self._lock:
+            self.session = None
+
+    def close(self):
+        self.end_session()
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+
+def resolve_device(p, device_index, loopback=True):
+    """Device info for `device_index`, or the default loopback / microphone when it is None"""
+    try:
+        if device_index is None or device_index < 0:
+            info = p.get_default_wasapi_loopback() if loopback else p.get_default_input_device_info()
+        else:
+            info = p.get_device_info_by_index(device_index)
+    except (OSError, LookupError) as e:
+        raise RuntimeError(f"Device initialization failed: {str(e)}")
+    if info["maxInputChannels"] < 1:
+        raise ValueError("The device does not support loopback input" if loopback else "The device has no input channels")
+    return info
+
+
+def align_prerolls(prerolls):
+    """Pad shorter pre-rolls with leading silence; they all end at the same moment"""
+    length = max(len(samples) for samples in prerolls.values())
+    return {
+        name: np.concatenate((np.zeros(length - len(samples), dtype=np.float32), samples))
+        for name, samples in prerolls.items()
+    }
+
+
+class CaptureEngine:
+    """Long-lived capture: one PyAudio instance and always-open callback streams.
+
+    The loopback stream (and the microphone stream, if `mic_device_index` is set) keeps writing
+    16 kHz mono audio into a pre-roll ring buffer of `preroll_seconds`. start_session() returns
+    that pre-roll plus a fresh ring per source that receives everything captured from then on,
+    so starting a recording is instant and includes the words spoken just before the click.
+    The device list is enumerated once and only re-read by refresh_devices() or when opening
+    the stream fails (e.g. the device was unplugged). PortAudio initialisation is reference
+    counted, so a second PyAudio instance would still see the old devices: a change such as
+    switching from speakers to headphones is picked up when the user asks for a refresh, which
+    terminates the running instance first.
+    """
+    def __init__(self, device_index=MYCONFIG['DEFAULT'].getint('SPEAKER_DEVICE_INDEX'), audio_backend=pyaudio.PyAudio,
+                 preroll_seconds=MYCONFIG['DEFAULT'].getfloat('PREROLL_SECONDS', fallback=3.0),
+                 frames_per_buffer=MYCONFIG['DEFAULT'].getint('FRAMES_PER_BUFFER', fallback=1024),
+                 ring_seconds=MYCONFIG['DEFAULT'].getfloat('RING_BUFFER_SECONDS', fallback=30),
+                 mic_device_index=DEFAULT_MIC_DEVICE_INDEX):
+        self.device_index = None if device_index < 0 else device_index
+        self.mic_device_index = mic_device_index
+        self.audio_backend = audio_backend
+        self.preroll_seconds = preroll_seconds
+        self.frames_per_buffer = frames_per_buffer
+        self.ring_seconds = ring_seconds
+
+        self.p = None
+        self.stream = None
+        self.device_info = None
+        self.sources = {}
+        self._devices = None
+        self._start_lock = threading.Lock()
+        self._in_session = False
+
+    def devices(self):
+        """Cached list of device info dicts"""
+        if self._devices is None:
+            if self.p is None:
+                self.p = self.audio_backend()
+            self._devices = [self.p.get_device_info_by_index(i) for i in range(self.p.get_device_count())]
+        return self._devices
+
+    def refresh_devices(self):
+        """Re-enumerate devices (PortAudio only sees changes after re-initialisation).
+
+        Returns True if the device list or the capture device changed. The streams are reopened
+        on the current devices either way; nothing happens during a recording.
+        """
+        if self._in_session:
+            return False
+        old = [(d["index"], d["name"]) for d in self._devices or []]
+        old_device = (self.device_info["index"], self.device_info["name"]) if self.device_info else None
+        self._shutdown()
+        self._devices = None
+        changed = old != [(d["index"], d["name"]) for d in self.devices()]
+        self.start()
+        return changed or old_device != (self.device_info["index"], self.device_info["name"])
+
+    def start(self):
+        """Open the always-on streams (no-op if they are already running)"""
+        # The GUI starts the engine in the background, a recording may ask for it at the same time
+        with self._start_lock:
+            if self.stream is not None:
+                return
+            try:
+                self._open()
+            except OSError:
+                # The cached device list may be stale, re-initialise PortAudio once and retry
+                self._shutdown()
+                self._devices = None
+                self._open()
+
+    def _open(self):
+        self.devices()
+        preroll_samples = max(1, int(self.preroll_seconds * WHISPER_SAMPLE_RATE))
+        self.device_info = resolve_device(self.p, self.device_index)
+        loopback = CaptureSource("loopback", self.device_info, preroll_samples)
+        self.stream = loopback.open(self.p, self.frames_per_buffer)
+        self.sources = {"loopback": loopback}
+        print(f"Capture engine running: {self.device_info['name']}")
+        if self.mic_device_index is not None:
+            try:
+                mic = CaptureSource("mic", resolve_device(self.p, self.mic_device_index, loopback=False), preroll_samples)
+                mic.open(self.p, self.frames_per_buffer)
+                self.sources["mic"] = mic
+                print(f"Capture engine microphone: {mic.device_info['name']}")
+            except (OSError, RuntimeError, ValueError) as e:
+                # The interviewer's side matters most, keep running without the microphone
+                print(f"Microphone capture unavailable: {e}")
+
+    @property
+    def is_running(self):
+        return self.stream is not None
+
+    def start_session(self):
+        """Begin a recording; returns {source name: (pre-roll samples, ring buffer receiving the live audio)}"""
+        self.start()
+        capacity = int(self.ring_seconds * WHISPER_SAMPLE_RATE)
+        sessions = {name: source.start_session(capacity) for name, source in self.sources.items()}
+        self._in_session = True
+        prerolls = align_prerolls({name: preroll for name, (preroll, _) in sessions.items()})
+        return {name: (prerolls[name], ring) for name, (_, ring) in sessions.items()}
+
+    def end_session(self):
+        for source in self.sources.values():
+            source.end_session()
+        self._in_session = False
+
+    def _shutdown(self):
+        for source in self.sources.values():
+            source.close()
+        self.sources = {}
+        self._in_session = False
+        self.stream = None
+        if self.p:
+            self.p.terminate()
+            self.p = None
+
+    def close(self):
+        self._shutdown()
+
 
 class LoopbackRecorder:
-    def __init__(self, device_index=MYCONFIG['DEFAULT'].getint('SPEAKER_DEVICE_INDEX')):
+    def __init__(self, device_index=MYCONFIG['DEFAULT'].getint('SPEAKER_DEVICE_INDEX'), vad=None, on_auto_stop=None,
+                 audio_backend=pyaudio.PyAudio,
+                 capture_mode=MYCONFIG['DEFAULT'].get('CAPTURE_MODE', fallback='callback'),
+                 frames_per_buffer=MYCONFIG['DEFAULT'].getint('FRAMES_PER_BUFFER', fallback=1024),
+                 ring_seconds=MYCONFIG['DEFAULT'].getfloat('RING_BUFFER_SECONDS', fallback=30),
+                 engine=None, mic_device_index=DEFAULT_MIC_DEVICE_INDEX):
         # 初始化
+        # audio_backend creates the PyAudio instance; benchmarks pass a fake one that replays WAV files
+        self.audio_backend = audio_backend
+        # With a running CaptureEngine no device or stream is opened here, the engine's stream is shared
+        self.engine = engine
+        if engine is not None:
+            capture_mode = "callback"
+
+        # "callback": PortAudio pushes blocks into a ring buffer, already downmixed to 16 kHz mono.
+        # "blocking": the original stream.read() loop at the device rate and channel count.
+        if capture_mode not in ("callback", "blocking"):
+            raise ValueError(f"Unknown CAPTURE_MODE: {capture_mode}")
+        self.capture_mode = capture_mode
+        self.frames_per_buffer = frames_per_buffer
+        self.ring_seconds = ring_seconds
+        self.ring = None
+        self.resampler = None
         self.p = None
         self.stream = None
-        self.wave_file = None
+        self.archiver = None
+        self.audio_buffer = None
+
+        # Optional second source: the candidate's microphone, kept in its own time-aligned
+        # buffer and never mixed into the interviewer's audio
+        self.mic_device_index = engine.mic_device_index if engine is not None else mic_device_index
+        self.mic_source = None
+        self.mic_ring = None
+        self.mic_archiver = None
+        self.mic_buffer = None
+        self._session_start = None
+
+        # With a VoiceActivityDetector the recording ends by itself after the trailing silence
+        self.vad = vad
+        self.on_auto_stop = on_auto_stop
+        self.auto_stopped = False
         
         self.is_recording = False
         self.device_index = None if device_index < 0 else device_index
-        self.device_info = self._get_device()
+        if engine is not None:
+            engine.start()
+            self.device_info = engine.device_info
+        else:
+            self.device_info = self._get_device()
         
     def _cleanup(self):
         """Strictly follow the example of the order in which resources are released"""
         print("Resources are being cleaned up...")
         if self.is_recording:
             self.is_recording = False
-        if self.stream:
-            self.stream.close()
-        if self.wave_file:
-            self.wave_file.close()
+        self._release()
+
+    def _release(self):
+        if self.engine is not None:
+            # The engine's stream stays open for the next recording
+            self.engine.end_session()
+        else:
+            if self.stream:
+                self.stream.close()
+            if self.mic_source:
+                self.mic_source.close()
+                self.mic_source = None
+        if self.archiver:
+            self.archiver.close()
+        if self.mic_archiver:
+            self.mic_archiver.close()
         if self.p:
             self.p.terminate()
+            self.p = None
 
     def _get_device(self):
         """Strictly follow the official example of how the device is acquired"""
-        self.p = pyaudio.PyAudio()
+        # Reuse the PyAudio instance created in __init__ instead of opening a second one
+        if self.p is None:
+            self.p = self.audio_backend()
         try:
             if self.device_index is None:
                 self.device_info = self.p.get_default_wasapi_loopback()
@@ -50,9 +621,19 @@ class LoopbackRecorder:
         except (OSError, LookupError) as e:
             raise RuntimeError(f"Device initialization failed: {str(e)}")
 
-    def start_recording(self, filename="output.wav"):
-        """Exactly as the stream initialization method of the official example"""
+    def start_recording(self, filename="output.wav", audio_buffer=None):
+        """Exactly as the stream initialization method of the official example
+
+        Captured audio always goes into `audio_buffer` (a new AudioBuffer if none is given),
+        which a StreamingTranscriber can read while recording continues and which
+        get_audio() hands to SpeechTranscriber.transcribe_array() afterwards.
+        The WAV copy in `filename` is written asynchronously; pass filename=None to skip it.
+        """
         try:
+            if self.engine is not None:
+                self._start_engine_session(filename, audio_buffer)
+                return
+
             self._get_device()
             
             # 参数直接从设备信息获取
@@ -61,11 +642,31 @@ class LoopbackRecorder:
             self.format = pyaudio.paInt16
             self.sample_size = self.p.get_sample_size(self.format)
 
-            # 初始化WAV文件
-            self.wave_file = wave.open(filename, 'wb')
-            self.wave_file.setnchannels(self.channels)
-            self.wave_file.setsampwidth(self.sample_size)
-            self.wave_file.setframerate(self.rate)
+            # In callback mode everything after the callback is 16 kHz mono, ~6x less data than 48 kHz stereo
+            callback_mode = self.capture_mode == "callback"
+            self.capture_rate = WHISPER_SAMPLE_RATE if callback_mode else self.rate
+            capture_channels = 1 if callback_mode else self.channels
+
+            # 初始化WAV文件 (archived in the background, transcription never reads it back)
+            if filename:
+                self.archiver = WavArchiver(filename, capture_channels, self.sample_size, self.capture_rate)
+
+            self.audio_buffer = audio_buffer if audio_buffer is not None else AudioBuffer()
+            self.audio_buffer.configure(self.capture_rate, capture_channels)
+            self.auto_stopped = False
+            if self.vad:
+                self.vad.reset()
+
+            if self.mic_device_index is not None and callback_mode:
+                self._open_mic(filename)
+            elif self.mic_device_index is not None:
+                print("Microphone capture needs CAPTURE_MODE = callback, recording the loopback device only")
+
+            stream_options = {}
+            if callback_mode:
+                self.ring = RingBuffer(int(self.ring_seconds * WHISPER_SAMPLE_RATE))
+                self.resampler = StreamResampler(self.rate, self.channels)
+                stream_options["stream_callback"] = self._stream_callback
 
             # 创建音频流（与示例完全一致）
             self.stream = self.p.open(
@@ -74,47 +675,186 @@ class LoopbackRecorder:
                 rate=self.rate,
                 input=True,
                 input_device_index=self.device_info["index"],
-                frames_per_buffer=1024
+                frames_per_buffer=self.frames_per_buffer,
+                **stream_options
             )
 
+            self._session_start = time.perf_counter()
             self.is_recording = True
             print(f"Successfully start recording: {self.device_info['name']}")
 
         except Exception as e:
             self._cleanup()
-            raise RuntimeError("self._cleanup()Error")
+            raise RuntimeError(f"Recording failed to start: {str(e)}") from e
+
+    def _start_engine_session(self, filename, audio_buffer):
+        # The engine already delivers 16 kHz mono; the pre-roll becomes the start of the recording
+        self.capture_rate = WHISPER_SAMPLE_RATE
+        if filename:
+            self.archiver = WavArchiver(filename, 1, 2, WHISPER_SAMPLE_RATE)
+        self.audio_buffer = audio_buffer if audio_buffer is not None else AudioBuffer()
+        self.audio_buffer.configure(WHISPER_SAMPLE_RATE, 1)
+        self.auto_stopped = False
+        if self.vad:
+            self.vad.reset()
+        sessions = self.engine.start_session()
+        preroll, self.ring = sessions["loopback"]
+        mic_preroll = None
+        if "mic" in sessions:
+            mic_preroll, self.mic_ring = sessions["mic"]
+            self._configure_mic(filename)
+        self.device_info = self.engine.device_info
+        # Pre-roll audio counts as already captured on the session timeline
+        self._session_start = time.perf_counter() - len(preroll) / WHISPER_SAMPLE_RATE
+        self.is_recording = True
+        if len(preroll):
+            self._write_samples(preroll)
+        if mic_preroll is not None and len(mic_preroll):
+            self._write_mic_samples(mic_preroll)
+        print(f"Successfully start recording: {self.device_info['name']} (pre-roll {len(preroll) / WHISPER_SAMPLE_RATE:.1f}s)")
+
+    def _configure_mic(self, filename):
+        self.mic_buffer = AudioBuffer()
+        self.mic_buffer.configure(WHISPER_SAMPLE_RATE, 1)
+        if filename:
+            root, ext = os.path.splitext(filename)
+            self.mic_archiver = WavArchiver(f"{root}_mic{ext}", 1, 2, WHISPER_SAMPLE_RATE)
+
+    def _open_mic(self, filename):
+        try:
+            info = resolve_device(self.p, self.mic_device_index, loopback=False)
+            self.mic_source = CaptureSource("mic", info)
+            self.mic_source.open(self.p, self.frames_per_buffer)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"Microphone capture unavailable: {e}")
+            self.mic_source = None
+            return
+        _, self.mic_ring = self.mic_source.start_session(int(self.ring_seconds * WHISPER_SAMPLE_RATE))
+        self._configure_mic(filename)
 
     def record(self, duration=None):
         if not self.is_recording:
             raise RuntimeError("Must be called first start_recording()")
-        try:
-            if duration:  # 定时录音模式
-                print(f"Recording {duration} 秒...")
-                for _ in range(0, int(self.rate / 1024 * duration)):
-                    if not self.is_recording:  # 检查是否收到停止信号
-                        break
-                    data = self.stream.read(1024)
-                    self.wave_file.writeframes(data)
-            else:  # 持续录音模式
-                print("Recordings are ongoing...")
-                while self.is_recording:
-                    data = self.stream.read(1024)
-                    self.wave_file.writeframes(data)
-                self.stop_recording()
-        finally:
-            self._cleanup()
-            print("Recording has stopped")
+        with TRACER.span("capture", device=self.device_info["name"]) as span:
+            try:
+                if self.capture_mode == "callback":
+                    self._consume_ring(duration)
+                elif duration:  # 定时录音模式
+                    print(f"Recording {duration} 秒...")
+                    for _ in range(0, int(self.rate / self.frames_per_buffer * duration)):
+                        if not self.is_recording:  # 检查是否收到停止信号
+                            break
+                        data = self.stream.read(self.frames_per_buffer)
+                        self._write_block(data)
+                else:  # 持续录音模式
+                    print("Recordings are ongoing...")
+                    while self.is_recording:
+                        data = self.stream.read(self.frames_per_buffer)
+                        self._write_block(data)
+                    self.stop_recording()
+            finally:
+                self.audio_buffer.close()
+                if self.mic_buffer is not None:
+                    self.mic_buffer.close()
+                self._cleanup()
+                span.set(audio_seconds=round(self.audio_buffer.duration(), 3), auto_stopped=self.auto_stopped)
+                print("Recording has stopped")
+
+    def _stream_callback(self, in_data, frame_count, time_info, status):
+        # Runs on the PortAudio thread: convert and hand over, nothing else
+        self.ring.write(self.resampler.process(in_data))
+        return (None, pyaudio.paContinue)
+
+    def _consume_ring(self, duration=None, poll_interval=0.05):
+        """Move audio from the ring buffer into the AudioBuffer until stopped or `duration` is reached"""
+        target = int(duration * WHISPER_SAMPLE_RATE) if duration else None
+        captured = 0
+        if duration:
+            print(f"Recording {duration} 秒...")
+        else:
+            print("Recordings are ongoing...")
+        while self.is_recording and (target is None or captured < target):
+            time.sleep(poll_interval)
+            samples = self.ring.read()
+            if target is not None:
+                samples = samples[:target - captured]
+            if len(samples):
+                captured += len(samples)
+                self._write_samples(samples)
+            if self.mic_ring is not None:
+                mic_samples = self.mic_ring.read()
+                if len(mic_samples):
+                    self._write_mic_samples(mic_samples)
+                captured += self._align_sources()
+        if self.ring.overruns:
+            print(f"Warning: {self.ring.overruns} samples were dropped, the ring buffer is too small")
+        if not duration:
+            self.stop_recording()
+
+    def _write_samples(self, samples):
+        # Callback mode: samples are already 16 kHz mono float32
+        self.audio_buffer.write_samples(samples)
+        if self.archiver:
+            self.archiver.write((np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+        self._check_silence(samples)
+
+    def _write_mic_samples(self, samples):
+        # The microphone is never passed to the VAD: the question ends when the interviewer is quiet
+        self.mic_buffer.write_samples(samples)
+        if self.mic_archiver:
+            self.mic_archiver.write((np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+
+    def _align_sources(self):
+        """Pad a source that fell behind the wall clock with silence; returns loopback samples added"""
+        expected = int((time.perf_counter() - self._session_start - ALIGN_SLACK_SECONDS) * WHISPER_SAMPLE_RATE)
+        padded = 0
+        missing = expected - int(self.audio_buffer.duration() * WHISPER_SAMPLE_RATE)
+        if missing > 0:
+            self._write_samples(np.zeros(missing, dtype=np.float32))
+            padded = missing
+        missing = expected - int(self.mic_buffer.duration() * WHISPER_SAMPLE_RATE)
+        if missing > 0:
+            self._write_mic_samples(np.zeros(missing, dtype=np.float32))
+        return padded
+
+    def _write_block(self, data):
+        samples = self.audio_buffer.write(data)
+        if self.archiver:
+            self.archiver.write(data)
+        self._check_silence(samples)
+
+    def _check_silence(self, samples):
+        if self.vad and self.vad.update(samples, self.capture_rate):
+            print("Silence detected, the question is over")
+            self.is_recording = False
+            self.auto_stopped = True
+            if self.on_auto_stop:
+                self.on_auto_stop()
+
+    def get_audio(self, trim=False, source="loopback"):
+        """The recorded audio as 16 kHz mono float32, ready for SpeechTranscriber.transcribe_array()
+
+        With trim=True leading and trailing silence is cut off, since Whisper's cost grows
+        with the length of the audio. source="mic" returns the candidate's microphone channel,
+        which is empty unless the microphone was captured.
+        """
+        buffer = self.mic_buffer if source == "mic" else self.audio_buffer
+        if buffer is None:
+            return np.zeros(0, dtype=np.float32)
+        audio = buffer.get_audio()
+        if trim:
+            audio = (self.vad or VoiceActivityDetector()).trim(audio, WHISPER_SAMPLE_RATE)
+        return audio
+
+    def speech_segments(self):
+        """(start, end) seconds of every speech region in the recorded audio"""
+        return (self.vad or VoiceActivityDetector()).speech_segments(self.get_audio(), WHISPER_SAMPLE_RATE)
 
     def stop_recording(self):
         """Strictly follow the example of the order in which resources are released"""
         if self.is_recording:
             self.is_recording = False
-        if self.stream:
-            self.stream.close()
-        if self.wave_file:
-            self.wave_file.close()
-        if self.p:
-            self.p.terminate()
+        self._release()
         print("Recording has been safely stopped")
 
     @staticmethod
@@ -170,5 +910,6 @@ if __name__ == "__main__":
         recorder.start_recording("output/test_record.wav")
         recorder.record(duration=5)  # 录制5秒
         recorder.stop_recording()
+        recorder.archiver.wait()
     except Exception as e:
         print(f"Recording failed: {str(e)}")
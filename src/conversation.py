@@ -0,0 +1,147 @@
+# conversation.py
+import hashlib
+import re
+import threading
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Every chat message costs a few tokens of framing on top of its content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class TokenCounter:
+    """Count tokens with tiktoken, falling back to ~4 characters per token if no encoding is available"""
+    def __init__(self, encoding_name="cl100k_base"):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                # The BPE file is downloaded on first use, which fails offline
+                print(f"tiktoken encoding unavailable, estimating token counts: {e}")
+
+    def count(self, text):
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+
+def first_sentence(text, max_chars=200):
+    """Cheap extractive summary of a message: its first sentence, shortened"""
+    text = " ".join(text.replace("#", " ").replace("*", " ").split())
+    match = re.search(r"(.+?[.!?。！？])(\s|$)", text)
+    sentence = match.group(1) if match else text
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars].rsplit(" ", 1)[0] + "..."
+    return sentence
+
+
+# Words that point back at earlier turns ("can you give an example", "what about its cost")
+FOLLOW_UP_WORDS = {
+    "it", "its", "this", "that", "these", "those", "they", "them", "their", "he", "she", "his", "her",
+    "above", "previous", "earlier", "before", "example", "examples", "elaborate", "more", "else",
+    "again", "same", "instead", "further", "then", "why",
+}
+FOLLOW_UP_OPENERS = ("and ", "but ", "so ", "also ", "what about ", "how about ", "what if ")
+
+
+def is_follow_up(question):
+    """Heuristic: does the question need the earlier turns to be understood?
+
+    Errs on the side of True, which only costs a cache miss.
+    """
+    words = re.sub(r"[^\w\s]", " ", question.lower()).split()
+    if len(words) < 3:
+        return True
+    text = " ".join(words) + " "
+    return text.startswith(FOLLOW_UP_OPENERS) or any(word in FOLLOW_UP_WORDS for word in words)
+
+
+class ConversationMemory:
+    """Multi-turn history for LLMClient, kept under a prompt token budget.
+
+    Token counts are computed once per message when it is added. When a request would exceed
+    `max_prompt_tokens`, the oldest turns are evicted and replaced by a one-line extractive
+    summary each, itself capped at `max_summary_tokens`.
+    Speculative and final requests run on different threads, so every read and update of the
+    history holds one lock.
+    """
+    def __init__(self, max_prompt_tokens=3000, max_summary_tokens=300, counter=None):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.counter = counter or TokenCounter()
+        self.turns = []      # [(question, answer, tokens)]
+        self.summary = []    # [(line, tokens)]
+        self._turn_tokens = 0
+        self._summary_tokens = 0
+        self._lock = threading.RLock()
+
+    def _message_tokens(self, text):
+        return self.counter.count(text) + MESSAGE_OVERHEAD_TOKENS
+
+    def add_turn(self, question, answer):
+        tokens = self._message_tokens(question) + self._message_tokens(answer)
+        with self._lock:
+            self.turns.append((question, answer, tokens))
+            self._turn_tokens += tokens
+
+    def clear(self):
+        with self._lock:
+            self.turns = []
+            self.summary = []
+            self._turn_tokens = 0
+            self._summary_tokens = 0
+
+    def _evict_oldest(self):
+        question, answer, tokens = self.turns.pop(0)
+        self._turn_tokens -= tokens
+        line = f"- Q: {first_sentence(question)} A: {first_sentence(answer)}"
+        line_tokens = self.counter.count(line) + 1
+        self.summary.append((line, line_tokens))
+        self._summary_tokens += line_tokens
+        while self.summary and self._summary_tokens > self.max_summary_tokens:
+            self._summary_tokens -= self.summary.pop(0)[1]
+
+    def build_messages(self, question, system_prompt=""):
+        """Return the chat messages for `question`, evicting old turns until they fit the budget"""
+        fixed = self._message_tokens(question) + (self._message_tokens(system_prompt) if system_prompt else 0)
+        with self._lock:
+            while self.turns and fixed + self._summary_tokens + self._turn_tokens > self.max_prompt_tokens:
+                self._evict_oldest()
+            summary_lines = [line for line, _ in self.summary]
+            turns = list(self.turns)
+
+        system = system_prompt
+        if summary_lines:
+            summary = "Earlier in this conversation:\n" + "\n".join(summary_lines)
+            system = f"{system}\n\n{summary}" if system else summary
+
+        messages = [{"role": "system", "content": system}] if system else []
+        for past_question, past_answer, _ in turns:
+            messages.append({"role": "user", "content": past_question})
+            messages.append({"role": "assistant", "content": past_answer})
+        messages.append({"role": "user", "content": question})
+        return messages
+
+    def digest(self):
+        """Hash of the history and summary a request would carry, "" while both are empty"""
+        with self._lock:
+            summary = list(self.summary)
+            turns = list(self.turns)
+        if not turns and not summary:
+            return ""
+        digest = hashlib.sha256()
+        for line, _ in summary:
+            digest.update(line.encode("utf-8") + b"\0")
+        for question, answer, _ in turns:
+            digest.update(question.encode("utf-8") + b"\0" + answer.encode("utf-8") + b"\0")
+        return digest.hexdigest()
+
+    @property
+    def prompt_tokens(self):
+        """Tokens used by history and summary (without the next question and system prompt)"""
+        with self._lock:
+            return self._turn_tokens + self._summary_tokens
@@ -0,0 +1,142 @@
+# jobs.py
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5 import QtCore
+
+
+class JobCancelled(Exception):
+    """Raised by Job.check() inside a job that was cancelled"""
+
+
+class Job:
+    """Handle passed to every job function as its first argument.
+
+    Cancellation is cooperative: the function calls check() between steps (or from a streaming
+    callback) and stops when it raises. report() publishes progress from 0.0 to 1.0.
+    """
+    def __init__(self, job_id, kind, runner, lane=None):
+        self.id = job_id
+        self.kind = kind
+        self.lane = lane
+        self._runner = runner
+        self._cancelled = threading.Event()
+        self.started = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise JobCancelled(f"{self.kind} job {self.id} cancelled")
+
+    def report(self, progress, message=""):
+        self.check()
+        self._runner.job_progress.emit(self.id, self.kind, float(progress), message)
+
+
+class JobRunner(QtCore.QObject):
+    """Runs blocking work (recording, Whisper, LLM calls) on a thread pool, away from the Qt main thread.
+
+    Results come back through signals, which Qt delivers on the thread the runner lives in (the
+    main thread), so `on_done` and `on_error` callbacks may touch widgets directly. The result of
+    a cancelled job is dropped. With `supersede=True` a new job cancels the running jobs of the
+    same kind, e.g. a new question pre-empts a stale transcription. Jobs submitted with the same
+    `lane` run one at a time in submission order, e.g. everything that uses the Whisper model.
+    """
+    # (job id, kind)
+    job_started = QtCore.pyqtSignal(int, str)
+    # (job id, kind, progress 0..1, message)
+    job_progress = QtCore.pyqtSignal(int, str, float, str)
+    # (job id, kind, seconds)
+    job_finished = QtCore.pyqtSignal(int, str, float)
+    # (job id, kind, error message)
+    job_failed = QtCore.pyqtSignal(int, str, str)
+    # (job id, kind)
+    job_cancelled = QtCore.pyqtSignal(int, str)
+    # Internal: (job id, result or exception, succeeded) to the main thread
+    _completed = QtCore.pyqtSignal(int, object, bool)
+
+    def __init__(self, max_workers=4, parent=None):
+        super().__init__(parent)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._ids = itertools.count(1)
+        self._jobs = {}  # id -> (job, on_done, on_error)
+        self._lanes = {}  # lane name -> single-thread executor
+        self._lock = threading.Lock()
+        self._completed.connect(self._dispatch)
+
+    def submit(self, kind, fn, *args, on_done=None, on_error=None, supersede=True, lane=None):
+        """Run fn(job, *args) on the pool, or queued on `lane`; returns the Job handle"""
+        if supersede:
+            self.cancel(kind)
+        job = Job(next(self._ids), kind, self, lane)
+        with self._lock:
+            self._jobs[job.id] = (job, on_done, on_error)
+            if lane is None:
+                executor = self.pool
+            else:
+                executor = self._lanes.get(lane)
+                if executor is None:
+                    executor = self._lanes[lane] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"lane-{lane}")
+        executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        try:
+            job.check()
+            job.started = time.perf_counter()
+            self.job_started.emit(job.id, job.kind)
+            result = fn(job, *args)
+            self._completed.emit(job.id, result, True)
+        except JobCancelled as e:
+            self._completed.emit(job.id, e, False)
+        except Exception as e:
+            traceback.print_exc()
+            self._completed.emit(job.id, e, False)
+
+    def _dispatch(self, job_id, result, succeeded):
+        # Main thread
+        with self._lock:
+            job, on_done, on_error = self._jobs.pop(job_id, (None, None, None))
+        if job is None:
+            return
+        if job.cancelled or isinstance(result, JobCancelled):
+            self.job_cancelled.emit(job.id, job.kind)
+        elif succeeded:
+            self.job_finished.emit(job.id, job.kind, time.perf_counter() - (job.started or time.perf_counter()))
+            if on_done:
+                on_done(result)
+        else:
+            self.job_failed.emit(job.id, job.kind, str(result))
+            if on_error:
+                on_error(result)
+
+    def cancel(self, *kinds):
+        """Cancel the pending and running jobs of the given kinds (all jobs if none are given)"""
+        with self._lock:
+            jobs = [job for job, _, _ in self._jobs.values() if not kinds or job.kind in kinds]
+        for job in jobs:
+            job.cancel()
+        return len(jobs)
+
+    def running(self, kind=None, lane=None):
+        """Pending and running jobs, optionally only those of `kind` and/or on `lane`"""
+        with self._lock:
+            return [
+                job for job, _, _ in self._jobs.values()
+                if (kind is None or job.kind == kind) and (lane is None or job.lane == lane)
+            ]
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.shutdown(wait=False)
+        for lane in self._lanes.values():
+            lane.shutdown(wait=False)
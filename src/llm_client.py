@@ -1,44 +1,801 @@
-from openai import OpenAI
+import openai
+import httpx
 import sys
 import os
-import configparser
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import asyncio
+import queue
+import copy
 
-# Get the absolute path of the current file, move up one level, find config.ini using the absolute path, and read it
+try:
+    import h2  # noqa: F401  optional, enables HTTP/2 on the pooled connection
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Project root: one level up from this file. config.ini is parsed once by src.utils.config_loader
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
-config_path = os.path.join(project_root, 'config.ini')
-MYCONFIG = configparser.ConfigParser()
-MYCONFIG.read(config_path, encoding='utf-8')
+
+# Make `src` importable when this file is run directly (python src/xxx.py)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.config_loader import get_config
+MYCONFIG = get_config()
+
+from src.conversation import ConversationMemory, is_follow_up
+from src.llm_router import Endpoint, EndpointRouter, parse_endpoints
+from src.utils.metrics import TRACER
 
 def update_response(new_text):
     # Callback function to update the response
     print(new_text, end="", flush=True, sep="")
 
-class LLMClient:
-    def __init__(self, api_url=MYCONFIG['DEFAULT']['API_URL'], api_key=MYCONFIG['DEFAULT']['API_KEY'], model=MYCONFIG['DEFAULT']['MODEL']):
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url=api_url
-        )
-        self.model = model
-
-    def get_response(self, prompt, callback=None):
-        model = self.model
-        response = self.client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            stream=True
+def normalize_question(text):
+    """Lowercase, drop punctuation and collapse whitespace, so small transcription differences vanish"""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+def token_set_similarity(a, b):
+    """Jaccard similarity of the word sets of two normalized questions"""
+    words_a, words_b = set(a.split()), set(b.split())
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+class ResponseCache:
+    """SQLite-backed cache of LLM answers keyed by model, system prompt and normalized question.
+
+    An optional `context` (a digest of the conversation so far) narrows the key further, for
+    questions whose answer depends on earlier turns. Exact matches are looked up by key; otherwise the question is compared by token-set
+    similarity with the cached questions for the same model and prompt, which tolerates
+    the small differences between two Whisper transcriptions of the same question.
+    """
+    def __init__(self, path, ttl_seconds=30 * 24 * 3600, max_entries=1000, similarity=0.85):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, scope TEXT, question TEXT, answer TEXT,"
+                " created REAL, last_used REAL, hits INTEGER DEFAULT 0)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope, last_used)")
+
+    @classmethod
+    def from_config(cls, config=MYCONFIG['DEFAULT']):
+        path = config.get('LLM_CACHE_PATH', fallback='cache/llm_responses.sqlite3')
+        if not os.path.isabs(path):
+            path = os.path.join(project_root, path)
+        return cls(
+            path,
+            ttl_seconds=config.getfloat('LLM_CACHE_TTL_DAYS', fallback=30) * 24 * 3600,
+            max_entries=config.getint('LLM_CACHE_MAX_ENTRIES', fallback=1000),
+            similarity=config.getfloat('LLM_CACHE_SIMILARITY', fallback=0.85),
         )
-        full_response = ""
-        for chunk in response:
-            if not chunk.choices:
-                continue
-            delta = chunk.choices[0].delta
-            if hasattr(delta, "content") and delta.content:
-                full_response += delta.content
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    @staticmethod
+    def _scope(model, system_prompt, context=""):
+        return hashlib.sha256(f"{model}\0{system_prompt}\0{context}".encode("utf-8")).hexdigest()
+
+    def lookup(self, model, system_prompt, question, context=""):
+        """Return the cached answer for this question, or None"""
+        scope = self._scope(model, system_prompt, context)
+        norm = normalize_question(question)
+        if not norm:
+            return None
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+            row = db.execute("SELECT key, answer FROM responses WHERE key = ?", (self._key(scope, norm),)).fetchone()
+            if row is None:
+                best = None
+                for key, cached_question, answer in db.execute(
+                    "SELECT key, question, answer FROM responses WHERE scope = ?", (scope,)
+                ):
+                    score = token_set_similarity(norm, cached_question)
+                    if score >= self.similarity and (best is None or score > best[0]):
+                        best = (score, key, answer)
+                row = best[1:] if best else None
+            if row is None:
+                return None
+            db.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, row[0]))
+            return row[1]
+
+    @staticmethod
+    def _key(scope, norm):
+        return hashlib.sha256(f"{scope}\0{norm}".encode("utf-8")).hexdigest()
+
+    def store(self, model, system_prompt, question, answer, context=""):
+        scope = self._scope(model, system_prompt, context)
+        norm = normalize_question(question)
+        if not norm or not answer:
+            return
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, scope, question, answer, created, last_used, hits)"
+                " VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (self._key(scope, norm), scope, norm, answer, now, now),
+            )
+            # Size eviction: keep only the most recently used entries
+            db.execute(
+                "DELETE FROM responses WHERE key NOT IN"
+                " (SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM responses")
+
+
+class ResponseHandle:
+    """Stop a streaming reply from any thread.
+
+    cancel() closes the HTTP response mid-stream, which frees the pooled connection and stops
+    the token spend on the server. Pass the handle to get_response() or astream().
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._response = None
+        self._loop = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def _attach(self, response, loop=None):
+        with self._lock:
+            self._response, self._loop = response, loop
+            cancelled = self._cancelled
+        if cancelled:
+            self._close(response, loop)
+
+    def _detach(self):
+        with self._lock:
+            self._response = self._loop = None
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+            response, loop = self._response, self._loop
+        if response is not None:
+            self._close(response, loop)
+
+    @staticmethod
+    def _close(response, loop):
+        if loop is None:
+            response.close()
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.create_task(response.close())
+        elif not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(response.close(), loop)
+
+
+class ResponseCancelled(Exception):
+    """The reply was stopped through its ResponseHandle before the first token"""
+
+
+class DeltaCoalescer:
+    """Merge streamed deltas into fewer, larger pieces before they reach a callback.
+
+    A piece is released once `interval_ms` passed since the last one or `max_chars` are
+    buffered; both 0 passes every delta straight through. flush() releases the rest at the end.
+    Buffered text never waits longer than `interval_ms` when the stream pauses: the stream
+    loop waits at most time_left() for the next delta and flushes on its own thread, so the
+    callback always runs where the stream is consumed (see LLMClient._stream and astream).
+    """
+    def __init__(self, callback=None, interval_ms=0, max_chars=0):
+        self.callback = callback
+        self.interval = interval_ms / 1000
+        self.max_chars = max_chars
+        self._parts = []
+        self._chars = 0
+        self._last = time.perf_counter()
+
+    @classmethod
+    def from_config(cls, callback=None, interval_ms=None, max_chars=None, config=MYCONFIG['DEFAULT']):
+        if interval_ms is None:
+            interval_ms = config.getfloat('LLM_COALESCE_MS', fallback=0)
+        if max_chars is None:
+            max_chars = config.getint('LLM_COALESCE_CHARS', fallback=0)
+        return cls(callback, interval_ms, max_chars)
+
+    def add(self, delta):
+        """Buffer `delta`; returns (and passes to the callback) the text that is due, else None"""
+        if not self.interval and not self.max_chars:
+            return self._emit(delta)
+        self._parts.append(delta)
+        self._chars += len(delta)
+        now = time.perf_counter()
+        if (self.max_chars and self._chars >= self.max_chars) or (self.interval and now - self._last >= self.interval):
+            return self.flush()
+        return None
+
+    def time_left(self):
+        """Seconds until the buffered text is due, or None if nothing is waiting on the interval"""
+        if not self._parts or not self.interval:
+            return None
+        return max(0.0, self._last + self.interval - time.perf_counter())
+
+    def flush(self):
+        if not self._parts:
+            return ""
+        text = "".join(self._parts)
+        self._parts = []
+        self._chars = 0
+        return self._emit(text)
+
+    def _emit(self, text):
+        self._last = time.perf_counter()
+        if self.callback:
+            self.callback(text)
+        return text
+
+
+class LLMClient:
+    def __init__(self, api_url=MYCONFIG['DEFAULT']['API_URL'], api_key=MYCONFIG['DEFAULT']['API_KEY'], model=MYCONFIG['DEFAULT']['MODEL'],
+                 connect_timeout=MYCONFIG['DEFAULT'].getfloat('LLM_CONNECT_TIMEOUT', fallback=5.0),
+                 read_timeout=MYCONFIG['DEFAULT'].getfloat('LLM_READ_TIMEOUT', fallback=60.0),
+                 max_retries=MYCONFIG['DEFAULT'].getint('LLM_MAX_RETRIES', fallback=2),
+                 cache=None, refresh_cache=MYCONFIG['DEFAULT'].getboolean('LLM_CACHE_REFRESH', fallback=False),
+                 memory=None, endpoints=None,
+                 cache_context=MYCONFIG['DEFAULT'].get('LLM_CACHE_CONTEXT', fallback='question'),
+                 race=MYCONFIG['DEFAULT'].getboolean('LLM_ROUTING_RACE', fallback=False)):
+        # One long-lived pooled keep-alive connection, so a question does not pay DNS/TCP/TLS setup
+        self.api_url = api_url.rstrip("/")
+        self.max_retries = max_retries
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=10, max_keepalive_connections=4, keepalive_expiry=300)
+        self.http_client = httpx.Client(http2=HTTP2_AVAILABLE, timeout=self.timeout, limits=self.limits)
+        # `endpoints` is a list of (url, model, api_key). By default LLM_ENDPOINTS from config.ini is
+        # used, unless the caller points the client at another API_URL (e.g. a local mock server)
+        if endpoints is None:
+            endpoints = []
+            if api_url == MYCONFIG['DEFAULT']['API_URL']:
+                endpoints = parse_endpoints(MYCONFIG['DEFAULT'].get('LLM_ENDPOINTS', fallback=''), api_key)
+            endpoints = endpoints or [(api_url, model, api_key)]
+        # Retries are handled in get_response, where we know whether a token was already shown
+        self.endpoints = [Endpoint(url, name, key, self.http_client) for url, name, key in endpoints]
+        # Requests go to the endpoint with the lowest moving average of time to first token;
+        # with `race` the best two are asked at once and the slower one is closed
+        self.router = EndpointRouter(self.endpoints)
+        self.race = race
+        # The first endpoint names the model for the cache
+        self.client = self.endpoints[0].client
+        self.model = self.endpoints[0].model
+
+        # cache=None builds the cache from config.ini (if enabled), cache=False disables it
+        if cache is None and MYCONFIG['DEFAULT'].getboolean('LLM_CACHE_ENABLED', fallback=True):
+            cache = ResponseCache.from_config()
+        self.cache = cache or None
+        self.refresh_cache = refresh_cache
+        # "question": only follow-up questions are keyed by the conversation so far, self-contained
+        # ones are shared across conversations. "history": every answer is keyed by the history.
+        if cache_context not in ("question", "history"):
+            raise ValueError(f"Unknown LLM_CACHE_CONTEXT: {cache_context}")
+        self.cache_context = cache_context
+
+        # Multi-turn history under a token budget; memory=False sends every question on its own
+        if memory is None and MYCONFIG['DEFAULT'].getboolean('LLM_MEMORY_ENABLED', fallback=True):
+            memory = ConversationMemory(
+                max_prompt_tokens=MYCONFIG['DEFAULT'].getint('LLM_PROMPT_TOKEN_BUDGET', fallback=3000),
+                max_summary_tokens=MYCONFIG['DEFAULT'].getint('LLM_SUMMARY_TOKEN_BUDGET', fallback=300),
+            )
+        self.memory = memory or None
+
+    def warm_up(self, block=False):
+        """Open the pooled connection ahead of the first request (e.g. when recording starts)"""
+        def _run():
+            for endpoint in self.endpoints:
+                try:
+                    self.http_client.head(endpoint.url + "/models")
+                except httpx.HTTPError as e:
+                    print(f"LLM connection warm-up failed ({endpoint.name}): {e}")
+
+        if block:
+            _run()
+            return None
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        return thread
+
+    def fork(self):
+        """A client with its own conversation memory that shares the connection pool, endpoint
+        routing and cache of this one (one per interview session of the service)"""
+        forked = copy.copy(self)
+        if self.memory:
+            forked.memory = ConversationMemory(
+                max_prompt_tokens=self.memory.max_prompt_tokens,
+                max_summary_tokens=self.memory.max_summary_tokens,
+                counter=self.memory.counter,
+            )
+        return forked
+
+    def _prepare(self, prompt, system_prompt):
+        system_prompt = system_prompt or ""
+        if self.memory:
+            # Earlier turns (or a summary of them) give follow-up questions their context
+            messages = self.memory.build_messages(prompt, system_prompt)
+        else:
+            content = f"{system_prompt}\n{prompt}" if system_prompt else prompt
+            messages = [{"role": "user", "content": content}]
+        return system_prompt, messages
+
+    def _context(self, prompt):
+        # The cache key is the question, plus a digest of the history when the answer depends on it
+        if not self.memory:
+            return ""
+        if self.cache_context == "question" and not is_follow_up(prompt):
+            return ""
+        return self.memory.digest()
+
+    def _lookup(self, system_prompt, prompt, context):
+        with TRACER.span("llm_cache_lookup"):
+            return self.cache.lookup(self.model, system_prompt, prompt, context)
+
+    def _finish(self, system_prompt, prompt, answer, messages, context="", cached=False, remember=True):
+        if cached:
+            print("LLM cache hit")
+            if self.refresh_cache:
+                threading.Thread(
+                    target=self._refresh, args=(messages, system_prompt, prompt, context), daemon=True
+                ).start()
+        elif self.cache:
+            self.cache.store(self.model, system_prompt, prompt, answer, context)
+        if self.memory and remember:
+            self.memory.add_turn(prompt, answer)
+
+    def get_response(self, prompt, callback=None, system_prompt=None, use_cache=True, remember=True,
+                     handle=None, coalesce_ms=None, coalesce_chars=None):
+        """Stream the answer to `prompt` through `callback` and return the full text.
+
+        `system_prompt` (normally DEFAULT_PROMPT) is put in front of the prompt. A cached answer
+        to the same or a nearly identical question is returned through `callback` at once; a
+        follow-up question only matches answers given after the same conversation history.
+        With `remember=False` the turn is not added to the conversation memory.
+        `handle` (a ResponseHandle) lets another thread stop the reply; the text received so far
+        is returned and neither cached nor remembered. Deltas are coalesced before `callback` by
+        time and/or size, see DeltaCoalescer.
+        """
+        system_prompt, messages = self._prepare(prompt, system_prompt)
+        context = self._context(prompt)
+        if self.cache and use_cache:
+            cached = self._lookup(system_prompt, prompt, context)
+            if cached is not None:
                 if callback:
-                    callback(delta.content)
+                    callback(cached)
+                self._finish(system_prompt, prompt, cached, messages, context, cached=True, remember=remember)
+                return cached
+
+        coalescer = DeltaCoalescer.from_config(callback, coalesce_ms, coalesce_chars)
+        try:
+            full_response = self._stream(messages, coalescer.add if callback else None, handle,
+                                         coalescer if callback else None)
+        finally:
+            coalescer.flush()
+        if handle and handle.cancelled:
+            print("LLM reply stopped")
+            return full_response
+        self._finish(system_prompt, prompt, full_response, messages, context, remember=remember)
         return full_response
+
+    def _refresh(self, messages, system_prompt, prompt, context=""):
+        # Re-ask in the background so the cached answer does not go stale
+        try:
+            self.cache.store(self.model, system_prompt, prompt, self._stream(messages), context)
+        except Exception as e:
+            print(f"LLM cache refresh failed: {e}")
+
+    def _record_total(self, model, start, first_token, deltas):
+        end = time.perf_counter()
+        if first_token is not None:
+            generation = end - first_token
+            TRACER.record(
+                "llm_total", end - start, model=model, deltas=deltas,
+                tokens_per_sec=round(deltas / generation, 1) if generation > 0 else None,
+            )
+
+    def _contenders(self, exclude):
+        """The best endpoint, or the best two in race mode"""
+        ranked = self.router.ranked(exclude)
+        return ranked[:2] if self.race and len(ranked) > 1 else ranked[:1]
+
+    def _open_stream(self, endpoint, messages, on_open=None):
+        """Start a streaming request and read up to the first token.
+
+        Returns (response, remaining chunks, first text, seconds to first token).
+        """
+        start = time.perf_counter()
+        response = endpoint.client.chat.completions.create(model=endpoint.model, messages=messages, stream=True)
+        if on_open:
+            on_open(response)
+        chunks = iter(response)
+        try:
+            for chunk in chunks:
+                text = _content(chunk)
+                if text:
+                    return response, chunks, text, time.perf_counter() - start
+        except BaseException:
+            response.close()
+            raise
+        return response, chunks, "", time.perf_counter() - start
+
+    def _connect(self, endpoint, messages, handle=None):
+        try:
+            response, chunks, text, ttft = self._open_stream(
+                endpoint, messages, on_open=handle._attach if handle else None
+            )
+        except Exception:
+            if not (handle and handle.cancelled):
+                self.router.record_error(endpoint)
+            raise
+        self.router.record_ttft(endpoint, ttft)
+        return endpoint, response, chunks, text
+
+    def _race(self, endpoints, messages, handle=None):
+        """Send the request to all `endpoints` at once, keep the first to stream a token and close the others"""
+        results = queue.Queue()
+        opened = {}
+        decided = []
+        lock = threading.Lock()
+        start = time.perf_counter()
+
+        def run(endpoint):
+            def on_open(response):
+                with lock:
+                    opened[endpoint] = response
+                    lost = bool(decided)
+                if lost:
+                    response.close()
+
+            try:
+                result = self._open_stream(endpoint, messages, on_open=on_open)
+            except Exception as e:
+                if not decided:
+                    self.router.record_error(endpoint)
+                results.put((endpoint, None, e))
+                return
+            with lock:
+                lost = bool(decided)
+            if lost:
+                result[0].close()
+            else:
+                results.put((endpoint, result, None))
+
+        for endpoint in endpoints:
+            threading.Thread(target=run, args=(endpoint,), daemon=True).start()
+        error = None
+        failed = set()
+        for _ in endpoints:
+            while True:
+                try:
+                    endpoint, result, error_or_none = results.get(timeout=0.05)
+                    break
+                except queue.Empty:
+                    if handle and handle.cancelled:
+                        result = None
+                        break
+            if result is None and not (handle and handle.cancelled):
+                error = error_or_none
+                failed.add(endpoint)
+                continue
+            with lock:
+                decided.append(endpoint if result else None)
+                losers = [(ep, response) for ep, response in opened.items() if ep is not endpoint or not result]
+            for loser, response in losers:
+                response.close()
+            if result is None:
+                raise ResponseCancelled()
+            response, chunks, text, ttft = result
+            self.router.record_ttft(endpoint, ttft)
+            # The losers took at least this long, which keeps their average honest
+            for loser in endpoints:
+                if loser is not endpoint and loser not in failed:
+                    self.router.record_lower_bound(loser, time.perf_counter() - start)
+            TRACER.record("llm_race", ttft, winner=endpoint.name)
+            return endpoint, response, chunks, text
+        raise error
+
+    def _stream(self, messages, callback=None, handle=None, coalescer=None):
+        attempt = 0
+        start = time.perf_counter()
+        tried = set()
+        while True:
+            # Collected as parts, joining once at the end is linear in the reply length
+            parts = []
+            first_token = None
+            contenders = self._contenders(tried)
+            try:
+                if len(contenders) > 1:
+                    endpoint, response, chunks, text = self._race(contenders, messages, handle)
+                else:
+                    endpoint, response, chunks, text = self._connect(contenders[0], messages, handle)
+                if handle:
+                    handle._attach(response)
+                texts = _texts(text, chunks)
+                if coalescer is not None and coalescer.interval:
+                    # A pause in the stream must not hold back buffered text
+                    texts = _poll(texts, coalescer.time_left, on_exit=response.close)
+                try:
+                    for text in texts:
+                        if text is None:
+                            coalescer.flush()
+                            continue
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                            TRACER.record("llm_ttft", first_token - start, model=endpoint.model,
+                                          endpoint=endpoint.name, retries=attempt)
+                        parts.append(text)
+                        if callback:
+                            callback(text)
+                finally:
+                    texts.close()
+                    if handle:
+                        handle._detach()
+                self._record_total(endpoint.model, start, first_token, len(parts))
+                return "".join(parts)
+            except Exception as e:
+                if handle and handle.cancelled:
+                    # Closing the response from another thread ends the iteration with an error
+                    return "".join(parts)
+                # Once a token was shown to the user a retry would duplicate the text
+                if parts or attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                attempt += 1
+                # The next attempt goes to the next best endpoint, if there is one
+                tried.update(contenders)
+                print(f"LLM request failed before the first token ({e}), retry {attempt}/{self.max_retries}")
+                time.sleep(min(0.25 * 2 ** (attempt - 1), 2.0))
+
+    async def _aopen_stream(self, endpoint, messages):
+        client = endpoint.async_client(asyncio.get_running_loop(), self.timeout, self.limits, HTTP2_AVAILABLE)
+        start = time.perf_counter()
+        response = await client.chat.completions.create(model=endpoint.model, messages=messages, stream=True)
+        chunks = response.__aiter__()
+        try:
+            async for chunk in chunks:
+                text = _content(chunk)
+                if text:
+                    return response, chunks, text, time.perf_counter() - start
+        except BaseException:
+            await response.close()
+            raise
+        return response, chunks, "", time.perf_counter() - start
+
+    async def _aconnect(self, contenders, messages):
+        """Async counterpart of _connect/_race"""
+        start = time.perf_counter()
+        tasks = {asyncio.ensure_future(self._aopen_stream(ep, messages)): ep for ep in contenders}
+        pending = set(tasks)
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = []
+                for task in done:
+                    if task.exception() is not None:
+                        self.router.record_error(tasks[task])
+                        error = task.exception()
+                    else:
+                        winners.append(task)
+                if not winners:
+                    continue
+                for extra in winners[1:]:
+                    await extra.result()[0].close()
+                endpoint = tasks[winners[0]]
+                response, chunks, text, ttft = winners[0].result()
+                self.router.record_ttft(endpoint, ttft)
+                for task in pending:
+                    self.router.record_lower_bound(tasks[task], time.perf_counter() - start)
+                if len(contenders) > 1:
+                    TRACER.record("llm_race", ttft, winner=endpoint.name)
+                return endpoint, response, chunks, text
+            raise error
+        finally:
+            # Cancelling a loser closes its response, see _aopen_stream
+            for task in pending:
+                task.cancel()
+
+    async def astream(self, prompt, system_prompt=None, use_cache=True, remember=True, handle=None,
+                      coalesce_ms=None, coalesce_chars=None):
+        """Async iterator over the answer to `prompt`, the asyncio counterpart of get_response().
+
+        Leaving the `async for` early (break, task cancellation, Ctrl+C in asyncio.run) or calling
+        handle.cancel() closes the HTTP stream at once, which frees the connection and stops the
+        token spend. A reply that was stopped is neither cached nor remembered.
+        """
+        system_prompt, messages = self._prepare(prompt, system_prompt)
+        context = self._context(prompt)
+        if self.cache and use_cache:
+            cached = self._lookup(system_prompt, prompt, context)
+            if cached is not None:
+                self._finish(system_prompt, prompt, cached, messages, context, cached=True, remember=remember)
+                yield cached
+                return
+
+        coalescer = DeltaCoalescer.from_config(None, coalesce_ms, coalesce_chars)
+        attempt = 0
+        start = time.perf_counter()
+        tried = set()
+        parts = []
+        first_token = None
+        completed = False
+        endpoint = None
+        while True:
+            contenders = self._contenders(tried)
+            try:
+                endpoint, response, chunks, text = await self._aconnect(contenders, messages)
+                if handle:
+                    handle._attach(response, asyncio.get_running_loop())
+                try:
+                    first = [text] if text else []
+                    async for chunk in _apoll(_achain(first, chunks), coalescer.time_left):
+                        if chunk is None:
+                            # The stream paused, release what is buffered instead of holding it
+                            text = coalescer.flush()
+                            if text:
+                                yield text
+                            continue
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                            TRACER.record("llm_ttft", first_token - start, model=endpoint.model,
+                                          endpoint=endpoint.name, retries=attempt)
+                        parts.append(chunk)
+                        text = coalescer.add(chunk)
+                        if text:
+                            yield text
+                    completed = not (handle and handle.cancelled)
+                finally:
+                    if handle:
+                        handle._detach()
+                    # Also runs when the consumer stops iterating: the connection goes back to the pool
+                    await response.close()
+                break
+            except Exception as e:
+                if handle and handle.cancelled:
+                    break
+                if parts or attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                attempt += 1
+                tried.update(contenders)
+                print(f"LLM request failed before the first token ({e}), retry {attempt}/{self.max_retries}")
+                await asyncio.sleep(min(0.25 * 2 ** (attempt - 1), 2.0))
+        rest = coalescer.flush()
+        if rest:
+            yield rest
+        self._record_total(endpoint.model if endpoint else self.model, start, first_token, len(parts))
+        if completed:
+            self._finish(system_prompt, prompt, "".join(parts), messages, context, remember=remember)
+        else:
+            print("LLM reply stopped")
+
+    def close(self):
+        self.http_client.close()
+
+    async def aclose(self):
+        for endpoint in self.endpoints:
+            await endpoint.aclose()
+
+
+def _content(chunk):
+    if not chunk.choices:
+        return None
+    delta = chunk.choices[0].delta
+    return getattr(delta, "content", None) or None
+
+
+def _texts(first, chunks):
+    """The first text read by _open_stream, then the text of the remaining chunks"""
+    if first:
+        yield first
+    for chunk in chunks:
+        text = _content(chunk)
+        if text:
+            yield text
+
+
+async def _achain(first, chunks):
+    for text in first:
+        yield text
+    async for chunk in chunks:
+        text = _content(chunk)
+        if text:
+            yield text
+
+
+def _poll(items, timeout, on_exit=None):
+    """Iterate `items` from a helper thread, yielding None whenever `timeout()` seconds pass
+    without a new one; the synchronous counterpart of _apoll.
+
+    `on_exit` runs if the consumer stops early, e.g. to close the HTTP response the helper
+    thread is blocked on.
+    """
+    results = queue.Queue()
+
+    def _pump():
+        try:
+            for item in items:
+                results.put((True, item))
+            results.put((False, None))
+        except BaseException as e:
+            results.put((False, e))
+
+    threading.Thread(target=_pump, daemon=True).start()
+    finished = False
+    try:
+        while True:
+            try:
+                more, item = results.get(timeout=timeout())
+            except queue.Empty:
+                yield None
+                continue
+            if not more:
+                finished = True
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        if not finished and on_exit is not None:
+            on_exit()
+
+
+async def _apoll(chunks, timeout):
+    """Iterate `chunks`, yielding None whenever `timeout()` seconds pass without a new one.
+
+    The pending read is not cancelled on a timeout, so no chunk is lost.
+    """
+    iterator = chunks.__aiter__()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=timeout())
+            if not done:
+                yield None
+                continue
+            task, pending = pending, None
+            try:
+                chunk = task.result()
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+def _is_retryable(error):
+    """Connection problems, timeouts, rate limits and server errors are worth another try"""
+    if isinstance(error, (httpx.TransportError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
     
 
 
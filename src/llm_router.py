@@ -0,0 +1,119 @@
+# llm_router.py
+import threading
+import time
+from urllib.parse import urlparse
+
+import httpx
+import openai
+from openai import OpenAI
+
+
+def parse_endpoints(value, default_api_key=""):
+    """Parse LLM_ENDPOINTS: one `url | model [| api_key]` entry per line (or separated by `;`)"""
+    endpoints = []
+    for entry in value.replace(";", "\n").splitlines():
+        fields = [field.strip() for field in entry.split("|")]
+        if not fields[0]:
+            continue
+        if len(fields) < 2 or not fields[1]:
+            raise ValueError(f"LLM_ENDPOINTS entry needs `url | model`: {entry.strip()}")
+        endpoints.append((fields[0], fields[1], fields[2] if len(fields) > 2 and fields[2] else default_api_key))
+    return endpoints
+
+
+class Endpoint:
+    """One OpenAI-compatible API and model, with its measured time to first token and error rate"""
+    def __init__(self, url, model, api_key, http_client):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        # All endpoints share the pooled httpx client, connections are kept per host
+        self.client = OpenAI(api_key=api_key, base_url=url, http_client=http_client, max_retries=0)
+        self.ttft = None        # moving average, seconds
+        self.errors = 0.0       # moving average of failures per request, decays over time
+        self.requests = 0
+        self.failures = 0
+        self.last_error = None
+        self._async = None
+
+    @property
+    def name(self):
+        return f"{self.model}@{urlparse(self.url).netloc or self.url}"
+
+    def async_client(self, loop, timeout, limits, http2):
+        # httpx.AsyncClient is bound to the event loop it first ran on
+        if self._async is None or self._async[0] is not loop:
+            http_client = httpx.AsyncClient(http2=http2, timeout=timeout, limits=limits)
+            self._async = (loop, openai.AsyncOpenAI(
+                api_key=self.api_key, base_url=self.url, http_client=http_client, max_retries=0,
+            ))
+        return self._async[1]
+
+    async def aclose(self):
+        if self._async is not None:
+            await self._async[1].close()
+            self._async = None
+
+
+class EndpointRouter:
+    """Orders endpoints by an exponential moving average of time to first token, penalized by errors.
+
+    Endpoints that were never measured come first, so every endpoint gets tried. The error
+    rate decays with `error_half_life` seconds, which gives a failing endpoint another chance
+    once it has been quiet for a while.
+    """
+    def __init__(self, endpoints, alpha=0.3, error_penalty=4.0, error_half_life=60.0):
+        self.endpoints = list(endpoints)
+        self.alpha = alpha
+        self.error_penalty = error_penalty
+        self.error_half_life = error_half_life
+        self._lock = threading.Lock()
+
+    def error_rate(self, endpoint, now=None):
+        if endpoint.last_error is None:
+            return endpoint.errors
+        elapsed = (now or time.monotonic()) - endpoint.last_error
+        return endpoint.errors * 0.5 ** (elapsed / self.error_half_life)
+
+    def score(self, endpoint, now=None):
+        """Expected time to first token; lower is better"""
+        if endpoint.ttft is None and endpoint.failures == 0:
+            return -1.0
+        # An endpoint that only ever failed is ranked as if it took a second
+        ttft = endpoint.ttft if endpoint.ttft is not None else 1.0
+        return ttft * (1 + self.error_penalty * self.error_rate(endpoint, now))
+
+    def ranked(self, exclude=()):
+        """Endpoints from best to worst, skipping `exclude` unless nothing else is left"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [ep for ep in self.endpoints if ep not in exclude] or list(self.endpoints)
+            return sorted(candidates, key=lambda ep: self.score(ep, now))
+
+    def record_ttft(self, endpoint, seconds):
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.ttft = seconds if endpoint.ttft is None else (1 - self.alpha) * endpoint.ttft + self.alpha * seconds
+            endpoint.errors = (1 - self.alpha) * self.error_rate(endpoint)
+            endpoint.last_error = time.monotonic() if endpoint.last_error is not None else None
+
+    def record_lower_bound(self, endpoint, seconds):
+        """Record a race loser, which took at least `seconds` to its first token.
+
+        An endpoint that was never measured gets `seconds` as its first sample, otherwise it
+        would keep the unmeasured rank and be raced again on every request.
+        """
+        self.record_ttft(endpoint, seconds if endpoint.ttft is None else max(endpoint.ttft, seconds))
+
+    def record_error(self, endpoint):
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.failures += 1
+            endpoint.errors = (1 - self.alpha) * self.error_rate(endpoint) + self.alpha
+            endpoint.last_error = time.monotonic()
+
+    def summary(self):
+        return ", ".join(
+            f"{ep.name}: ttft {ep.ttft:.2f}s" if ep.ttft is not None else f"{ep.name}: ttft -"
+            for ep in self.ranked()
+        ) + "".join(f" | {ep.name} errors {self.error_rate(ep):.0%}" for ep in self.endpoints if ep.failures)
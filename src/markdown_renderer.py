@@ -0,0 +1,154 @@
+# markdown_renderer.py
+import re
+import threading
+
+
+def to_html(text):
+    # markdown2 is imported on first use, not when the GUI starts
+    import markdown2
+    return markdown2.markdown(text)
+
+
+LIST_ITEM = re.compile(r"([-*+]|\d{1,9}[.)])(\s|$)")
+PARTIAL_ITEM = re.compile(r"[-*+]|\d{1,9}[.)]?")
+# [text][id] and [id][]; shortcut references ([id]) are too ambiguous to track
+REFERENCE = re.compile(r"\[([^\]]+)\]\[([^\]]*)\]")
+DEFINITION = re.compile(r"^ {0,3}\[([^\]]+)\]:[ \t]*\S.*$", re.M)
+# a[i][j] in code is not a link
+CODE = re.compile(r"^ *(```|~~~).*?(^ *\1|\Z)|`[^`\n]*`", re.M | re.S)
+
+
+def _list_kind(line):
+    match = LIST_ITEM.match(line)
+    if not match:
+        return None
+    return "bullet" if match.group(1) in "-*+" else "ordered"
+
+
+def link_definitions(text):
+    """The reference-style link definition lines of `text`"""
+    return [match.group(0) for match in DEFINITION.finditer(text)]
+
+
+def _unresolved(text):
+    defined = {match.group(1).strip().lower() for match in DEFINITION.finditer(text)}
+    for match in REFERENCE.finditer(CODE.sub("", text)):
+        if (match.group(2) or match.group(1)).strip().lower() not in defined:
+            return True
+    return False
+
+
+def split_finished(text, definitions=()):
+    """Split streamed Markdown into (finished, tail).
+
+    `finished` ends at the last blank line that is outside a fenced code block and is followed
+    by a non-indented line, so it can be rendered on its own and will never change again.
+    Items of one list stay together (a loose list would otherwise restart its numbering), and
+    the split never passes a reference-style link whose definition has not arrived yet
+    (`definitions` are those from earlier finished blocks). `tail` is the block still being written.
+    """
+    in_fence = False
+    fence = ""
+    candidates = []
+    pos = 0
+    blank_before = False
+    list_kind = None
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if not in_fence and stripped and not line[0].isspace():
+            kind = _list_kind(line)
+            # A line still being written ("2") may yet turn out to continue the list
+            pending_item = list_kind and not line.endswith("\n") and PARTIAL_ITEM.fullmatch(line)
+            if blank_before and not pending_item and not (kind and kind == list_kind):
+                candidates.append(pos)
+            if blank_before or kind:
+                list_kind = kind
+        if stripped.startswith("```") or stripped.startswith("~~~"):
+            if not in_fence:
+                in_fence, fence = True, stripped[:3]
+            elif stripped.startswith(fence):
+                in_fence = False
+        blank_before = not stripped and line.endswith("\n")
+        pos += len(line)
+    known = "\n".join(definitions)
+    for split_at in reversed(candidates):
+        if not _unresolved(known + "\n" + text[:split_at]):
+            return text[:split_at], text[split_at:]
+    return "", text
+
+
+class MarkdownStreamRenderer:
+    """Render a streamed LLM reply incrementally.
+
+    feed() only appends to a buffer, so it is cheap enough to call for every token from any
+    thread. render() is meant to be called at a fixed frame rate from the UI thread: finished
+    Markdown blocks are converted to HTML exactly once, and only the trailing unfinished block
+    is converted again on every frame. HTML of completed turns is cached in `history`.
+    """
+    def __init__(self):
+        self.history = []
+        self._lock = threading.Lock()
+        self._reset_turn()
+
+    def _reset_turn(self):
+        self._parts = []
+        self._new = []
+        self._tail = ""
+        self._finished_html = []
+        self._tail_html = ""
+        # Link definitions of finished blocks, so later blocks can still reference them
+        self._definitions = []
+
+    def _to_html(self, text):
+        if self._definitions:
+            text = text + "\n\n" + "\n".join(self._definitions) + "\n"
+        return to_html(text)
+
+    @property
+    def text(self):
+        """Markdown source of the current turn"""
+        return "".join(self._parts)
+
+    def feed(self, delta):
+        with self._lock:
+            self._parts.append(delta)
+            self._new.append(delta)
+
+    def render(self):
+        """Return (new_finished_html, tail_html) or None if nothing changed since the last frame.
+
+        The caller appends `new_finished_html` to the finished part of the current turn and
+        replaces the previous tail with `tail_html`.
+        """
+        with self._lock:
+            if not self._new:
+                return None
+            pending = self._tail + "".join(self._new)
+            self._new = []
+        finished, self._tail = split_finished(pending, self._definitions)
+        new_html = ""
+        if finished:
+            new_html = self._to_html(finished)
+            self._finished_html.append(new_html)
+            self._definitions += link_definitions(finished)
+        self._tail_html = self._to_html(self._tail) if self._tail.strip() else ""
+        return new_html, self._tail_html
+
+    def end_turn(self, footer=""):
+        """Flush the current reply (plus an optional Markdown footer) into the history cache.
+
+        Returns the HTML of whatever was not rendered as finished yet; it replaces the tail.
+        """
+        with self._lock:
+            pending = self._tail + "".join(self._new) + footer
+            self._new = []
+        html = self._to_html(pending) if pending.strip() else ""
+        self._finished_html.append(html)
+        self.history.append("".join(self._finished_html))
+        with self._lock:
+            self._reset_turn()
+        return html
+
+    def html(self):
+        """The whole conversation as one HTML document (cached turns plus the current one)"""
+        return "".join(self.history) + "".join(self._finished_html) + self._tail_html
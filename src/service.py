@@ -0,0 +1,287 @@
+# service.py
+import io
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Make `src` importable when this file is run directly (python src/xxx.py)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.config_loader import get_config
+from src.utils.audio import WHISPER_SAMPLE_RATE, pcm_to_float32, resample
+from src.utils.metrics import TRACER
+from src.llm_client import ResponseHandle
+
+MYCONFIG = get_config()
+
+
+def decode_upload(data, rate=WHISPER_SAMPLE_RATE, channels=1):
+    """16 kHz mono float32 of an uploaded body: a 16-bit PCM WAV file, or raw s16le PCM at `rate`/`channels`"""
+    if data[:4] == b"RIFF":
+        with wave.open(io.BytesIO(bytes(data)), "rb") as wave_file:
+            if wave_file.getsampwidth() != 2:
+                raise ValueError("Only 16-bit PCM WAV uploads are supported")
+            rate, channels = wave_file.getframerate(), wave_file.getnchannels()
+            data = wave_file.readframes(wave_file.getnframes())
+    frame = 2 * channels
+    data = bytes(data[:len(data) - len(data) % frame])
+    return resample(pcm_to_float32(data, channels), rate)
+
+
+class ServiceSession:
+    """One candidate: the pinned transcription language and the LLM conversation"""
+    def __init__(self, session_id, client, language=None, min_language_probability=0.8):
+        self.id = session_id
+        self.client = client
+        self.language = language
+        self.min_language_probability = min_language_probability
+        self.questions = 0
+        self.last_active = time.monotonic()
+        # One question at a time per session, the conversation memory is not shared between threads
+        self.lock = threading.Lock()
+        self.handle = None
+
+    def observe_language(self, language, probability):
+        if self.language is None and probability and probability >= self.min_language_probability:
+            self.language = language
+            print(f"[{self.id}] transcription language locked: {language} ({probability:.2f})")
+
+
+class InterviewService:
+    """Answers the questions of several sessions with one shared Whisper model and LLM connection pool.
+
+    Audio of concurrent questions is transcribed in batches by a BatchDecoder; each session has
+    its own conversation memory (LLMClient.fork) and its answer is streamed back as it arrives.
+    """
+    def __init__(self, decoder, client, system_prompt=MYCONFIG['DEFAULT']['DEFAULT_PROMPT'],
+                 language=MYCONFIG['DEFAULT'].get('WHISPER_LANGUAGE', fallback=''),
+                 session_ttl=MYCONFIG['DEFAULT'].getfloat('SERVICE_SESSION_TTL', fallback=3600)):
+        self.decoder = decoder
+        self.client = client
+        self.system_prompt = system_prompt
+        self.language = language.strip() or None
+        self.session_ttl = session_ttl
+        self.sessions = {}
+        self.stats = {"sessions": 0, "questions": 0, "audio_seconds": 0.0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def create_session(self):
+        self._expire()
+        session = ServiceSession(uuid.uuid4().hex[:12], self.client.fork(), self.language)
+        with self._lock:
+            self.sessions[session.id] = session
+            self.stats["sessions"] += 1
+        return session
+
+    def get_session(self, session_id):
+        with self._lock:
+            session = self.sessions.get(session_id)
+        if session:
+            session.last_active = time.monotonic()
+        return session
+
+    def close_session(self, session_id):
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if session and session.handle:
+            session.handle.cancel()
+        return session is not None
+
+    def _expire(self):
+        # Sessions whose client went away without DELETE
+        cutoff = time.monotonic() - self.session_ttl
+        with self._lock:
+            expired = [sid for sid, s in self.sessions.items() if s.last_active < cutoff and not s.lock.locked()]
+        for session_id in expired:
+            self.close_session(session_id)
+
+    def ask(self, session, audio, emit, answer=True):
+        """Transcribe `audio` and stream the answer; `emit(event)` receives the events of the response"""
+        with session.lock:
+            start = time.perf_counter()
+            result = self.decoder.transcribe(audio, session.language)
+            session.observe_language(result["language"], result["language_probability"])
+            text = result["text"]
+            transcribed = time.perf_counter()
+            with self._lock:
+                self.stats["questions"] += 1
+                self.stats["audio_seconds"] += len(audio) / WHISPER_SAMPLE_RATE
+            emit({"event": "transcript", "text": text, "language": result["language"],
+                  "seconds": round(transcribed - start, 3)})
+            session.questions += 1
+            if not answer or not text:
+                emit({"event": "done"})
+                return
+            first_token = []
+
+            def on_delta(delta):
+                if not first_token:
+                    first_token.append(time.perf_counter())
+                try:
+                    emit({"event": "delta", "text": delta})
+                except OSError:
+                    # The client went away: close the LLM stream so no more tokens are paid for
+                    session.handle.cancel()
+                    raise
+
+            session.handle = ResponseHandle()
+            try:
+                session.client.get_response(text, callback=on_delta, system_prompt=self.system_prompt,
+                                            handle=session.handle)
+            finally:
+                session.handle = None
+            end = time.perf_counter()
+            TRACER.record("service_turn", end - start, session=session.id)
+            emit({"event": "done",
+                  "first_token_seconds": round(first_token[0] - transcribed, 3) if first_token else None,
+                  "seconds": round(end - start, 3)})
+
+    def record_error(self, session, error):
+        with self._lock:
+            self.stats["errors"] += 1
+        print(f"[{session.id}] question failed: {error}")
+
+    def summary(self):
+        decoder = self.decoder.stats
+        with self._lock:
+            return dict(self.stats, active_sessions=len(self.sessions), cores=os.cpu_count(),
+                        batches=decoder["batches"], clips=decoder["clips"],
+                        mean_batch=round(self.decoder.mean_batch, 2), largest_batch=decoder["largest_batch"],
+                        decode_seconds=round(decoder["decode_seconds"], 3))
+
+
+class ServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, ServiceHandler)
+        self.service = service
+
+    def handle_error(self, request, client_address):
+        # A client that goes away mid-answer resets the connection, that is expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP API, one JSON object per line:
+
+    POST   /sessions                    -> {"session": id}
+    POST   /sessions/<id>/audio         body: WAV or raw s16le PCM (?rate=16000&channels=1), may be
+                                        chunked; streams transcript, delta and done events
+                                        (?answer=0 only transcribes)
+    DELETE /sessions/<id>
+    GET    /stats
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _read_body(self):
+        """The request body piece by piece as it arrives, chunked or with Content-Length"""
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    # Skip the trailers up to the final empty line
+                    while self.rfile.readline().strip():
+                        pass
+                    return
+                yield self.rfile.read(size)
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get("Content-Length", 0))
+            while remaining > 0:
+                data = self.rfile.read(min(remaining, 65536))
+                if not data:
+                    return
+                remaining -= len(data)
+                yield data
+
+    def _route(self):
+        parts = [part for part in urlparse(self.path).path.split("/") if part]
+        return parts, parse_qs(urlparse(self.path).query)
+
+    def do_GET(self):
+        parts, _ = self._route()
+        if parts == ["stats"]:
+            self._send_json(200, self.server.service.summary())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) == 2 and parts[0] == "sessions" and self.server.service.close_session(parts[1]):
+            self._send_json(200, {"closed": parts[1]})
+        else:
+            self._send_json(404, {"error": "unknown session"})
+
+    def do_POST(self):
+        service = self.server.service
+        parts, query = self._route()
+        if parts == ["sessions"]:
+            for _ in self._read_body():
+                pass
+            self._send_json(201, {"session": service.create_session().id})
+            return
+        if len(parts) != 3 or parts[0] != "sessions" or parts[2] != "audio":
+            self._send_json(404, {"error": "not found"})
+            return
+        session = service.get_session(parts[1])
+        # The audio is taken in as it streams in, whatever the answer to it will be
+        data = bytearray()
+        for piece in self._read_body():
+            data += piece
+        if session is None:
+            self._send_json(404, {"error": "unknown session"})
+            return
+        try:
+            audio = decode_upload(data, int(query.get("rate", [WHISPER_SAMPLE_RATE])[0]),
+                                  int(query.get("channels", [1])[0]))
+        except (ValueError, wave.Error) as e:
+            self._send_json(400, {"error": f"bad audio: {e}"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def emit(event):
+            self._write_chunk((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+
+        try:
+            service.ask(session, audio, emit, answer=query.get("answer", ["1"])[0] != "0")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            return
+        except Exception as e:
+            service.record_error(session, e)
+            emit({"event": "error", "error": str(e)})
+        self.wfile.write(b"0\r\n\r\n")
@@ -0,0 +1,229 @@
+# speculative.py
+import re
+import sys
+import os
+import time
+import threading
+
+# Make `src` importable when this file is run directly (python src/xxx.py)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.config_loader import get_config
+from src.utils.metrics import TRACER
+from src.conversation import TokenCounter
+from src.llm_client import ResponseHandle, normalize_question, token_set_similarity
+
+MYCONFIG = get_config()
+
+QUESTION_END = re.compile(r"[?？]\s*$")
+QUESTION_START = re.compile(
+    r"^(what|why|how|when|where|which|who|whom|whose|can|could|would|should|do|does|did|is|are|"
+    r"was|were|have|has|will|tell me|describe|explain|walk me through)\b", re.IGNORECASE)
+
+
+class SpeculationCancelled(Exception):
+    """Raised from the stream callback to abort a speculative request"""
+
+
+def looks_complete(text, pause_seconds, min_chars=20, min_pause=0.6):
+    """Heuristic: does this partial transcript look like a finished question?
+
+    A question mark ends a question at once; a sentence that starts like a question or ends with
+    a full stop counts as finished after the speaker paused for `min_pause` seconds.
+    """
+    text = text.strip()
+    if len(text) < min_chars:
+        return False
+    if QUESTION_END.search(text):
+        return True
+    last_sentence = re.split(r"(?<=[.!?。！？])\s+", text)[-1]
+    if pause_seconds >= min_pause and (QUESTION_START.match(last_sentence) or text.endswith((".", "。"))):
+        return True
+    # A long pause ends the question whatever the punctuation
+    return pause_seconds >= 2 * min_pause
+
+
+class Speculation:
+    """One answer streamed in the background for a question that may still change"""
+    def __init__(self, client, question, system_prompt):
+        self.client = client
+        self.question = question
+        self.normalized = normalize_question(question)
+        self.system_prompt = system_prompt
+        self.deltas = []
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.answer = None
+        self.error = None
+        self.done = threading.Event()
+        self._cancelled = False
+        self.handle = ResponseHandle()
+        self._consumer = None
+        self._lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            # Memory is only updated if the answer is promoted, see SpeculativePrefetcher.resolve
+            self.answer = self.client.get_response(self.question, callback=self._on_delta,
+                                                   system_prompt=self.system_prompt, remember=False,
+                                                   handle=self.handle)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def _on_delta(self, delta):
+        if self._cancelled:
+            # Still paid for, counted as wasted
+            with self._lock:
+                self.deltas.append(delta)
+            raise SpeculationCancelled()
+        with self._lock:
+            if self.first_token is None:
+                self.first_token = time.perf_counter()
+            self.deltas.append(delta)
+            if self._consumer:
+                self._consumer(delta)
+
+    def attach(self, callback):
+        """Replay what was generated so far through `callback`, then stream the rest through it"""
+        with self._lock:
+            if self.deltas:
+                callback("".join(self.deltas))
+            self._consumer = callback
+
+    def cancel(self):
+        self._cancelled = True
+        # Close the stream now instead of at the next delta
+        self.handle.cancel()
+
+    @property
+    def text(self):
+        with self._lock:
+            return "".join(self.deltas)
+
+
+class SpeculativePrefetcher:
+    """Start the LLM answer while the question is still being transcribed.
+
+    Feed every partial transcript to on_partial(). Once it looks like a complete question the
+    answer is requested in the background. resolve() is called with the final transcript: if it
+    matches the speculated question within `similarity`, the answer is promoted (already partly
+    or fully generated); otherwise the speculation is cancelled and resolve() returns None so the
+    caller asks normally.
+    """
+    def __init__(self, client, system_prompt=None,
+                 similarity=MYCONFIG['DEFAULT'].getfloat('LLM_SPECULATIVE_SIMILARITY', fallback=0.9),
+                 min_chars=MYCONFIG['DEFAULT'].getint('LLM_SPECULATIVE_MIN_CHARS', fallback=20),
+                 min_pause=MYCONFIG['DEFAULT'].getfloat('LLM_SPECULATIVE_PAUSE', fallback=0.6),
+                 counter=None):
+        self.client = client
+        self.system_prompt = system_prompt
+        self.similarity = similarity
+        self.min_chars = min_chars
+        self.min_pause = min_pause
+        self.counter = counter or (client.memory.counter if client.memory else TokenCounter())
+        self.speculation = None
+        self.stats = {"speculations": 0, "hits": 0, "misses": 0, "wasted_tokens": 0, "latency_saved": 0.0}
+        self._last_text = ""
+        self._last_change = time.perf_counter()
+        self._discarded = []
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """A new question starts: drop whatever was speculated for the previous one"""
+        with self._lock:
+            self._discard()
+            self._last_text = ""
+            self._last_change = time.perf_counter()
+
+    def on_partial(self, text, pause_seconds=None):
+        """Feed a partial transcript; `pause_seconds` defaults to how long the text has been unchanged"""
+        now = time.perf_counter()
+        with self._lock:
+            if text != self._last_text:
+                self._last_text = text
+                self._last_change = now
+            if pause_seconds is None:
+                pause_seconds = now - self._last_change
+            if self.speculation and not self._matches(self.speculation, text):
+                # The question went on after we guessed it was complete
+                self._discard()
+            if self.speculation is None and looks_complete(text, pause_seconds, self.min_chars, self.min_pause):
+                self.speculation = Speculation(self.client, text, self.system_prompt)
+                self.stats["speculations"] += 1
+                print(f"LLM speculation started: {text[:60]}")
+
+    def _matches(self, speculation, text):
+        return token_set_similarity(speculation.normalized, normalize_question(text)) >= self.similarity
+
+    def _discard(self):
+        if self.speculation is None:
+            return
+        self.speculation.cancel()
+        self.stats["misses"] += 1
+        # Tokens are counted once the stream has really stopped, see _count_wasted
+        self._discarded.append(self.speculation)
+        self.speculation = None
+
+    def _count_wasted(self):
+        for speculation in [s for s in self._discarded if s.done.is_set()]:
+            self._discarded.remove(speculation)
+            self.stats["wasted_tokens"] += self.counter.count(speculation.text)
+
+    def resolve(self, final_text, callback=None, handle=None):
+        """Return the promoted answer to `final_text` (streamed through `callback`), or None on a miss.
+
+        Cancelling `handle` (a ResponseHandle) stops a promoted answer like a normal reply.
+        """
+        resolved = time.perf_counter()
+        with self._lock:
+            speculation, self.speculation = self.speculation, None
+            if speculation is None:
+                return None
+            if not self._matches(speculation, final_text) or (speculation.done.is_set() and speculation.error):
+                self.speculation = speculation
+                self._discard()
+                TRACER.record("llm_speculation", 0.0, hit=False)
+                return None
+        try:
+            if callback:
+                speculation.attach(callback)
+            while not speculation.done.wait(0.05):
+                if handle and handle.cancelled:
+                    speculation.cancel()
+        except BaseException:
+            # The caller gave up on the answer (stop button, Ctrl+C)
+            speculation.cancel()
+            raise
+        if speculation.handle.cancelled:
+            return speculation.text
+        if speculation.error:
+            raise speculation.error
+        if self.client.memory:
+            self.client.memory.add_turn(final_text, speculation.answer)
+        # Without speculation the first token would have come one TTFT after the final transcript
+        first_token = speculation.first_token or time.perf_counter()
+        ttft = first_token - speculation.started
+        saved = max(0.0, resolved + ttft - max(resolved, first_token))
+        with self._lock:
+            self.stats["hits"] += 1
+            self.stats["latency_saved"] += saved
+        TRACER.record("llm_speculation", saved, hit=True)
+        return speculation.answer
+
+    @property
+    def hit_rate(self):
+        decided = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / decided if decided else 0.0
+
+    def summary(self):
+        with self._lock:
+            self._count_wasted()
+        s = self.stats
+        return (f"speculation: {s['hits']}/{s['speculations']} hits ({self.hit_rate:.0%}), "
+                f"{s['wasted_tokens']} wasted tokens, {s['latency_saved']:.2f}s saved")
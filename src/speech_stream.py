@@ -0,0 +1,167 @@
+# speech_stream.py
+import re
+import sys
+import os
+import time
+import threading
+
+# Make `src` importable when this file is run directly (python src/xxx.py)
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.metrics import TRACER
+
+FENCE = re.compile(r"^\s*(```|~~~)")
+TABLE_RULE = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+SENTENCE_END = re.compile(r"[.!?;。！？；…]+[\"'”’)\]]*")
+CJK_END = set("。！？；…")
+# "e.g. " and "Dr. " do not end a sentence
+ABBREVIATIONS = {"e.g", "i.e", "etc", "vs", "mr", "mrs", "ms", "dr", "prof", "no", "fig", "approx"}
+
+
+def clean_markdown_line(line):
+    """Turn one line of Markdown into plain text to be spoken"""
+    line = line.strip()
+    if TABLE_RULE.match(line) or re.fullmatch(r"[-*_]{3,}", line):
+        return ""
+    line = re.sub(r"^#{1,6}\s*", "", line)
+    line = re.sub(r"^(>\s*)+", "", line)
+    line = re.sub(r"^([-*+]|\d+[.)])\s+", "", line)
+    line = re.sub(r"!?\[([^\]]*)\]\([^)]*\)?", r"\1", line)
+    line = re.sub(r"<[^>]+>", " ", line)
+    line = line.replace("`", "").replace("*", "").replace("~", "").replace("[", "").replace("]", "")
+    # Underscores only mark emphasis at word edges, keep snake_case words intact
+    line = re.sub(r"(?<!\w)_+|_+(?!\w)", "", line)
+    if line.startswith("|"):
+        line = ", ".join(cell.strip() for cell in line.strip("|").split("|") if cell.strip())
+    return " ".join(line.split())
+
+
+class SentenceSegmenter:
+    """Split a streamed Markdown reply into sentences as soon as they are complete.
+
+    Every line of Markdown (paragraph, list item, heading) ends a sentence; inside a line a
+    sentence ends at . ! ? ; followed by whitespace, or at Chinese end punctuation. Fenced
+    code blocks are not spoken. Fragments shorter than `min_chars` are joined with the next
+    sentence, and a run longer than `max_chars` without punctuation is cut at a comma or space.
+    """
+    def __init__(self, min_chars=8, max_chars=200):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.reset()
+
+    def reset(self):
+        self._line = ""
+        self._spoken = 0
+        self._in_fence = False
+
+    def feed(self, delta):
+        """Add streamed text; returns the sentences completed by it"""
+        self._line += delta
+        sentences = []
+        while "\n" in self._line:
+            line, self._line = self._line.split("\n", 1)
+            sentences += self._end_line(line)
+        if not self._in_fence and not self._line.lstrip().startswith(("`", "~")):
+            sentences += self._split(clean_markdown_line(self._line))
+        return sentences
+
+    def flush(self):
+        """The rest of the reply once the stream has ended"""
+        sentences = self._end_line(self._line)
+        self.reset()
+        return sentences
+
+    def _end_line(self, line):
+        spoken, self._spoken = self._spoken, 0
+        if FENCE.match(line):
+            self._in_fence = not self._in_fence
+            return []
+        if self._in_fence:
+            return []
+        rest = clean_markdown_line(line)[spoken:].strip()
+        return [rest] if rest else []
+
+    def _split(self, text):
+        """Emit the finished sentences of the current line; `self._spoken` marks what is out already"""
+        pending = text[self._spoken:]
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(pending):
+            end = match.end()
+            if pending[match.start()] not in CJK_END:
+                # Wait for the next character: "3." may still become "3.14"
+                if end >= len(pending) or not pending[end].isspace():
+                    continue
+                word = re.search(r"([\w.]+)$", pending[start:match.start()])
+                if word and (word.group(1).lower() in ABBREVIATIONS or re.fullmatch(r"[A-Z]", word.group(1))):
+                    continue
+            sentence = pending[start:end].strip()
+            if len(sentence) < self.min_chars:
+                continue
+            sentences.append(sentence)
+            start = end
+        if len(pending) - start > self.max_chars:
+            # Prefer a clause boundary, fall back to the last space
+            cut = max(pending.rfind(sep, start, start + self.max_chars) for sep in (", ", "，", "、"))
+            if cut <= start:
+                cut = pending.rfind(" ", start, start + self.max_chars)
+            if cut > start:
+                sentences.append(pending[start:cut + 1].strip())
+                start = cut + 1
+        self._spoken += start
+        return sentences
+
+
+class SpeechStream:
+    """Speak an LLM reply while it is still being generated.
+
+    Pass feed() as (part of) the `callback` of LLMClient.get_response(). Every completed sentence
+    is queued on the VoiceGenerator right away, so it is synthesized while the LLM keeps writing
+    and played back to back with the previous one. Time to first audio is recorded as the
+    `tts_first_audio` stage.
+    """
+    def __init__(self, voice, segmenter=None):
+        self.voice = voice
+        self.segmenter = segmenter or SentenceSegmenter()
+        self.sentences = []
+        self.started = None
+        self.first_audio = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Mark the start of the turn (the request to the LLM) for the time-to-first-audio measurement"""
+        self.started = time.perf_counter()
+        self.first_audio = None
+        self.sentences = []
+        self.segmenter.reset()
+
+    def feed(self, delta):
+        if self.started is None:
+            self.start()
+        with self._lock:
+            sentences = self.segmenter.feed(delta)
+        for sentence in sentences:
+            self._speak(sentence)
+
+    def finish(self):
+        """The reply is complete: speak what is left"""
+        with self._lock:
+            sentences = self.segmenter.flush()
+        for sentence in sentences:
+            self._speak(sentence)
+
+    def _speak(self, sentence):
+        self.sentences.append(sentence)
+        on_start = self._on_first_audio if len(self.sentences) == 1 else None
+        self.voice.speak(sentence, on_start=on_start)
+
+    def _on_first_audio(self):
+        self.first_audio = time.perf_counter() - self.started
+        TRACER.record("tts_first_audio", self.first_audio, sentence_chars=len(self.sentences[0]))
+
+    def cancel(self):
+        with self._lock:
+            self.segmenter.reset()
+        self.voice.stop()
@@ -1,29 +1,723 @@
 # The model file is automatically downloaded on the first run
 import whisper
-from whisper.utils import get_writer
+import torch
+import numpy as np
+import gc
 import os
-import configparser
+import sys
+import time
+import threading
+import queue
+from collections import OrderedDict
+from concurrent.futures import Future
 
-#Obtain the absolute path of the current file, go up one level, find the config.ini with the absolute path, and read it
+# Project root: one level up from this file. config.ini is parsed once by src.utils.config_loader
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
-config_path = os.path.join(project_root, 'config.ini')
-MYCONFIG = configparser.ConfigParser()
-MYCONFIG.read(config_path,encoding='utf-8')
+
+# Make `src` importable when this file is run directly (python src/xxx.py)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.config_loader import get_config
+MYCONFIG = get_config()
+
+from src.utils.metrics import TRACER
+from src.utils.audio import WavMap
+
+
+def default_device():
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def default_precision(device):
+    # fp16 only pays off on GPU, whisper falls back to fp32 on CPU anyway
+    return "fp16" if device == "cuda" else "fp32"
+
+
+# Named inference profiles, selected with WHISPER_PROFILE in config.ini.
+#   quantize          dynamic int8 quantization of the Linear layers (CPU only)
+#   intra_op_threads  torch.set_num_threads, 0 keeps torch's default (one per core)
+#   inter_op_threads  torch.set_num_interop_threads, 0 keeps torch's default
+#   beam_size/best_of/temperature  whisper decoding options; a single temperature disables fallback
+#   cpu_fp16          whether fp16 decoding is requested on CPU (whisper then warns and uses fp32)
+INFERENCE_PROFILES = {
+    "default": {
+        "quantize": False, "intra_op_threads": 0, "inter_op_threads": 0,
+        "beam_size": None, "best_of": 5, "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0), "cpu_fp16": False,
+    },
+    "low-latency": {
+        "quantize": True, "intra_op_threads": 0, "inter_op_threads": 1,
+        "beam_size": None, "best_of": None, "temperature": (0.0,), "cpu_fp16": False,
+    },
+    "balanced": {
+        "quantize": True, "intra_op_threads": 0, "inter_op_threads": 1,
+        "beam_size": None, "best_of": 2, "temperature": (0.0, 0.4, 0.8), "cpu_fp16": False,
+    },
+    "accurate": {
+        "quantize": False, "intra_op_threads": 0, "inter_op_threads": 1,
+        "beam_size": 5, "best_of": 5, "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0), "cpu_fp16": False,
+    },
+}
+
+
+def get_profile(name):
+    if name not in INFERENCE_PROFILES:
+        raise ValueError(f"Unknown WHISPER_PROFILE '{name}', choose one of: {', '.join(INFERENCE_PROFILES)}")
+    return INFERENCE_PROFILES[name]
+
+
+def apply_thread_settings(profile):
+    """Apply the profile's torch thread counts (process-wide)"""
+    if profile["intra_op_threads"]:
+        torch.set_num_threads(profile["intra_op_threads"])
+    if profile["inter_op_threads"] and torch.get_num_interop_threads() != profile["inter_op_threads"]:
+        try:
+            torch.set_num_interop_threads(profile["inter_op_threads"])
+        except RuntimeError:
+            # Only possible before the first parallel operation of the process
+            print("torch inter-op threads already fixed, keeping", torch.get_num_interop_threads())
+
+
+def quantize_model(model):
+    """Dynamic int8 quantization of all Linear layers of a CPU Whisper model"""
+    for module in model.modules():
+        # whisper.model.Linear only adds a dtype cast to nn.Linear, which quantize_dynamic does not know
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded Whisper models keyed by (model size, device, precision).
+
+    Every SpeechTranscriber shares the models held here, so a model is read from disk once per
+    process. At most `max_models` models (and, if set, `max_memory_mb` of weights) stay loaded;
+    the least recently used one is unloaded when a new size is requested.
+
+    Whisper's decoder installs kv-cache hooks on the shared modules, so two inferences on one
+    model corrupt each other. Everything that runs a model holds its inference_lock().
+    """
+    def __init__(self, max_models=1, max_memory_mb=0):
+        self.max_models = max_models
+        self.max_memory_mb = max_memory_mb
+        self._models = OrderedDict()
+        self._loading = {}
+        self._inference_locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_size, device=None, precision=None):
+        device = device or default_device()
+        return (model_size, device, precision or default_precision(device))
+
+    def get(self, model_size, device=None, precision=None, warm_up=True):
+        """Return the model for this key, loading it (once, even across threads) if needed"""
+        key = self.key(model_size, device, precision)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            future = self._loading.get(key)
+            owner = future is None
+            if owner:
+                future = self._loading[key] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            model = self._load(key, warm_up)
+        except Exception as e:
+            future.set_exception(e)
+            with self._lock:
+                del self._loading[key]
+            raise
+        with self._lock:
+            self._models[key] = model
+            del self._loading[key]
+            self._evict()
+        future.set_result(model)
+        return model
+
+    def inference_lock(self, model_size, device=None, precision=None):
+        """Re-entrant lock serializing inference on the model for this key"""
+        key = self.key(model_size, device, precision)
+        with self._lock:
+            return self._inference_locks.setdefault(key, threading.RLock())
+
+    def preload(self, model_size, device=None, precision=None):
+        """Load and warm up a model on a background thread; returns the thread"""
+        def _run():
+            try:
+                self.get(model_size, device, precision)
+            except Exception as e:
+                print(f"Whisper model preload failed: {e}")
+
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        return thread
+
+    def is_loaded(self, model_size, device=None, precision=None):
+        return self.key(model_size, device, precision) in self._models
+
+    def unload(self, model_size=None, device=None, precision=None):
+        """Drop one model, or every model when model_size is None"""
+        with self._lock:
+            if model_size is None:
+                self._models.clear()
+            else:
+                self._models.pop(self.key(model_size, device, precision), None)
+        self._release_memory()
+
+    def _load(self, key, warm_up):
+        model_size, device, precision = key
+        print(f"Loading Whisper model: {model_size} ({device}, {precision})")
+        model = whisper.load_model(model_size, device=device)
+        if precision == "int8":
+            model = quantize_model(model)
+        if warm_up:
+            # The first inference pays for kernel selection and allocator growth, do it now
+            model.transcribe(np.zeros(whisper.audio.SAMPLE_RATE, dtype=np.float32), fp16=precision == "fp16")
+        return model
+
+    @staticmethod
+    def _model_mb(model):
+        return sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024)
+
+    def _evict(self):
+        # Called with the lock held; the newest model is never evicted
+        evicted = False
+        while len(self._models) > 1 and (
+            len(self._models) > self.max_models
+            or (self.max_memory_mb and sum(self._model_mb(m) for m in self._models.values()) > self.max_memory_mb)
+        ):
+            key, _ = self._models.popitem(last=False)
+            print(f"Unloading Whisper model: {key[0]} ({key[1]}, {key[2]})")
+            evicted = True
+        if evicted:
+            self._release_memory()
+
+    @staticmethod
+    def _release_memory():
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+MODEL_REGISTRY = ModelRegistry(
+    max_models=MYCONFIG['DEFAULT'].getint('WHISPER_MAX_MODELS', fallback=1),
+    max_memory_mb=MYCONFIG['DEFAULT'].getint('WHISPER_MAX_MEMORY_MB', fallback=0),
+)
 
 
 class SpeechTranscriber:
-    def __init__(self, model_size=MYCONFIG['DEFAULT']['WHISPER_MODEL_SIZW']):
-        self.model = whisper.load_model(model_size)
+    def __init__(self, model_size=MYCONFIG['DEFAULT']['WHISPER_MODEL_SIZW'], device=None, precision=None,
+                 registry=MODEL_REGISTRY, profile=MYCONFIG['DEFAULT'].get('WHISPER_PROFILE', fallback='default')):
+        # The model itself lives in the shared registry and is loaded on first use
+        self.model_size = model_size
+        self.device = device or default_device()
+        self.profile_name = profile
+        self.profile = get_profile(profile)
+        if precision is None and self.profile["quantize"] and self.device == "cpu":
+            precision = "int8"
+        self.precision = precision or default_precision(self.device)
+        self.registry = registry
+        if self.device == "cpu":
+            apply_thread_settings(self.profile)
+
+    def decode_options(self, **options):
+        """Whisper decoding options of the profile, overridden by `options`"""
+        profile = self.profile
+        fp16 = self.precision == "fp16" or (self.device == "cpu" and profile["cpu_fp16"])
+        defaults = {"fp16": fp16, "temperature": profile["temperature"]}
+        if profile["beam_size"]:
+            defaults["beam_size"] = profile["beam_size"]
+        if profile["best_of"] and len(profile["temperature"]) > 1:
+            defaults["best_of"] = profile["best_of"]
+        defaults.update(options)
+        return defaults
+
+    @property
+    def model(self):
+        return self.registry.get(self.model_size, self.device, self.precision)
+
+    @property
+    def inference_lock(self):
+        return self.registry.inference_lock(self.model_size, self.device, self.precision)
+
+    @property
+    def is_ready(self):
+        return self.registry.is_loaded(self.model_size, self.device, self.precision)
+
+    def preload(self):
+        """Start loading the model in the background so the first question does not wait for it"""
+        return self.registry.preload(self.model_size, self.device, self.precision)
         
     def transcribe(self, audio_path):
         #Determine whether the size of the audio file is less than 1 byte
 
         if os.path.getsize(audio_path) < 1:
             return "The audio file size is 0"
-        result = self.model.transcribe(audio_path)
+        if is_long_wav(audio_path):
+            # Whisper would decode the whole file into memory, read it window by window instead
+            return " ".join(segment["text"] for segment in self.transcribe_long(audio_path))
+        with self.inference_lock, TRACER.span("transcribe", source="file"):
+            result = self.model.transcribe(audio_path, **self.decode_options())
         return result["text"]
 
+    def decode(self, audio, **options):
+        """Run Whisper on a 16 kHz mono float32 array and return the full result dict"""
+        options = self.decode_options(**options)
+        audio_seconds = len(audio) / whisper.audio.SAMPLE_RATE
+        with self.inference_lock, TRACER.span("transcribe", audio_seconds=round(audio_seconds, 3)) as span:
+            start = time.perf_counter()
+            result = self.model.transcribe(np.asarray(audio, dtype=np.float32), **options)
+            if audio_seconds:
+                span.set(rtf=round((time.perf_counter() - start) / audio_seconds, 4))
+        return result
+
+    def transcribe_long(self, audio_path, window_seconds=30.0, overlap_seconds=5.0, **options):
+        """Transcribe a long 16-bit PCM WAV file with flat memory use, yielding segments as they are done.
+
+        The file is memory-mapped and decoded in windows of `window_seconds` that overlap by
+        `overlap_seconds`. Segments that lie within the overlap were already produced by the
+        previous window; words repeated across the seam are dropped. Each segment is a dict with
+        `start`, `end` (seconds in the file) and `text`.
+
+        The model's inference lock is held per window, not while the caller consumes segments.
+        """
+        wav = WavMap(audio_path)
+        tail = ""
+        covered = 0.0
+        for window_start, audio in wav.windows(window_seconds, overlap_seconds):
+            if len(audio) < whisper.audio.SAMPLE_RATE // 10:
+                break
+            # The previous window's text as prompt keeps wording consistent across the seam
+            with self.inference_lock:
+                result = self.decode(audio, initial_prompt=tail or None, **options)
+            for segment in result["segments"]:
+                start = window_start + segment["start"]
+                end = window_start + segment["end"]
+                if end <= covered:
+                    continue
+                # Inside the time already emitted the timestamps confirm even a one-word repeat
+                text = strip_seam(tail, segment["text"].strip(), max_words=32, min_words=1 if start < covered else 2)
+                if not text:
+                    continue
+                tail = f"{tail} {text}"[-200:]
+                yield {"start": round(max(start, covered), 2), "end": round(end, 2), "text": text}
+                covered = end
+
+    def transcribe_array(self, audio, **options):
+        """Transcribe audio already in memory, skipping the WAV file and the ffmpeg decode"""
+        if len(audio) == 0:
+            return "The audio buffer is empty"
+        return self.decode(audio, **options)["text"]
+
+
+def strip_seam(committed, new_text, max_words=8, min_words=2):
+    """new_text without its leading words that repeat the end of committed.
+
+    A repeat shorter than `min_words` is kept: a single shared word ("the", "I") at the seam
+    is far more often genuine speech than text decoded twice.
+    """
+    old_words = committed.split()
+    new_words = new_text.split()
+    for n in range(min(max_words, len(old_words), len(new_words)), min_words - 1, -1):
+        tail = [w.strip(".,!?;:").lower() for w in old_words[-n:]]
+        head = [w.strip(".,!?;:").lower() for w in new_words[:n]]
+        if tail == head:
+            return " ".join(new_words[n:])
+    return " ".join(new_words)
+
+
+def is_long_wav(path, min_seconds=MYCONFIG['DEFAULT'].getfloat('LONG_FILE_SECONDS', fallback=600)):
+    """True for a 16-bit PCM WAV file long enough to be transcribed with transcribe_long()"""
+    try:
+        return WavMap(path).duration > min_seconds
+    except (ValueError, OSError):
+        return False
+
+
+def merge_overlap(committed, new_text, max_words=8):
+    """Append new_text to committed, dropping words repeated across the seam of two windows"""
+    new_text = new_text.strip()
+    if not committed:
+        return new_text
+    if not new_text:
+        return committed
+    new_text = strip_seam(committed, new_text, max_words)
+    if not new_text:
+        return committed
+    return committed + " " + new_text
+
+
+class MelFrontend:
+    """log-Mel spectrogram of clips up to 30 s, with the Hann window, the mel filterbank and the
+    zero-padded input buffer allocated once instead of on every call"""
+    def __init__(self, n_mels, device):
+        self.window = torch.hann_window(whisper.audio.N_FFT, device=device)
+        self.filters = whisper.audio.mel_filters(device, n_mels)
+        self.buffer = torch.zeros(whisper.audio.N_SAMPLES, device=device)
+
+    def __call__(self, audio):
+        """(n_mels, 3000) log-Mel of `audio` padded to 30 s, like whisper.log_mel_spectrogram + pad_or_trim"""
+        audio = audio[:whisper.audio.N_SAMPLES]
+        self.buffer.zero_()
+        self.buffer[:len(audio)] = torch.from_numpy(np.asarray(audio, dtype=np.float32))
+        stft = torch.stft(self.buffer, whisper.audio.N_FFT, whisper.audio.HOP_LENGTH, window=self.window,
+                          return_complex=True)
+        magnitudes = stft[..., :-1].abs() ** 2
+        log_spec = torch.clamp(self.filters @ magnitudes, min=1e-10).log10()
+        log_spec = torch.maximum(log_spec, log_spec.max() - 8.0)
+        return (log_spec + 4.0) / 4.0
+
+
+class TranscriptionSession:
+    """Decoding state shared by all questions of one interview.
+
+    - The language is read from WHISPER_LANGUAGE or locked after the first detection with a
+      probability of at least `min_language_probability`; later clips skip detection.
+    - `initial_prompt` is the domain vocabulary plus the tail of the previous transcripts, which
+      keeps jargon and spelling consistent between questions.
+    - Clips up to 30 s are decoded directly from a MelFrontend that reuses its buffers, with
+      whisper's temperature fallback; longer clips go through model.transcribe().
+    """
+    def __init__(self, transcriber, language=MYCONFIG['DEFAULT'].get('WHISPER_LANGUAGE', fallback=''),
+                 vocabulary=MYCONFIG['DEFAULT'].get('WHISPER_VOCABULARY', fallback=''),
+                 max_prompt_chars=400, min_language_probability=0.8):
+        self.transcriber = transcriber
+        self.language = language.strip() or None
+        if isinstance(vocabulary, str):
+            vocabulary = [word.strip() for word in vocabulary.split(",")]
+        self.vocabulary = [word for word in vocabulary if word]
+        self.max_prompt_chars = max_prompt_chars
+        self.min_language_probability = min_language_probability
+        self.history = ""
+        self._frontend = None
+        self._lock = threading.Lock()
+
+    def _mel(self, audio):
+        model = self.transcriber.model
+        if self._frontend is None:
+            self._frontend = MelFrontend(model.dims.n_mels, model.device)
+        return self._frontend(audio)
+
+    def prompt(self, context=""):
+        """Vocabulary first, then as much of the latest transcript as fits in `max_prompt_chars`"""
+        glossary = f"Glossary: {', '.join(self.vocabulary)}." if self.vocabulary else ""
+        room = self.max_prompt_chars - len(glossary)
+        tail = " ".join(f"{self.history} {context}".split())
+        if len(tail) > room:
+            tail = tail[-room:].split(" ", 1)[-1]
+        return " ".join(part for part in (glossary, tail) if part) or None
+
+    def _observe_language(self, language, probability):
+        if self.language is None and probability >= self.min_language_probability:
+            self.language = language
+            print(f"Transcription language locked: {language} ({probability:.2f})")
+
+    def detect_language(self, audio):
+        """The session language, detecting (and possibly locking) it on the first 30 s of `audio`"""
+        with self._lock:
+            if self.language:
+                return self.language
+            model = self.transcriber.model
+            if not model.is_multilingual:
+                self.language = "en"
+                return self.language
+            with self.transcriber.inference_lock:
+                _, probs = model.detect_language(self._mel(audio))
+            language = max(probs, key=probs.get)
+            self._observe_language(language, probs[language])
+            return language
+
+    def decode_options(self, audio, context=""):
+        """Options for SpeechTranscriber.decode() on `audio` within this session"""
+        return {"language": self.detect_language(audio), "initial_prompt": self.prompt(context)}
+
+    def transcribe(self, audio):
+        """Transcribe one question and add it to the session context"""
+        if len(audio) == 0:
+            return ""
+        if len(audio) > whisper.audio.N_SAMPLES:
+            text = self.transcriber.decode(audio, **self.decode_options(audio))["text"].strip()
+        else:
+            with TRACER.span("transcribe", audio_seconds=round(len(audio) / whisper.audio.SAMPLE_RATE, 3), session=True):
+                text = self._decode_clip(audio)
+        self.add_transcript(text)
+        return text
+
+    def _decode_clip(self, audio):
+        # One 30 s window: the same decoding and temperature fallback as model.transcribe(),
+        # but language detection runs on the encoder output of the decode itself
+        model = self.transcriber.model
+        options = self.transcriber.decode_options()
+        with self._lock, self.transcriber.inference_lock:
+            mel = self._mel(audio)
+            result = None
+            for temperature in options["temperature"]:
+                kwargs = {}
+                if temperature > 0:
+                    if options.get("best_of"):
+                        kwargs["best_of"] = options["best_of"]
+                elif options.get("beam_size"):
+                    kwargs["beam_size"] = options["beam_size"]
+                result = model.decode(mel, whisper.DecodingOptions(
+                    language=self.language, prompt=self.prompt(), temperature=temperature,
+                    without_timestamps=True, fp16=options["fp16"] and model.device.type == "cuda", **kwargs,
+                ))
+                if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0:
+                    return ""
+                if result.compression_ratio <= 2.4 and result.avg_logprob >= -1.0:
+                    break
+        if result.language_probs:
+            self._observe_language(result.language, result.language_probs[result.language])
+        return result.text.strip()
+
+    def add_transcript(self, text):
+        self.history = " ".join(f"{self.history} {text}".split())[-self.max_prompt_chars:]
+
+    def reset(self):
+        """Forget the transcript context (the language lock is kept)"""
+        self.history = ""
+
+
+class BatchDecoder:
+    """One Whisper model shared by many sessions (the service, see src/service.py).
+
+    Clips submitted while the decoder is busy or within `max_wait` seconds of each other are
+    padded to 30 s, stacked and decoded together: one encoder pass and one batched decoder loop
+    per language instead of one per clip. A single worker thread owns the model. Temperature
+    fallback re-decodes only the clips that failed, again as a batch. All clips of a batch share
+    the glossary prompt (WHISPER_VOCABULARY); the per-session transcript history is not used.
+    """
+    def __init__(self, transcriber, max_batch=8, max_wait=0.05,
+                 vocabulary=MYCONFIG['DEFAULT'].get('WHISPER_VOCABULARY', fallback='')):
+        self.transcriber = transcriber
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        words = [word.strip() for word in vocabulary.split(",") if word.strip()]
+        self.prompt = f"Glossary: {', '.join(words)}." if words else None
+        self.stats = {"batches": 0, "clips": 0, "largest_batch": 0, "decode_seconds": 0.0}
+        self._queue = queue.Queue()
+        self._frontend = None
+        self._thread = threading.Thread(target=self._run, daemon=True, name="batch-decoder")
+        self._thread.start()
+
+    def submit(self, audio, language=None):
+        """Queue one clip of at most 30 s; the Future resolves to {text, language, language_probability}"""
+        future = Future()
+        self._queue.put((audio, language, future))
+        return future
+
+    def transcribe(self, audio, language=None):
+        """Text of `audio` (any length, cut into 30 s windows), blocking until its batches are decoded"""
+        windows = [audio[i:i + whisper.audio.N_SAMPLES] for i in range(0, len(audio), whisper.audio.N_SAMPLES)]
+        results = [future.result() for future in [self.submit(window, language) for window in windows]]
+        text = " ".join(result["text"] for result in results if result["text"])
+        detected = max(results, key=lambda r: r["language_probability"] or 0.0, default=None)
+        return {
+            "text": text,
+            "language": detected["language"] if detected else language,
+            "language_probability": detected["language_probability"] if detected else None,
+        }
+
+    def close(self):
+        self._queue.put(None)
+
+    @property
+    def mean_batch(self):
+        return self.stats["clips"] / self.stats["batches"] if self.stats["batches"] else 0.0
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = self._collect(item)
+            groups = OrderedDict()
+            for audio, language, future in batch:
+                groups.setdefault(language, []).append((audio, future))
+            for language, items in groups.items():
+                start = time.perf_counter()
+                try:
+                    with TRACER.span("transcribe_batch", clips=len(items)):
+                        results = self._decode([audio for audio, _ in items], language)
+                except Exception as e:
+                    for _, future in items:
+                        future.set_exception(e)
+                    continue
+                self.stats["batches"] += 1
+                self.stats["clips"] += len(items)
+                self.stats["largest_batch"] = max(self.stats["largest_batch"], len(items))
+                self.stats["decode_seconds"] += time.perf_counter() - start
+                for (_, future), result in zip(items, results):
+                    future.set_result(result)
+
+    def _decode(self, clips, language):
+        # The worker owns the model among the sessions, but other transcribers may share it
+        with self.transcriber.inference_lock:
+            return self._decode_locked(clips, language)
+
+    def _decode_locked(self, clips, language):
+        model = self.transcriber.model
+        if self._frontend is None:
+            self._frontend = MelFrontend(model.dims.n_mels, model.device)
+        # (clips, n_mels, 3000): every clip zero-padded to 30 s like a single decode
+        mel = torch.stack([self._frontend(clip) for clip in clips])
+        if language is None and not model.is_multilingual:
+            language = "en"
+        options = self.transcriber.decode_options()
+        results = [None] * len(clips)
+        pending = list(range(len(clips)))
+        for temperature in options["temperature"]:
+            kwargs = {}
+            if temperature > 0:
+                if options.get("best_of"):
+                    kwargs["best_of"] = options["best_of"]
+            elif options.get("beam_size"):
+                kwargs["beam_size"] = options["beam_size"]
+            decoded = model.decode(mel[pending], whisper.DecodingOptions(
+                language=language, prompt=self.prompt, temperature=temperature,
+                without_timestamps=True, fp16=options["fp16"] and model.device.type == "cuda", **kwargs,
+            ))
+            retry = []
+            for index, result in zip(pending, decoded):
+                results[index] = result
+                silent = result.no_speech_prob > 0.6 and result.avg_logprob < -1.0
+                if not silent and (result.compression_ratio > 2.4 or result.avg_logprob < -1.0):
+                    retry.append(index)
+            pending = retry
+            if not pending:
+                break
+        return [{
+            "text": "" if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0 else result.text.strip(),
+            "language": result.language,
+            "language_probability": result.language_probs[result.language] if result.language_probs else None,
+        } for result in results]
+
+
+class StreamingTranscriber:
+    """Transcribe an AudioBuffer incrementally while the recorder is still writing to it.
+
+    Every `step` seconds the uncommitted tail of the buffer (at most `window` seconds) is
+    transcribed. Segments that end more than `overlap` seconds before the end of the tail are
+    committed and never decoded again, so when recording stops only the last few seconds
+    are left to transcribe.
+    """
+    def __init__(self, transcriber, audio_buffer, callback=None, step=1.0, window=15.0, overlap=3.0, session=None):
+        self.transcriber = transcriber
+        # Optional TranscriptionSession: pinned language and vocabulary / previous-question prompt
+        self.session = session
+        self.audio_buffer = audio_buffer
+        self.callback = callback
+        self.step = step
+        self.window = window
+        self.overlap = overlap
+
+        self.committed_text = ""
+        self.partial_text = ""
+        self._committed_sample = 0
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def text(self):
+        return merge_overlap(self.committed_text, self.partial_text)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        seen = None
+        while not self._stop_event.wait(self.step):
+            # Read `closed` first so a block written right before close() is still picked up
+            closed = self.audio_buffer.closed
+            captured = self.audio_buffer.duration()
+            if captured == seen:
+                if closed:
+                    # Recording is over and everything was decoded, finish() handles the tail
+                    return
+                # Nothing new arrived, decoding the same tail again would give the same text
+                continue
+            seen = captured
+            try:
+                self._update()
+            except Exception as e:
+                print(f"live transcription failed: {e}")
+
+    def _update(self, final=False):
+        with self._lock:
+            audio = self.audio_buffer.get_audio(self._committed_sample)
+            duration = len(audio) / whisper.audio.SAMPLE_RATE
+            if duration < 0.5 and not final:
+                return
+            if duration < 0.1:
+                self.partial_text = ""
+                return
+
+            audio = audio[:int(self.window * whisper.audio.SAMPLE_RATE)] if not final else audio
+            if self.session:
+                options = self.session.decode_options(audio, context=self.committed_text)
+            else:
+                options = {"initial_prompt": self.committed_text[-200:] or None}
+            result = self.transcriber.decode(audio, **options)
+            segments = result["segments"]
+
+            if final:
+                self.committed_text = merge_overlap(self.committed_text, result["text"])
+                self.partial_text = ""
+                self._committed_sample += len(audio)
+            else:
+                # Commit segments that are safely behind the moving edge of the window
+                window = min(duration, self.window)
+                done = [seg for seg in segments if seg["end"] <= window - self.overlap]
+                if not done and duration >= self.window and segments:
+                    done = segments[:-1] or segments
+                if done:
+                    text = "".join(seg["text"] for seg in done)
+                    self.committed_text = merge_overlap(self.committed_text, text)
+                    self._committed_sample += int(done[-1]["end"] * whisper.audio.SAMPLE_RATE)
+                    self.partial_text = "".join(seg["text"] for seg in segments[len(done):]).strip()
+                else:
+                    self.partial_text = result["text"].strip()
+
+        if self.callback:
+            self.callback(self.text)
+
+    def stop(self):
+        """Stop the background loop without transcribing the remaining tail"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def finish(self):
+        """Stop the background loop, transcribe the remaining tail and return the full text"""
+        self.stop()
+        self._update(final=True)
+        if self.session:
+            self.session.add_transcript(self.text)
+        return self.text
+
 if __name__ == "__main__":
     transcriber = SpeechTranscriber()
     text = transcriber.transcribe("output/test_record.wav")
@@ -0,0 +1,114 @@
+# src/utils/audio.py
+import os
+import wave
+
+import numpy as np
+
+# Whisper expects 16 kHz mono float32 audio
+WHISPER_SAMPLE_RATE = 16000
+
+
+def pcm_to_float32(data, channels):
+    """Convert interleaved 16-bit PCM bytes into a mono float32 array in [-1, 1]"""
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels]
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def resample(samples, src_rate, dst_rate=WHISPER_SAMPLE_RATE):
+    """Linear-interpolation resampling, good enough for speech recognition input"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples.astype(np.float32, copy=False)
+    dst_len = int(len(samples) * dst_rate / src_rate)
+    positions = np.arange(dst_len, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def load_wav(path):
+    """Read a 16-bit PCM WAV file as 16 kHz mono float32 without spawning ffmpeg"""
+    with wave.open(path, "rb") as wave_file:
+        if wave_file.getsampwidth() != 2:
+            raise ValueError(f"Only 16-bit PCM WAV files are supported: {path}")
+        data = wave_file.readframes(wave_file.getnframes())
+        samples = pcm_to_float32(data, wave_file.getnchannels())
+        return resample(samples, wave_file.getframerate())
+
+
+class WavMap:
+    """Memory-mapped view of a 16-bit PCM WAV file for recordings too long to load at once.
+
+    Only the header is parsed on open. read() maps just the frames it needs and unmaps them
+    again, so memory stays flat however long the file is. A file that is still being written
+    (header sizes not final yet) is read up to its current end.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+                raise ValueError(f"Not a WAV file: {path}")
+            fmt = None
+            while True:
+                chunk = f.read(8)
+                if len(chunk) < 8:
+                    raise ValueError(f"No data chunk in WAV file: {path}")
+                chunk_id, size = chunk[:4], int.from_bytes(chunk[4:], "little")
+                if chunk_id == b"fmt ":
+                    fmt = f.read(size)
+                    f.seek(size % 2, 1)
+                elif chunk_id == b"data":
+                    self.offset = f.tell()
+                    break
+                else:
+                    f.seek(size + size % 2, 1)
+        if fmt is None or int.from_bytes(fmt[14:16], "little") != 16:
+            raise ValueError(f"Only 16-bit PCM WAV files are supported: {path}")
+        self.channels = int.from_bytes(fmt[2:4], "little")
+        self.rate = int.from_bytes(fmt[4:8], "little")
+        frame_bytes = 2 * self.channels
+        available = os.path.getsize(path) - self.offset
+        # A size of 0 or 0xFFFFFFFF means the writer has not finalized the header
+        self.frames = (min(size, available) if 0 < size < 0xFFFFFFFF else available) // frame_bytes
+
+    @property
+    def duration(self):
+        return self.frames / self.rate
+
+    @property
+    def samples(self):
+        """Length in 16 kHz samples"""
+        return int(self.frames * WHISPER_SAMPLE_RATE / self.rate)
+
+    def read(self, start, count):
+        """`count` samples of 16 kHz mono float32 audio starting at 16 kHz sample `start`"""
+        count = max(0, min(count, self.samples - start))
+        if count == 0:
+            return np.zeros(0, dtype=np.float32)
+        ratio = self.rate / WHISPER_SAMPLE_RATE
+        positions = np.arange(start, start + count, dtype=np.float64) * ratio
+        first = int(positions[0])
+        last = min(self.frames, int(positions[-1]) + 2)
+        pcm = np.memmap(self.path, dtype=np.int16, mode="r", offset=self.offset + first * 2 * self.channels,
+                        shape=(last - first, self.channels))
+        try:
+            samples = pcm.astype(np.float32).mean(axis=1) / 32768.0
+        finally:
+            del pcm
+        if self.rate == WHISPER_SAMPLE_RATE:
+            return samples[:count]
+        return np.interp(positions - first, np.arange(len(samples)), samples).astype(np.float32)
+
+    def windows(self, window_seconds=30.0, overlap_seconds=5.0):
+        """Yield (start_seconds, audio) windows of `window_seconds`, each overlapping the previous one"""
+        size = int(window_seconds * WHISPER_SAMPLE_RATE)
+        step = size - int(overlap_seconds * WHISPER_SAMPLE_RATE)
+        if step <= 0:
+            raise ValueError("overlap_seconds must be shorter than window_seconds")
+        start = 0
+        while start < self.samples:
+            yield start / WHISPER_SAMPLE_RATE, self.read(start, size)
+            if start + size >= self.samples:
+                break
+            start += step
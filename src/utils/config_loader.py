@@ -1,16 +1,22 @@
 # src/utils/config_loader.py
 import os
+import threading
 import configparser
 
-def get_config():
-    # 获取当前文件的绝对路径
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    # 向上回溯两级到项目根目录（workspace/）
-    project_root = os.path.dirname(os.path.dirname(current_dir))
-    config_path = os.path.join(project_root, 'config.ini')
-    
-    config = configparser.ConfigParser()
-    config.read(config_path)
+# 获取当前文件的绝对路径，向上回溯两级到项目根目录（workspace/）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+
+_config = None
+_lock = threading.Lock()
 
 
-    return config
\ No newline at end of file
+def get_config():
+    """config.ini, parsed once per process and shared by every module"""
+    global _config
+    with _lock:
+        if _config is None:
+            config = configparser.ConfigParser()
+            config.read(os.path.join(project_root, 'config.ini'), encoding='utf-8')
+            _config = config
+    return _config
@@ -0,0 +1,128 @@
+# src/utils/metrics.py
+import os
+import json
+import time
+import threading
+
+from src.utils.config_loader import get_config, project_root
+
+MYCONFIG = get_config()
+
+
+class _NullSpan:
+    """Returned by Tracer.span() while tracing is disabled, so a disabled span costs one call"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer.record(self.name, time.perf_counter() - self.start, **self.attrs)
+        return False
+
+    def set(self, **attrs):
+        """Attach extra attributes (e.g. sizes known only at the end) to the span"""
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """Per-stage timers for one session.
+
+    Every finished span is appended as one JSON line to the session trace file and folded into
+    running per-stage statistics for the live summary. When disabled, span() returns a shared
+    no-op object and record() returns immediately.
+    """
+    def __init__(self, enabled=False, trace_dir=None):
+        self.enabled = enabled
+        self.trace_dir = trace_dir
+        self.trace_path = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._stats = {}
+        self._last_attrs = {}
+
+    @classmethod
+    def from_config(cls, config=MYCONFIG['DEFAULT']):
+        trace_dir = config.get('METRICS_TRACE_DIR', fallback='output/traces')
+        if not os.path.isabs(trace_dir):
+            trace_dir = os.path.join(project_root, trace_dir)
+        return cls(enabled=config.getboolean('METRICS_ENABLED', fallback=False), trace_dir=trace_dir)
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attrs)
+
+    def record(self, name, seconds, **attrs):
+        """Record a duration measured elsewhere (e.g. time to first token)"""
+        if not self.enabled:
+            return
+        event = {"ts": time.time(), "stage": name, "seconds": round(seconds, 6)}
+        event.update(attrs)
+        with self._lock:
+            count, total, _ = self._stats.get(name, (0, 0.0, 0.0))
+            self._stats[name] = (count + 1, total + seconds, seconds)
+            self._last_attrs[name] = attrs
+            self._write(event)
+
+    def _write(self, event):
+        if not self.trace_dir:
+            return
+        if self._file is None:
+            os.makedirs(self.trace_dir, exist_ok=True)
+            self.trace_path = os.path.join(self.trace_dir, f"session_{int(time.time())}_{os.getpid()}.jsonl")
+            self._file = open(self.trace_path, "a", encoding="utf-8")
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def stats(self):
+        """{stage: {"count", "mean", "last"}} in seconds"""
+        with self._lock:
+            return {
+                name: {"count": count, "mean": total / count, "last": last}
+                for name, (count, total, last) in self._stats.items()
+            }
+
+    def summary(self):
+        """One line with the last duration of every stage, for the status bar or console"""
+        if not self.enabled:
+            return ""
+        parts = []
+        for name, stat in self.stats().items():
+            last = stat["last"]
+            text = f"{name} {last * 1000:.0f}ms" if last < 1 else f"{name} {last:.2f}s"
+            tokens_per_sec = self._last_attrs.get(name, {}).get("tokens_per_sec")
+            if tokens_per_sec:
+                text += f" ({tokens_per_sec:.0f} tok/s)"
+            parts.append(text)
+        return " | ".join(parts)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+TRACER = Tracer.from_config()
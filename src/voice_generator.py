@@ -1,9 +1,36 @@
-import edge_tts
 import pyaudiowpatch as pyaudio
 import subprocess
 import threading
+import queue
+import hashlib
+import sqlite3
+import time
+import os
+import sys
 from dataclasses import dataclass
-from typing import Optional, Callable
+from typing import Optional, Callable, Iterable, Iterator
+
+try:
+    import edge_tts
+except ImportError:
+    edge_tts = None
+
+try:
+    import miniaudio  # decodes MP3 in-process instead of through ffmpeg
+except ImportError:
+    miniaudio = None
+
+# Project root: one level up from this file. config.ini is parsed once by src.utils.config_loader
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+
+# Make `src` importable when this file is run directly (python src/xxx.py)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.utils.config_loader import get_config
+MYCONFIG = get_config()
+
 
 @dataclass
 class TTSConfig:
@@ -11,15 +38,81 @@ class TTSConfig:
     sample_rate: int = 24000
     channels: int = 1
     format: int = pyaudio.paInt16
+    # Frames per stream.write(); larger buffers survive a busy GUI thread without underruns
+    write_frames: int = 4096
+    cache_enabled: bool = True
+    cache_path: str = os.path.join(project_root, "cache", "tts_pcm.sqlite3")
+    cache_max_mb: float = 200
+
+    @classmethod
+    def from_config(cls, config=MYCONFIG['DEFAULT']):
+        cache_path = config.get('TTS_CACHE_PATH', fallback='cache/tts_pcm.sqlite3')
+        if not os.path.isabs(cache_path):
+            cache_path = os.path.join(project_root, cache_path)
+        return cls(
+            voice=config.get('TTS_VOICE', fallback=cls.voice),
+            write_frames=config.getint('TTS_WRITE_FRAMES', fallback=cls.write_frames),
+            cache_enabled=config.getboolean('TTS_CACHE_ENABLED', fallback=True),
+            cache_path=cache_path,
+            cache_max_mb=config.getfloat('TTS_CACHE_MAX_MB', fallback=cls.cache_max_mb),
+        )
+
+
+class EdgeTTSBackend:
+    """Synthesis through the edge-tts service, which streams MP3"""
+    encoding = "mp3"
+
+    def synthesize(self, text: str, voice: str) -> Iterator[bytes]:
+        if edge_tts is None:
+            raise RuntimeError("edge-tts is not installed")
+        for chunk in edge_tts.Communicate(text, voice=voice).stream_sync():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
+
+# Error passed to a speak() callback whose utterance was dropped by stop()
+CANCELLED = "cancelled"
+
+# A backend has an `encoding` ("mp3" or "pcm" = s16le at the output format) and
+# synthesize(text, voice) yielding audio chunks. benchmarks/mock_tts.py has an offline one.
+BACKENDS = {"edge": EdgeTTSBackend}
+
+
+# Decoder input formats of miniaudio by backend encoding
+MINIAUDIO_FORMATS = {"mp3": "MP3", "wav": "WAV", "flac": "FLAC", "ogg": "VORBIS"}
+
+if miniaudio is not None:
+    class ChunkSource(miniaudio.StreamableSource):
+        """Feeds miniaudio from the chunks of a synthesis stream as they arrive"""
+        def __init__(self, chunks: Iterable[bytes]):
+            self._chunks = iter(chunks)
+            self._buffer = b""
+
+        def read(self, num_bytes: int) -> bytes:
+            while len(self._buffer) < num_bytes:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer += chunk
+            data, self._buffer = self._buffer[:num_bytes], self._buffer[num_bytes:]
+            return data
 
-class VoiceGenerator:
-    def __init__(self, config: Optional[TTSConfig] = None):
-        self.config = config or TTSConfig()
-        self.p = pyaudio.PyAudio()
-        self._stop_event = threading.Event()
-        self._current_stream = None
 
-    def _create_ffmpeg_process(self):
+class AudioDecoder:
+    """Decodes synthesized speech to s16le PCM in the output format, reused for every utterance.
+
+    With miniaudio (in requirements.txt) MP3 is decoded in-process and incrementally, so the
+    first audio is ready as soon as the first frames arrived. Without it ffmpeg is used, and
+    the next ffmpeg process is started in the background while the current utterance plays,
+    so no utterance waits for a process spawn.
+    """
+    def __init__(self, sample_rate: int, channels: int):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._spare = None
+        self._lock = threading.Lock()
+
+    def _spawn(self):
         return subprocess.Popen(
             [
                 "ffmpeg",
@@ -28,76 +121,360 @@ class VoiceGenerator:
                 "-i", "pipe:0",
                 "-f", "s16le",
                 "-acodec", "pcm_s16le",
-                "-ac", str(self.config.channels),
-                "-ar", str(self.config.sample_rate),
+                "-ac", str(self.channels),
+                "-ar", str(self.sample_rate),
                 "pipe:1"
             ],
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE
         )
 
-    def _audio_output_thread(self, ffmpeg_process):
-        stream = self.p.open(
-            format=self.config.format,
-            channels=self.config.channels,
-            rate=self.config.sample_rate,
-            output=True
-        )
-        self._current_stream = stream
-        
+    def _take_process(self):
+        with self._lock:
+            process, self._spare = self._spare, None
+        if process is None or process.poll() is not None:
+            process = self._spawn()
+        return process
+
+    def _prepare_spare(self):
+        def _run():
+            spare = self._spawn()
+            with self._lock:
+                if self._spare is None:
+                    self._spare = spare
+                    return
+            spare.kill()
+            spare.wait()
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def decode(self, chunks: Iterable[bytes], encoding: str = "mp3", read_size: int = 8192) -> Iterator[bytes]:
+        if encoding == "pcm":
+            yield from chunks
+            return
+        if miniaudio is not None and encoding in MINIAUDIO_FORMATS:
+            stream = miniaudio.stream_any(
+                ChunkSource(chunks),
+                source_format=getattr(miniaudio.FileFormat, MINIAUDIO_FORMATS[encoding]),
+                output_format=miniaudio.SampleFormat.SIGNED16,
+                nchannels=self.channels,
+                sample_rate=self.sample_rate,
+                frames_to_read=max(1, read_size // (2 * self.channels)),
+            )
+            try:
+                for samples in stream:
+                    yield samples.tobytes()
+            finally:
+                stream.close()
+            return
+
+        process = self._take_process()
+        self._prepare_spare()
+
+        def _feed():
+            try:
+                for chunk in chunks:
+                    process.stdin.write(chunk)
+            except (BrokenPipeError, ValueError):
+                # The consumer stopped early and the process was killed
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except (BrokenPipeError, ValueError):
+                    pass
+
+        feeder = threading.Thread(target=_feed, daemon=True)
+        feeder.start()
+        finished = False
         try:
-            while not self._stop_event.is_set():
-                data = ffmpeg_process.stdout.read(1024)
+            while True:
+                data = process.stdout.read(read_size)
                 if not data:
                     break
-                stream.write(data)
+                yield data
+            finished = True
         finally:
-            stream.stop_stream()
-            stream.close()
-            self.p.terminate()
+            if not finished:
+                # Nobody reads stdout any more, so ffmpeg would block on a full pipe forever
+                process.kill()
+            feeder.join()
+            process.wait()
+            process.stdout.close()
 
-    def speak(self, text: str, callback: Optional[Callable] = None):
-        """Non-blocking playback"""
-        self._stop_event.clear()
-        
-        def _run():
-            try:
-                communicate = edge_tts.Communicate(text, voice=self.config.voice)
-                ffmpeg_process = self._create_ffmpeg_process()
-                
-                audio_thread = threading.Thread(
-                    target=self._audio_output_thread, 
-                    args=(ffmpeg_process,)
+    def close(self):
+        with self._lock:
+            spare, self._spare = self._spare, None
+        if spare is not None:
+            spare.kill()
+            spare.wait()
+
+
+class PCMCache:
+    """SQLite-backed LRU cache of synthesized PCM keyed by (audio format, voice, text), limited by total size"""
+    def __init__(self, path: str, max_bytes: int = 200 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS pcm ("
+                " key TEXT PRIMARY KEY, voice TEXT, text TEXT, audio BLOB, size INTEGER, last_used REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS pcm_last_used ON pcm (last_used)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    @staticmethod
+    def _key(voice: str, text: str, audio_format: str) -> str:
+        return hashlib.sha256(f"{audio_format}\0{voice}\0{text.strip()}".encode("utf-8")).hexdigest()
+
+    def get(self, voice: str, text: str, audio_format: str = "") -> Optional[bytes]:
+        """`audio_format` names the backend and PCM format the entry was made with"""
+        key = self._key(voice, text, audio_format)
+        with self._lock, self._connect() as db:
+            row = db.execute("SELECT audio FROM pcm WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE pcm SET last_used = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def put(self, voice: str, text: str, audio: bytes, audio_format: str = ""):
+        if not audio or len(audio) > self.max_bytes:
+            return
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO pcm (key, voice, text, audio, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(voice, text, audio_format), voice, text.strip(), audio, len(audio), time.time()),
+            )
+            # Evict the least recently used entries until the cache fits
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM pcm").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in db.execute("SELECT key, size FROM pcm ORDER BY last_used").fetchall():
+                    db.execute("DELETE FROM pcm WHERE key = ?", (key,))
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+
+    def clear(self):
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM pcm")
+
+
+class PlaybackEngine:
+    """One PyAudio instance and one output stream for the whole session.
+
+    PCM chunks and completion callbacks are queued and written by a single playback thread,
+    so consecutive utterances play back to back without reopening the device. stop() drops
+    everything queued; the stream itself stays open for the next utterance.
+    """
+    def __init__(self, sample_rate: int = 24000, channels: int = 1, format: int = pyaudio.paInt16,
+                 write_frames: int = 4096, audio_backend=pyaudio.PyAudio):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.format = format
+        self.write_frames = write_frames
+        self.audio_backend = audio_backend
+        self.p = None
+        self.stream = None
+        self._queue = queue.Queue()
+        self._generation = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self.stream is None:
+                self.p = self.audio_backend()
+                self.stream = self.p.open(
+                    format=self.format,
+                    channels=self.channels,
+                    rate=self.sample_rate,
+                    output=True,
+                    frames_per_buffer=self.write_frames,
                 )
-                audio_thread.start()
-
-                for chunk in communicate.stream_sync():
-                    if chunk["type"] == "audio":
-                        ffmpeg_process.stdin.write(chunk["data"])
-                
-                ffmpeg_process.stdin.close()
-                audio_thread.join()
-                ffmpeg_process.wait()
-                
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def enqueue(self, pcm: bytes):
+        self._ensure_started()
+        self._queue.put((self._generation, pcm, None, None))
+
+    def enqueue_callback(self, callback: Callable[[], None], on_drop: Optional[Callable[[], None]] = None):
+        """Call `callback` from the playback thread once everything queued before it has played.
+
+        If stop() drops it first, `on_drop` is called instead.
+        """
+        self._ensure_started()
+        self._queue.put((self._generation, None, callback, on_drop))
+
+    def _run(self):
+        frame_bytes = self.channels * 2
+        block = self.write_frames * frame_bytes
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                generation, pcm, callback, on_drop = item
+                if generation != self._generation:
+                    if on_drop is not None:
+                        on_drop()
+                    continue
+                if callback is not None:
+                    callback()
+                    continue
+                for start in range(0, len(pcm), block):
+                    if generation != self._generation:
+                        break
+                    self.stream.write(pcm[start:start + block])
+            finally:
+                self._queue.task_done()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def stop(self):
+        """Drop everything queued; the block being written finishes (at most write_frames)"""
+        self._generation += 1
+
+    def wait(self):
+        """Block until everything queued so far has been played"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        self.stop()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        if self.p:
+            self.p.terminate()
+            self.p = None
+
+
+class VoiceGenerator:
+    def __init__(self, config: Optional[TTSConfig] = None, backend=None, cache: Optional[PCMCache] = None,
+                 engine: Optional[PlaybackEngine] = None):
+        self.config = config or TTSConfig.from_config()
+        self.backend = backend or BACKENDS[MYCONFIG['DEFAULT'].get('TTS_BACKEND', fallback='edge')]()
+        self.cache = cache
+        if cache is None and self.config.cache_enabled:
+            self.cache = PCMCache(self.config.cache_path, int(self.config.cache_max_mb * 1024 * 1024))
+        self.engine = engine or PlaybackEngine(
+            self.config.sample_rate, self.config.channels, self.config.format, self.config.write_frames
+        )
+        self.decoder = AudioDecoder(self.config.sample_rate, self.config.channels)
+        # Cached PCM is only valid for the backend and output format it was made with
+        self.audio_format = (
+            f"{type(self.backend).__name__}/{self.backend.encoding}/{self.config.sample_rate}/{self.config.channels}"
+        )
+        # Utterances are synthesized in order by one worker while earlier ones are playing
+        self._requests = queue.Queue()
+        self._worker = threading.Thread(target=self._synthesis_worker, daemon=True)
+        self._worker.start()
+
+    def _synthesis_worker(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            generation, text, callback, on_start = request
+            if text is None:
+                # wait() marker: everything before it has been synthesized and queued for playback
+                callback()
+                continue
+            if generation != self.engine.generation:
                 if callback:
-                    callback(True, None)
+                    callback(False, CANCELLED)
+                continue
+            try:
+                completed = self._synthesize(text, generation, on_start)
             except Exception as e:
                 if callback:
                     callback(False, str(e))
-            finally:
-                self._current_stream = None
+                continue
+            if not callback:
+                continue
+            if completed:
+                self.engine.enqueue_callback(
+                    lambda callback=callback: callback(True, None),
+                    on_drop=lambda callback=callback: callback(False, CANCELLED),
+                )
+            else:
+                callback(False, CANCELLED)
+
+    def _synthesize(self, text: str, generation: int, on_start: Optional[Callable] = None) -> bool:
+        """Queue the utterance for playback; False if stop() interrupted it"""
+        voice = self.config.voice
+        pcm = self.cache.get(voice, text, self.audio_format) if self.cache else None
+        if pcm is not None:
+            if on_start:
+                self.engine.enqueue_callback(on_start)
+            self.engine.enqueue(pcm)
+            return True
+        parts = []
+        chunks = self.backend.synthesize(text, voice)
+        decoded = self.decoder.decode(chunks, self.backend.encoding)
+        try:
+            for data in decoded:
+                if generation != self.engine.generation:
+                    # stop() was called, do not cache a partial utterance
+                    return False
+                if on_start and not parts:
+                    self.engine.enqueue_callback(on_start)
+                parts.append(data)
+                self.engine.enqueue(data)
+        finally:
+            # Close the decoder now rather than on garbage collection so its process is reaped
+            decoded.close()
+        if self.cache:
+            self.cache.put(voice, text, b"".join(parts), self.audio_format)
+        return True
+
+    def speak(self, text: str, callback: Optional[Callable] = None, on_start: Optional[Callable] = None):
+        """Non-blocking playback; `callback(ok, error)` runs once the utterance has played.
 
-        threading.Thread(target=_run).start()
+        An utterance dropped by stop() reports `callback(False, CANCELLED)`.
+
+        `on_start()` runs on the playback thread right before its first audio is written.
+        """
+        if text.strip():
+            self._requests.put((self.engine.generation, text, callback, on_start))
+
+    def wait(self):
+        """Block until everything passed to speak() so far has been played"""
+        done = threading.Event()
+        self._requests.put((None, None, done.set, None))
+        done.wait()
+        self.engine.wait()
 
     def stop(self):
-        """Stop playback immediately"""
-        self._stop_event.set()
-        if self._current_stream:
-            self._current_stream.stop_stream()
+        """Stop playback immediately and drop utterances that were not played yet"""
+        self.engine.stop()
+
+    def close(self):
+        self.stop()
+        self._requests.put(None)
+        self._worker.join()
+        self.engine.close()
+        self.decoder.close()
+
 
 if __name__ == "__main__":
     generator = VoiceGenerator()
     generator.speak("Hello，Welcome Edge TTS。")
     input("Press Enter to stop playback...")
     generator.stop()
-# Compare this snippet from util.py:
+    generator.close()
@@ -0,0 +1,120 @@
+# Ring buffer, block resampling and voice activity detection of the capture path, run with: python -m pytest tests
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio_capture import RingBuffer, StreamResampler, VoiceActivityDetector
+
+RATE = 16000
+
+
+def pcm(samples, channels=1):
+    """Interleaved 16-bit PCM bytes with `samples` on every channel"""
+    ints = (np.asarray(samples) * 32767).astype(np.int16)
+    return np.repeat(ints, channels).tobytes()
+
+
+def blocks(data, sizes):
+    """Split `data` into consecutive blocks of the (cycled) byte sizes"""
+    out, start, i = [], 0, 0
+    while start < len(data):
+        out.append(data[start:start + sizes[i % len(sizes)]])
+        start += sizes[i % len(sizes)]
+        i += 1
+    return out
+
+
+def test_ring_buffer_wraps_around():
+    ring = RingBuffer(8)
+    ring.write(np.arange(6, dtype=np.float32))
+    assert list(ring.read()) == [0, 1, 2, 3, 4, 5]
+    ring.write(np.arange(6, 11, dtype=np.float32))
+    assert ring.available() == 5
+    assert list(ring.read()) == [6, 7, 8, 9, 10]
+    assert list(ring.latest(4)) == [7, 8, 9, 10]
+    assert ring.overruns == 0
+
+
+def test_ring_buffer_overflow_keeps_the_newest_samples():
+    ring = RingBuffer(4)
+    ring.write(np.arange(3, dtype=np.float32))
+    ring.write(np.arange(3, 6, dtype=np.float32))
+    assert list(ring.read()) == [2, 3, 4, 5]
+    assert ring.overruns == 2
+
+
+def test_ring_buffer_block_larger_than_capacity():
+    ring = RingBuffer(4)
+    ring.write(np.arange(10, dtype=np.float32))
+    assert list(ring.read()) == [6, 7, 8, 9]
+    assert ring.overruns == 6
+    assert len(ring.read()) == 0
+
+
+def test_resampler_integer_ratio_is_continuous_across_blocks():
+    signal = np.sin(np.arange(4800) * 0.01) * 0.5
+    data = pcm(signal, channels=2)
+    whole = StreamResampler(48000, 2).process(data)
+    streamed = StreamResampler(48000, 2)
+    # Whole stereo frames, like PortAudio delivers them, but split the groups of 3 being averaged
+    parts = np.concatenate([streamed.process(block) for block in blocks(data, [4, 1000, 8, 2224])])
+    assert len(whole) == 1600
+    np.testing.assert_allclose(parts, whole, atol=1e-6)
+
+
+def test_resampler_fractional_ratio_is_continuous_across_blocks():
+    signal = np.sin(np.arange(4410) * 0.01) * 0.5
+    data = pcm(signal)
+    whole = StreamResampler(44100, 1).process(data)
+    streamed = StreamResampler(44100, 1)
+    parts = np.concatenate([streamed.process(block) for block in blocks(data, [2, 882, 10, 1500])])
+    assert abs(len(whole) - 1600) <= 1
+    np.testing.assert_allclose(parts, whole[:len(parts)], atol=1e-6)
+    assert len(whole) - len(parts) <= 1
+
+
+def tone(seconds, amplitude=0.3):
+    """A 200 Hz tone: enough energy and few zero crossings, so it counts as speech"""
+    return (np.sin(2 * np.pi * 200 * np.arange(int(seconds * RATE)) / RATE) * amplitude).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+
+def test_vad_keeps_listening_through_a_short_pause():
+    vad = VoiceActivityDetector(silence_seconds=1.0)
+    assert not vad.update(tone(0.5), RATE)
+    assert not vad.update(silence(0.6), RATE)
+    # Speech resumes within the hangover, the silence count starts over
+    assert not vad.update(tone(0.2), RATE)
+    assert not vad.update(silence(0.6), RATE)
+    assert vad.update(silence(0.5), RATE)
+
+
+def test_vad_needs_speech_before_stopping():
+    vad = VoiceActivityDetector(silence_seconds=1.0)
+    assert not vad.update(silence(3.0), RATE)
+    # A click is shorter than min_speech_seconds
+    assert not vad.update(tone(0.1), RATE)
+    assert not vad.update(silence(2.0), RATE)
+
+
+def test_vad_blocks_not_aligned_to_frames():
+    vad = VoiceActivityDetector(silence_seconds=0.5)
+    audio = np.concatenate((tone(0.5), silence(0.6)))
+    # 0.5 s of speech, then 0.6 s of silence in blocks of 7 ms that split the 20 ms frames
+    results = [vad.update(audio[i:i + 112], RATE) for i in range(0, len(audio), 112)]
+    assert results[-1] and not any(results[:len(results) // 2])
+
+
+def test_vad_segments_bridge_gaps_shorter_than_the_hangover():
+    vad = VoiceActivityDetector(silence_seconds=0.5, padding_seconds=0.0)
+    audio = np.concatenate((tone(0.5), silence(0.3), tone(0.5), silence(1.0), tone(0.5)))
+    segments = vad.speech_segments(audio, RATE)
+    assert len(segments) == 2
+    assert segments[0][0] == 0.0 and abs(segments[0][1] - 1.3) < 0.03
+    assert abs(segments[1][0] - 2.3) < 0.03
@@ -0,0 +1,114 @@
+# Device handling of the always-on CaptureEngine, run with: python -m pytest tests
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fake_audio import FakePyAudio
+from src.audio_capture import CaptureEngine
+
+CLIP = os.path.join(ROOT, "interview.wav")
+
+
+class FakeSystem:
+    """Stands in for the OS audio setup behind a reference-counted PortAudio.
+
+    Like Pa_Initialize, only the first live instance enumerates the devices; instances created
+    while another one is alive see the same (possibly stale) list.
+    """
+    def __init__(self):
+        self.default_name = "Speakers"
+        self.mic = False
+        self.instances = 0
+        self.alive = 0
+        self._enumerated = None
+
+    def backend(self):
+        system = self
+
+        class RefcountedPyAudio(FakePyAudio):
+            def terminate(self):
+                super().terminate()
+                system.alive -= 1
+
+        if self.alive == 0:
+            self._enumerated = (self.default_name, self.mic)
+        self.instances += 1
+        self.alive += 1
+        name, mic = self._enumerated
+        return RefcountedPyAudio(CLIP, realtime=False, name=name, mic_path=CLIP if mic else None)
+
+
+def make_engine(system):
+    return CaptureEngine(device_index=-1, audio_backend=system.backend, preroll_seconds=0.1, mic_device_index=None)
+
+
+def test_refresh_picks_up_a_new_default_loopback():
+    system = FakeSystem()
+    engine = make_engine(system)
+    try:
+        engine.start()
+        assert engine.device_info["name"] == "Speakers"
+
+        system.default_name = "Headphones"
+        assert engine.refresh_devices()
+        assert engine.device_info["name"] == "Headphones"
+        assert engine.is_running
+    finally:
+        engine.close()
+
+
+def test_refresh_picks_up_a_new_device():
+    system = FakeSystem()
+    engine = make_engine(system)
+    try:
+        engine.start()
+        assert len(engine.devices()) == 1
+        system.mic = True
+        assert engine.refresh_devices()
+        assert len(engine.devices()) == 2
+    finally:
+        engine.close()
+
+
+def test_refresh_reports_unchanged_devices():
+    system = FakeSystem()
+    engine = make_engine(system)
+    try:
+        engine.start()
+        assert not engine.refresh_devices()
+        assert system.alive == 1
+    finally:
+        engine.close()
+
+
+def test_start_session_does_not_reinitialise_portaudio():
+    system = FakeSystem()
+    engine = make_engine(system)
+    try:
+        engine.start()
+        stream = engine.stream
+        system.default_name = "Headphones"
+        for _ in range(3):
+            engine.start_session()
+            engine.end_session()
+        assert system.instances == 1
+        assert engine.stream is stream
+    finally:
+        engine.close()
+
+
+def test_no_refresh_during_a_recording():
+    system = FakeSystem()
+    engine = make_engine(system)
+    try:
+        engine.start()
+        engine.start_session()
+        system.default_name = "Headphones"
+        assert not engine.refresh_devices()
+        assert engine.device_info["name"] == "Speakers"
+        engine.end_session()
+    finally:
+        engine.close()
@@ -0,0 +1,77 @@
+# Token budget and summaries of the conversation memory, run with: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.conversation import MESSAGE_OVERHEAD_TOKENS, ConversationMemory, is_follow_up
+
+
+class WordCounter:
+    """One token per word, so budgets are predictable without tiktoken"""
+    def count(self, text):
+        return len(text.split())
+
+
+def make_memory(max_prompt_tokens=100, max_summary_tokens=40):
+    return ConversationMemory(max_prompt_tokens, max_summary_tokens, counter=WordCounter())
+
+
+def ask(memory, n, words=10):
+    question = f"Question {n}. " + "q " * (words - 2)
+    answer = f"Answer {n}. " + "a " * (words - 2)
+    memory.add_turn(question.strip(), answer.strip())
+
+
+def prompt_size(messages):
+    return sum(len(message["content"].split()) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def test_history_fits_without_eviction():
+    memory = make_memory()
+    ask(memory, 1)
+    messages = memory.build_messages("Next question?", "Be brief.")
+    assert [message["role"] for message in messages] == ["system", "user", "assistant", "user"]
+    assert memory.summary == []
+    assert memory.prompt_tokens == 2 * (10 + MESSAGE_OVERHEAD_TOKENS)
+
+
+def test_oldest_turns_are_summarised_to_stay_in_budget():
+    memory = make_memory()
+    for n in range(1, 6):
+        ask(memory, n)
+    messages = memory.build_messages("Next question?", "Be brief.")
+    assert prompt_size(messages) <= memory.max_prompt_tokens
+    # Each evicted turn becomes one summary line with the first sentence of question and answer
+    assert memory.summary[0][0] == "- Q: Question 1. A: Answer 1."
+    assert "Earlier in this conversation:" in messages[0]["content"]
+    assert messages[1]["content"].startswith(f"Question {6 - len(memory.turns)}.")
+    assert messages[-1] == {"role": "user", "content": "Next question?"}
+
+
+def test_summary_is_capped():
+    memory = make_memory(max_prompt_tokens=40, max_summary_tokens=20)
+    for n in range(1, 20):
+        ask(memory, n)
+        memory.build_messages("Next?")
+    assert sum(tokens for _, tokens in memory.summary) <= 20
+    # Only the most recent summary lines are kept
+    assert memory.summary[-1][0].startswith(f"- Q: Question {19 - len(memory.turns)}.")
+
+
+def test_digest_follows_the_history():
+    memory = make_memory()
+    assert memory.digest() == ""
+    ask(memory, 1)
+    first = memory.digest()
+    ask(memory, 2)
+    assert memory.digest() not in ("", first)
+    memory.clear()
+    assert memory.digest() == "" and memory.prompt_tokens == 0
+
+
+def test_follow_up_questions():
+    assert is_follow_up("Can you give an example?")
+    assert is_follow_up("What about its complexity")
+    assert is_follow_up("Why?")
+    assert not is_follow_up("Explain the difference between a process and a thread")
@@ -0,0 +1,89 @@
+# Endpoint ranking of the LLM router, run with: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.llm_router import EndpointRouter, parse_endpoints
+
+
+class FakeEndpoint:
+    """The fields EndpointRouter reads and updates, without an API client"""
+    def __init__(self, name):
+        self.name = name
+        self.ttft = None
+        self.errors = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.last_error = None
+
+
+def make_router(*names, **options):
+    endpoints = [FakeEndpoint(name) for name in names]
+    return EndpointRouter(endpoints, **options), endpoints
+
+
+def test_fastest_endpoint_ranks_first():
+    router, (a, b, c) = make_router("a", "b", "c")
+    router.record_ttft(a, 0.9)
+    router.record_ttft(b, 0.3)
+    router.record_ttft(c, 0.6)
+    assert router.ranked() == [b, c, a]
+    assert router.ranked(exclude=(b,)) == [c, a]
+    # Excluding everything falls back to all endpoints
+    assert router.ranked(exclude=(a, b, c)) == [b, c, a]
+
+
+def test_unmeasured_endpoints_are_tried_first():
+    router, (a, b) = make_router("a", "b")
+    router.record_ttft(a, 0.1)
+    assert router.ranked()[0] is b
+
+
+def test_errors_push_an_endpoint_down():
+    router, (a, b) = make_router("a", "b")
+    router.record_ttft(a, 0.3)
+    router.record_ttft(b, 0.5)
+    router.record_error(a)
+    assert router.ranked() == [b, a]
+
+
+def test_errors_decay():
+    router, (a, b) = make_router("a", "b", error_half_life=10.0)
+    router.record_ttft(a, 0.3)
+    router.record_ttft(b, 0.5)
+    router.record_error(a)
+    assert router.score(a, now=a.last_error + 100) < router.score(b)
+
+
+def test_moving_average():
+    router, (a,) = make_router("a", alpha=0.5)
+    router.record_ttft(a, 1.0)
+    router.record_ttft(a, 0.5)
+    assert a.ttft == 0.75
+    assert a.requests == 2
+
+
+def test_lower_bound_measures_a_new_endpoint():
+    router, (a, b) = make_router("a", "b")
+    router.record_ttft(a, 0.2)
+    # b lost the race after 0.2 s without a token: it leaves the unmeasured first rank
+    router.record_lower_bound(b, 0.2)
+    assert b.ttft == 0.2
+    router.record_ttft(a, 0.2)
+    router.record_lower_bound(b, 0.25)
+    assert router.ranked() == [a, b]
+
+
+def test_lower_bound_never_improves_an_endpoint():
+    router, (a,) = make_router("a", alpha=0.5)
+    router.record_ttft(a, 1.0)
+    router.record_lower_bound(a, 0.2)
+    assert a.ttft == 1.0
+    router.record_lower_bound(a, 2.0)
+    assert a.ttft == 1.5
+
+
+def test_parse_endpoints():
+    value = "http://a/v1 | m1 | key1; http://b/v1 | m2"
+    assert parse_endpoints(value, "default") == [("http://a/v1", "m1", "key1"), ("http://b/v1", "m2", "default")]
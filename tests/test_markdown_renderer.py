@@ -0,0 +1,64 @@
+# Block splitting of the streamed Markdown renderer, run with: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.markdown_renderer import MarkdownStreamRenderer, split_finished
+
+
+def stream(text):
+    """Feed `text` one character at a time, rendering after each, like the GUI frame timer"""
+    renderer = MarkdownStreamRenderer()
+    for char in text:
+        renderer.feed(char)
+        renderer.render()
+    renderer.end_turn()
+    return renderer.history[0]
+
+
+def test_split_at_paragraph_boundary():
+    assert split_finished("first\n\nsecond\n\nthi") == ("first\n\nsecond\n\n", "thi")
+
+
+def test_no_split_inside_code_fence():
+    text = "```\na\n\nb\n```\n\nafter\n\nx"
+    finished, tail = split_finished(text)
+    assert finished == "```\na\n\nb\n```\n\nafter\n\n"
+    assert tail == "x"
+
+
+def test_loose_ordered_list_stays_one_block():
+    finished, tail = split_finished("1. a\n\n2. b\n\n3. c\n")
+    assert finished == ""
+
+
+def test_list_ends_at_paragraph():
+    assert split_finished("1. a\n\n2. b\n\nText\n\nx") == ("1. a\n\n2. b\n\nText\n\n", "x")
+
+
+def test_different_list_kind_starts_a_new_block():
+    assert split_finished("- a\n\n1. b\n")[0] == "- a\n\n"
+
+
+def test_streamed_loose_list_keeps_numbering():
+    html = stream("1. first\n\n2. second\n\n3. third\n\nDone.")
+    assert html.count("<ol") == 1
+    assert "start=" not in html
+
+
+def test_reference_waits_for_its_definition():
+    finished, _ = split_finished("See [docs][1].\n\nNext\n\n")
+    assert finished == ""
+    finished, _ = split_finished("See [docs][1].\n\nNext\n\n[1]: http://example.com\n\nEnd")
+    assert finished.startswith("See [docs][1].")
+
+
+def test_brackets_in_code_are_not_references():
+    finished, _ = split_finished("Use `a[i][j]`.\n\nnext\n\n")
+    assert finished == "Use `a[i][j]`.\n\n"
+
+
+def test_streamed_references_resolve_in_both_directions():
+    html = stream("Read [the docs][d].\n\nMore text\n\n[d]: http://example.com\n\nAgain [the docs][d]")
+    assert html.count('href="http://example.com"') == 2
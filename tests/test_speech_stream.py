@@ -0,0 +1,52 @@
+# Sentence splitting of streamed replies for text-to-speech, run with: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.speech_stream import SentenceSegmenter
+
+
+def segment(text, step=1):
+    """Feed `text` in deltas of `step` characters and collect every sentence, in order"""
+    segmenter = SentenceSegmenter()
+    sentences = []
+    for i in range(0, len(text), step):
+        sentences += segmenter.feed(text[i:i + step])
+    return sentences + segmenter.flush()
+
+
+def test_sentences_are_emitted_as_they_complete():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("The first sentence is done. The sec") == ["The first sentence is done."]
+    assert segmenter.feed("ond one too! And") == ["The second one too!"]
+    assert segmenter.flush() == ["And"]
+
+
+def test_abbreviations_do_not_end_a_sentence():
+    text = "Use a queue, e.g. a deque from Dr. Smith. Then measure it.\n"
+    assert segment(text) == ["Use a queue, e.g. a deque from Dr. Smith.", "Then measure it."]
+
+
+def test_single_initials_do_not_end_a_sentence():
+    assert segment("The paper by J. Dean is a classic.\n") == ["The paper by J. Dean is a classic."]
+
+
+def test_decimals_do_not_end_a_sentence():
+    # Streamed one character at a time "3." arrives before "14"
+    assert segment("Pi is about 3.14 in short. Use more digits.\n") == [
+        "Pi is about 3.14 in short.", "Use more digits."]
+
+
+def test_code_fences_are_not_spoken():
+    text = "Here is the code:\n```python\nx = 1. y = 2.\nprint(x)\n```\nThat is all.\n"
+    assert segment(text) == ["Here is the code:", "That is all."]
+    assert segment(text, step=5) == ["Here is the code:", "That is all."]
+
+
+def test_markdown_lines_end_sentences():
+    assert segment("# Title\n- **first** point\n- second point") == ["Title", "first point", "second point"]
+
+
+def test_short_fragments_join_the_next_sentence():
+    assert segment("Yes. It works that way.\n") == ["Yes. It works that way."]
@@ -0,0 +1,41 @@
+# Merging the text of overlapping transcription windows, run with: python -m pytest tests
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("whisper")
+pytest.importorskip("torch")
+from src.transcriber import merge_overlap, strip_seam
+
+
+def test_repeated_words_across_the_seam_are_dropped():
+    assert merge_overlap("we should use a hash map", "a hash map for lookups") == "we should use a hash map for lookups"
+
+
+def test_repeat_is_matched_ignoring_case_and_punctuation():
+    assert merge_overlap("It runs in linear time.", "Linear time, which is optimal") == \
+        "It runs in linear time. which is optimal"
+
+
+def test_single_word_repeat_is_kept():
+    # "the the" at a seam is more often speech than a double decode
+    assert merge_overlap("I went to the", "the store") == "I went to the the store"
+    assert strip_seam("a b", "b c", min_words=1) == "c"
+
+
+def test_longest_repeat_wins():
+    assert strip_seam("one two one two", "one two one two three") == "three"
+
+
+def test_repeat_longer_than_max_words_is_kept():
+    committed = "a b c d e f g h i j"
+    assert strip_seam(committed, "c d e f g h i j k", max_words=4) == "c d e f g h i j k"
+
+
+def test_empty_sides():
+    assert merge_overlap("", " new text ") == "new text"
+    assert merge_overlap("old text", "  ") == "old text"
+    assert merge_overlap("the same words", "the same words") == "the same words"
@@ -0,0 +1,37 @@
+# The GUI event loop must stay responsive while a job runs, run with: python -m pytest tests
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+pytest.importorskip("PyQt5")
+import numpy as np
+from PyQt5 import QtWidgets
+
+from bench_ui_stall import STALL_MS, run
+
+
+def fake_transcription(seconds=1.0):
+    """Stands in for Whisper: native numpy work that releases the GIL, like the model does"""
+    end = time.perf_counter() + seconds
+    matrix = np.random.rand(200, 200)
+    while time.perf_counter() < end:
+        matrix = np.linalg.qr(matrix)[0]
+    return "fake"
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def test_job_does_not_stall_the_event_loop(app):
+    result = run(app, "job", fake_transcription)
+    assert result["ticks"] > 0
+    assert result["max"] <= STALL_MS, f"GUI stalled for {result['max']:.0f} ms while a job ran"